@@ -2,15 +2,20 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
+import hashlib
 import io
+import itertools
+import os
+import tempfile
+import time
 
 # Importation des fonctions (assure-toi que constructeur_dcop.py est présent)
-from constructeur_dcop import (
-    generer_positions_aleatoires,
-    construire_json_a_partir_positions,
-    json_vers_xml,
-    afficher_json_joli,
-)
+from constructeur_dcop import StatsGeneration, afficher_json_joli, estimer_instance
+from cache_instances import CacheInstances
+from edition_instance import OPERATIONS, InstanceEditable
+from generation_lot import generer_lot, plage, zipper_lot
+import magasin_resultats
+from solveur_exact import ajouter_cout_optimal, nom_instance_depuis_xml, optima_depuis_dossier
 
 # ------------------------------------
 # CONFIG
@@ -50,8 +55,14 @@ def dessiner_scene(voitures, passagers, dest_commune=None, dest_par=None):
     ax.set_ylabel("Y")
     ax.legend()
     st.pyplot(fig)
+    plt.close(fig)
+
+@st.cache_resource
+def cache_instances():
+    """Cache disque partagé par toutes les sessions (instances et XML déjà générés)."""
+    return CacheInstances(os.environ.get("DCOP_CACHE_DIR", "cache_instances"))
 
-def boutons_telechargement_json(obj_json, suffixe_cle, modelisation_choisie):
+def boutons_telechargement_json(obj_json, suffixe_cle, modelisation_choisie, encodage_capacite="sous_ensembles"):
     json_str = afficher_json_joli(obj_json)
     nom_base = obj_json.get("nom", "instance")
     st.download_button(
@@ -62,47 +73,222 @@ def boutons_telechargement_json(obj_json, suffixe_cle, modelisation_choisie):
         key=f"json_{suffixe_cle}",
     )
 
-    xml_str = json_vers_xml(obj_json, modelisation=modelisation_choisie)
-    st.download_button(
-        f"⬇️ Télécharger XML (Modèle {modelisation_choisie})",
-        data=xml_str.encode("utf-8"),
-        file_name=f"{nom_base}_M{modelisation_choisie}.xml",
-        mime="application/xml",
-        key=f"xml_{suffixe_cle}_M{modelisation_choisie}",
-    )
+    stats = StatsGeneration()
+    with cache_instances().ouvrir_xml(obj_json, modelisation_choisie, encodage_capacite, stats) as flux_xml:
+        st.download_button(
+            f"⬇️ Télécharger XML (Modèle {modelisation_choisie})",
+            data=flux_xml,
+            file_name=f"{nom_base}_M{modelisation_choisie}.xml",
+            mime="application/xml",
+            key=f"xml_{suffixe_cle}_M{modelisation_choisie}",
+        )
+    # Phases mesurées seulement si le XML vient d'être généré (échec du cache)
+    if stats.phases:
+        with st.expander(f"⏱️ Phases de génération du XML ({stats.temps_total_s * 1000:.1f} ms)"):
+            df_phases = pd.DataFrame(stats.lignes())
+            df_phases.insert(1, "temps_ms", (df_phases.pop("temps_s") * 1000).round(3))
+            st.dataframe(df_phases, hide_index=True)
+    else:
+        st.caption("XML servi par le cache d'instances : pas de génération, pas de phases mesurées.")
+
+# Limites de taille des instances générées depuis l'app (surchargeables par variables d'environnement)
+LIMITE_CONTRAINTES = int(os.environ.get("DCOP_LIMITE_CONTRAINTES", 2_000_000))
+LIMITE_OCTETS_XML = int(os.environ.get("DCOP_LIMITE_OCTETS_XML", 200 * 1024 ** 2))
+
+# Nombre maximal d'instances d'un lot lancé depuis l'app (au-delà : generation_lot.py en ligne de commande)
+LOT_INSTANCES_MAX = 200
+
+# Au-delà, le tableau affiché et le nuage de points portent sur un extrait (les synthèses restent complètes)
+LIGNES_AFFICHEES_MAX = 10_000
+POINTS_NUAGE_MAX = 50_000
+
+def _separateur(premiere_ligne: str) -> str:
+    """`;` si l'en-tête en contient et n'a pas de `,`, sinon `,`."""
+    return ";" if ";" in premiere_ligne and "," not in premiere_ligne else ","
 
 def charger_csv_flexible(data):
-    """Accepte un chemin (str/Path) OU des bytes d’un uploader, gère `,` ou `;`."""
+    """Accepte un chemin (str/Path) OU des bytes d’un uploader, gère `,` ou `;` (détecté sur l'en-tête)."""
     if isinstance(data, (bytes, bytearray)):
         stream = io.BytesIO(data)
+        sep = _separateur(stream.readline().decode("utf-8", errors="replace"))
+        stream.seek(0)
         try:
-            return pd.read_csv(stream)
+            return pd.read_csv(stream, sep=sep)
         except Exception:
             stream.seek(0)
-            return pd.read_csv(stream, sep=";")
+            return pd.read_csv(stream, sep=";" if sep == "," else ",")
     else:
+        with open(data, encoding="utf-8", errors="replace") as f:
+            sep = _separateur(f.readline())
         try:
-            return pd.read_csv(data)
+            return pd.read_csv(data, sep=sep)
         except Exception:
-            return pd.read_csv(data, sep=";")
+            return pd.read_csv(data, sep=";" if sep == "," else ",")
+
+def octets_lisibles(n: float) -> str:
+    for unite in ("o", "Ko", "Mo", "Go"):
+        if n < 1024 or unite == "Go":
+            return f"{n:,.0f} {unite}" if unite == "o" else f"{n:,.1f} {unite}"
+        n /= 1024
+
+def depasse_limites(estimation: dict) -> bool:
+    return estimation["nb_contraintes"] > LIMITE_CONTRAINTES or estimation["octets_xml"] > LIMITE_OCTETS_XML
+
+def afficher_estimation(n_voitures, n_passagers, capacite, modelisation, encodage_capacite) -> bool:
+    """
+    Estimation avant génération (estimer_instance, rien n'est construit). Au-delà des limites,
+    refuse et propose l'encodage compteur s'il passe. Retourne True si la génération est autorisée.
+    """
+    est = estimer_instance(n_voitures, n_passagers, capacite, modelisation, encodage_capacite)
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Variables", f"{est['nb_variables']:,}")
+    c2.metric("Contraintes", f"{est['nb_contraintes']:,}")
+    c3.metric("Relations (max)", f"{est['nb_relations']:,}")
+    c4.metric("XML estimé", octets_lisibles(est["octets_xml"]))
+    c5.metric("Temps estimé", f"{est['temps_s']:.2g} s")
+    st.caption(f"Arité max : {est['max_arity']} — limites de l'app : {LIMITE_CONTRAINTES:,} contraintes, "
+               f"{octets_lisibles(LIMITE_OCTETS_XML)} de XML.")
+    if not depasse_limites(est):
+        return True
+    if encodage_capacite == "sous_ensembles":
+        alt = estimer_instance(n_voitures, n_passagers, capacite, modelisation, "compteur")
+        if not depasse_limites(alt):
+            st.error(
+                f"Instance trop grande ({est['nb_contraintes']:,} contraintes, ~{octets_lisibles(est['octets_xml'])}). "
+                f"Choisissez l'encodage « Compteur séquentiel » : {alt['nb_contraintes']:,} contraintes, "
+                f"~{octets_lisibles(alt['octets_xml'])}."
+            )
+            return False
+    st.error("Instance trop grande pour l'app : réduisez le nombre de voitures / passagers.")
+    return False
+
+@st.cache_data(max_entries=8, show_spinner="Lecture du CSV…")
+def charger_bench(cle_source, chemin=None, _donnees=None):
+    """
+    CSV de bench nettoyé (colonnes numériques, algorithm / xml_file catégorielles), mémorisé par
+    cle_source = (chemin, mtime, taille) ou empreinte de l'upload : relu seulement s'il change.
+    """
+    df = charger_csv_flexible(_donnees if _donnees is not None else chemin)
+    for c in ["total_cost", "runtime_ms", "ncccs", "msgs_total"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in ["algorithm", "xml_file"]:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df
+
+@st.cache_data(max_entries=8, show_spinner="Lecture du magasin Parquet…")
+def charger_magasin(cle_source, racine, modelisation):
+    """
+    Partition `modelisation` du magasin Parquet, colonnes d'analyse seulement (déjà typées),
+    mémorisée par cle_source = (racine, signature des fichiers).
+    """
+    df = magasin_resultats.lire(racine, magasin_resultats.COLONNES_ANALYSE, modelisations=[modelisation])
+    df["xml_file"] = df["xml_file"].astype("category")
+    return df
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def resumer_bench(cle_source, algos_sel, inst_sel, dossier_instances, _df):
+    """
+    Lignes filtrées (+ meilleur_cout, cout_optimal, ecart_pct) et synthèse par algorithme,
+    mémorisées par version des données (cle_source) et par jeu de filtres.
+    """
+    df = _df
+    if "algorithm" in df.columns:
+        df = df[df["algorithm"].isin(algos_sel)]
+    if "xml_file" in df.columns:
+        df = df[df["xml_file"].isin(inst_sel)]
+    df = df.copy()
+    if df.empty:
+        return df, pd.DataFrame()
+
+    # Gap vs optimum exact (cout_optimal) si connu, sinon vs meilleur coût trouvé par instance
+    if {"xml_file", "total_cost"}.issubset(df.columns):
+        df["meilleur_cout"] = df.groupby("xml_file", observed=True)["total_cost"].transform("min")
+        if "cout_optimal" not in df.columns and dossier_instances:
+            noms = (df["instance_name"] if "instance_name" in df.columns
+                    else df["xml_file"].map(nom_instance_depuis_xml)).astype(str)
+            optima = optima_depuis_dossier(dossier_instances, noms.dropna().unique())
+            df["cout_optimal"] = noms.map(optima)
+        reference = df["meilleur_cout"]
+        if "cout_optimal" in df.columns:
+            df["cout_optimal"] = pd.to_numeric(df["cout_optimal"], errors="coerce")
+            reference = df["cout_optimal"].fillna(df["meilleur_cout"])
+        df["ecart_pct"] = (df["total_cost"] - reference) / reference * 100
 
-def analyse_csv_tab(titre_tab, default_csv_path, uploader_key, chemin_key):
-    """Un onglet complet d'analyse (table + synthèse + graphes) sur un CSV donné."""
+    agg = {}
+    for c in ["total_cost", "runtime_ms", "ncccs", "msgs_total", "ecart_pct"]:
+        if c in df.columns:
+            agg[c] = "mean"
+    synth = df.groupby("algorithm", observed=True).agg(agg).reset_index() if agg and "algorithm" in df.columns else pd.DataFrame()
+    if "algorithm" in synth.columns:
+        synth["algorithm"] = synth["algorithm"].astype(str)
+    tri = [c for c in ["xml_file", "algorithm"] if c in df.columns]
+    df = df.sort_values(tri).reset_index(drop=True) if tri else df.reset_index(drop=True)
+    return df, synth
+
+def _png(fig) -> bytes:
+    """Rend la figure en PNG puis la libère (pas d'accumulation de figures entre les reruns)."""
+    tampon = io.BytesIO()
+    fig.savefig(tampon, format="png", bbox_inches="tight")
+    plt.close(fig)
+    return tampon.getvalue()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def figure_barre(version, titre, etiquette_y, _series):
+    """Barres par algorithme, rendues une fois par version des données."""
+    fig, ax = plt.subplots()
+    _series.plot(kind="bar", ax=ax)
+    ax.set_title(titre)
+    ax.set_ylabel(etiquette_y)
+    ax.set_xlabel("Algorithme")
+    ax.tick_params(axis="x", rotation=45)
+    ax.grid(True, axis="y", alpha=0.3)
+    return _png(fig)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def figure_nuage(version, _df):
+    """Nuage Messages vs Temps (extrait aléatoire reproductible au-delà de POINTS_NUAGE_MAX lignes)."""
+    if len(_df) > POINTS_NUAGE_MAX:
+        _df = _df.sample(n=POINTS_NUAGE_MAX, random_state=0)
+    fig, ax = plt.subplots()
+    for algo, sub in _df.groupby("algorithm", observed=True):
+        ax.scatter(sub["msgs_total"], sub["runtime_ms"], label=str(algo))
+    ax.set_xlabel("Messages envoyés")
+    ax.set_ylabel("Temps (ms)")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    return _png(fig)
+
+def analyse_csv_tab(titre_tab, default_csv_path, uploader_key, chemin_key, modelisation):
+    """Un onglet complet d'analyse (table + synthèse + graphes) sur un CSV ou un magasin Parquet."""
     st.subheader(titre_tab)
 
-    colp, colu = st.columns(2)
+    colp, colu, coli = st.columns(3)
     with colp:
-        chemin_csv = st.text_input("Chemin local du CSV", value=default_csv_path, key=chemin_key)
+        chemin_csv = st.text_input("Chemin local du CSV (ou dossier du magasin Parquet)", value=default_csv_path, key=chemin_key)
     with colu:
         up = st.file_uploader("…ou uploader un CSV", type=["csv"], key=uploader_key)
+    with coli:
+        dossier_instances = st.text_input(
+            "Dossier des instances JSON (optimum exact, optionnel)", value="", key=f"instances_{chemin_key}"
+        )
 
-    # Chargement
+    # Chargement (mémorisé : relu seulement si le fichier ou l'upload change)
     df = None
     if up is not None:
-        df = charger_csv_flexible(up.read())
+        donnees = up.getvalue()
+        cle_source = ("upload", hashlib.sha256(donnees).hexdigest())
+        df = charger_bench(cle_source, _donnees=donnees)
+    elif os.path.isdir(chemin_csv.strip()):
+        racine = os.path.abspath(chemin_csv.strip())
+        cle_source = (racine, modelisation, magasin_resultats.signature(racine))
+        df = charger_magasin(cle_source, racine, modelisation)
     elif chemin_csv.strip():
         try:
-            df = charger_csv_flexible(chemin_csv.strip())
+            infos = os.stat(chemin_csv.strip())
+            cle_source = (os.path.abspath(chemin_csv.strip()), infos.st_mtime_ns, infos.st_size)
+            df = charger_bench(cle_source, chemin=chemin_csv.strip())
         except Exception as e:
             st.error(f"Impossible de lire le CSV à '{chemin_csv}': {e}")
 
@@ -110,84 +296,50 @@ def analyse_csv_tab(titre_tab, default_csv_path, uploader_key, chemin_key):
         st.info("Charge un CSV pour continuer. Colonnes attendues : `xml_file, algorithm, total_cost, runtime_ms`.")
         return
 
-    # Nettoyage
-    for c in ["total_cost", "runtime_ms", "ncccs", "msgs_total"]:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
     # Filtres
     cfa, cfi = st.columns(2)
     with cfa:
-        algos_tous = sorted(df["algorithm"].dropna().unique().tolist()) if "algorithm" in df.columns else []
+        algos_tous = sorted(map(str, df["algorithm"].dropna().unique())) if "algorithm" in df.columns else []
         algos_sel = st.multiselect("Algorithmes à afficher", algos_tous, default=algos_tous, key=f"algos_{chemin_key}")
     with cfi:
-        inst_tous = sorted(df["xml_file"].dropna().unique().tolist()) if "xml_file" in df.columns else []
+        inst_tous = sorted(map(str, df["xml_file"].dropna().unique())) if "xml_file" in df.columns else []
         inst_sel = st.multiselect("Instances à afficher", inst_tous, default=inst_tous, key=f"inst_{chemin_key}")
 
-    if "algorithm" in df.columns:
-        df = df[df["algorithm"].isin(algos_sel)]
-    if "xml_file" in df.columns:
-        df = df[df["xml_file"].isin(inst_sel)]
+    df, synth = resumer_bench(cle_source, tuple(algos_sel), tuple(inst_sel), dossier_instances.strip(), df)
     if df.empty:
         st.warning("Aucune ligne après filtrage. Ajuste tes sélections.")
         return
-
-    # Gap vs meilleur coût par instance
-    if {"xml_file", "total_cost"}.issubset(df.columns):
-        meilleur_cout = df.groupby("xml_file")["total_cost"].min().rename("meilleur_cout")
-        df = df.merge(meilleur_cout, on="xml_file", how="left")
-        df["ecart_pct"] = (df["total_cost"] - df["meilleur_cout"]) / df["meilleur_cout"] * 100
+    version = (cle_source, tuple(algos_sel), tuple(inst_sel), dossier_instances.strip())
 
     st.markdown("### 📋 Tableau filtré")
-    st.dataframe(df.sort_values(["xml_file", "algorithm"]).reset_index(drop=True))
+    if len(df) > LIGNES_AFFICHEES_MAX:
+        st.caption(f"{len(df):,} lignes — affichage des {LIGNES_AFFICHEES_MAX:,} premières.")
+    st.dataframe(df.head(LIGNES_AFFICHEES_MAX))
 
     # Synthèse
     st.markdown("### 📊 Synthèse (moyennes par algorithme)")
-    agg = {}
-    for c in ["total_cost", "runtime_ms", "ncccs", "msgs_total", "ecart_pct"]:
-        if c in df.columns:
-            agg[c] = "mean"
-    synth = df.groupby("algorithm").agg(agg).reset_index() if agg else pd.DataFrame()
     st.dataframe(synth)
 
     # Graphiques
-    def tracer_barre(series, titre, etiquette_y):
-        fig, ax = plt.subplots()
-        series.plot(kind="bar", ax=ax)
-        ax.set_title(titre)
-        ax.set_ylabel(etiquette_y)
-        ax.set_xlabel("Algorithme")
-        ax.tick_params(axis="x", rotation=45)
-        ax.grid(True, axis="y", alpha=0.3)
-        st.pyplot(fig)
-
     if not synth.empty:
         base = synth.set_index("algorithm")
         if "runtime_ms" in base.columns:
             st.markdown("#### ⏱️ Temps moyen d'exécution (ms)")
-            tracer_barre(base["runtime_ms"], "Temps moyen", "ms")
+            st.image(figure_barre(version, "Temps moyen", "ms", base["runtime_ms"]))
         if "total_cost" in base.columns:
             st.markdown("#### 💰 Coût moyen")
-            tracer_barre(base["total_cost"], "Coût moyen", "coût")
+            st.image(figure_barre(version, "Coût moyen", "coût", base["total_cost"]))
         if "msgs_total" in base.columns:
             st.markdown("#### ✉️ Messages moyens échangés")
-            tracer_barre(base["msgs_total"], "Messages moyens", "messages")
+            st.image(figure_barre(version, "Messages moyens", "messages", base["msgs_total"]))
         if "ecart_pct" in base.columns:
             st.markdown("#### Écart moyen à l’optimum (%)")
-            tracer_barre(base["ecart_pct"], "Écart moyen à l’optimum", "%")
+            st.image(figure_barre(version, "Écart moyen à l’optimum", "%", base["ecart_pct"]))
 
     # Nuage de points (Messages vs Temps)
     if {"runtime_ms", "msgs_total", "algorithm"}.issubset(df.columns):
         st.markdown("### 🟢 Nuage de points : Messages vs Temps")
-        fig, ax = plt.subplots()
-        for algo in sorted(df["algorithm"].dropna().unique()):
-            sub = df[df["algorithm"] == algo]
-            ax.scatter(sub["msgs_total"], sub["runtime_ms"], label=algo)
-        ax.set_xlabel("Messages envoyés")
-        ax.set_ylabel("Temps (ms)")
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        st.pyplot(fig)
+        st.image(figure_nuage(version, df[["algorithm", "msgs_total", "runtime_ms"]]))
 
 # ------------------------------------
 # NAV
@@ -232,6 +384,14 @@ if mode == "Générer une Instance Aléatoire":
             poids_ramassage = st.number_input("Poids ramassage (Coût de départ)", 0.0, 100.0, 1.0)
         with colD:
             poids_depot = st.number_input("Poids dépose (Coût d'arrivée)", 0.0, 100.0, 1.0)
+        encodage_capacite = st.selectbox(
+            "Encodage des capacités",
+            options=["sous_ensembles", "compteur"],
+            format_func=lambda e: (
+                "Sous-ensembles K+1 interdits (C(P, K+1) contraintes)" if e == "sous_ensembles"
+                else "Compteur séquentiel (taille linéaire en P)"
+            ),
+        )
 
     dest_commune, dest_par = None, None
     if type_depot == "Unique (commune)":
@@ -239,31 +399,36 @@ if mode == "Générer une Instance Aléatoire":
     else:
         st.info("Les destinations par passager seront générées aléatoirement (graine différente).")
 
-    if st.button("🚀 Générer Instance et Fichiers"):
-        pos_voitures = generer_positions_aleatoires(n_voitures, largeur, hauteur, graine)
-        pos_passagers = generer_positions_aleatoires(n_passagers, largeur, hauteur, graine + 1)
-
-        voitures = [(f"v{i+1}", int(cap_defaut), pos_voitures[i]) for i in range(n_voitures)]
-        passagers = [(f"p{j+1}", pos_passagers[j]) for j in range(n_passagers)]
+    st.markdown("#### 📏 Estimation avant génération")
+    generation_autorisee = afficher_estimation(
+        int(n_voitures), int(n_passagers), int(cap_defaut), modelisation, encodage_capacite
+    )
 
+    if st.button("🚀 Générer Instance et Fichiers", disabled=not generation_autorisee):
         mode_depot = "commun" if type_depot == "Unique (commune)" else "par_passager"
-        if mode_depot == "commun":
-            dest_commune = generer_positions_aleatoires(1, largeur, hauteur, graine + 500)[0]
-        else:
-            pos_dest_par = generer_positions_aleatoires(n_passagers, largeur, hauteur, graine + 999)
-            dest_par = {passagers[j][0]: pos_dest_par[j] for j in range(n_passagers)}
-
-        obj_json = construire_json_a_partir_positions(
+        obj_json = cache_instances().instance_aleatoire(
             nom_instance,
-            voitures,
-            passagers,
+            int(n_voitures),
+            int(n_passagers),
+            int(cap_defaut),
+            int(graine),
+            largeur=largeur,
+            hauteur=hauteur,
             couts_entiers=couts_entiers,
             mode_depot=mode_depot,
-            dest_commune=dest_commune,
-            dest_par_passager=dest_par,
             poids_ramassage=poids_ramassage,
             poids_depot=poids_depot,
         )
+        voitures = [(v["id"], v["capacite"], (v["pos"]["x"], v["pos"]["y"])) for v in obj_json["voitures"]]
+        passagers = [(p, (obj_json["positions_passagers"][p]["x"], obj_json["positions_passagers"][p]["y"])) for p in obj_json["passagers"]]
+        if mode_depot == "commun":
+            dest_commune = (obj_json["destination"]["x"], obj_json["destination"]["y"])
+        else:
+            dest_par = {p: (d["x"], d["y"]) for p, d in obj_json["destinations"].items()}
+        ajouter_cout_optimal(obj_json)
+        # Point de départ de l'édition incrémentale (what-if) ci-dessous, conservé entre les réexécutions
+        st.session_state["edition"] = InstanceEditable(obj_json, modelisation, encodage_capacite)
+        st.session_state.pop("edition_xml", None)
 
         st.success(f"Instance '{nom_instance}' générée avec succès (Modèle M{modelisation}).")
         col_viz, col_data = st.columns(2)
@@ -272,11 +437,145 @@ if mode == "Générer une Instance Aléatoire":
             dessiner_scene(voitures, passagers, dest_commune=dest_commune, dest_par=dest_par)
         with col_data:
             st.subheader("Téléchargements")
-            boutons_telechargement_json(obj_json, suffixe_cle="rnd", modelisation_choisie=modelisation)
+            if obj_json["cout_optimal"] is None:
+                st.warning("Capacité totale insuffisante : aucune affectation faisable.")
+            else:
+                st.metric("Coût optimal (affectation exacte)", obj_json["cout_optimal"])
+            boutons_telechargement_json(
+                obj_json, suffixe_cle="rnd", modelisation_choisie=modelisation, encodage_capacite=encodage_capacite
+            )
+            stats_cache = cache_instances().stats
+            st.caption(f"Cache d'instances : {stats_cache['succes']} succès, {stats_cache['echecs']} échecs, "
+                       f"{stats_cache['evictions']} évictions")
             st.subheader("Matrice des coûts (voitures en lignes)")
             df_costs = pd.DataFrame(obj_json["couts"]).T
             st.dataframe(df_costs)
 
+    # Édition what-if : opérations appliquées à la dernière instance générée, XML réassemblé sans régénération complète
+    if "edition" in st.session_state:
+        edition = st.session_state["edition"]
+        with st.expander(f"✏️ Édition incrémentale (what-if) — {edition.nb_voitures} voitures, "
+                         f"{edition.nb_passagers} passagers, M{edition.modelisation}", expanded=False):
+            operation = st.selectbox("Opération", OPERATIONS, format_func=lambda op: op.replace("_", " ").capitalize())
+            colE1, colE2, colE3, colE4 = st.columns(4)
+            with colE1:
+                if operation.startswith("ajouter"):
+                    prefixe, nb = ("p", edition.nb_passagers) if operation == "ajouter_passager" else ("v", edition.nb_voitures)
+                    identifiant = st.text_input("Identifiant", value=f"{prefixe}{nb + 1}")
+                else:
+                    identifiant = st.selectbox(
+                        "Identifiant", edition.passagers if operation.endswith("passager") else edition.voitures
+                    )
+            with colE2:
+                x_edit = st.number_input("x", 0.0, float(largeur), float(largeur) / 2)
+            with colE3:
+                y_edit = st.number_input("y", 0.0, float(hauteur), float(hauteur) / 2)
+            with colE4:
+                capacite_edit = st.number_input("Capacité", 0, 999, int(cap_defaut))
+            arguments = {"op": operation, "id": identifiant}
+            if operation in ("ajouter_passager", "deplacer_passager", "ajouter_voiture", "deplacer_voiture"):
+                arguments["pos"] = (x_edit, y_edit)
+            if operation in ("ajouter_voiture", "fixer_capacite"):
+                arguments["capacite"] = int(capacite_edit)
+            if operation in ("ajouter_passager", "deplacer_passager") and edition.extras.get("mode_depot") == "par_passager":
+                colD1, colD2 = st.columns(2)
+                with colD1:
+                    dest_x = st.number_input("Destination x", 0.0, float(largeur), float(largeur) / 2)
+                with colD2:
+                    dest_y = st.number_input("Destination y", 0.0, float(hauteur), float(hauteur) / 2)
+                arguments["destination"] = (dest_x, dest_y)
+
+            if st.button("✏️ Appliquer"):
+                try:
+                    debut = time.perf_counter()
+                    edition.appliquer(arguments)
+                    xml_edite = edition.vers_xml()
+                    st.session_state["edition_xml"] = (xml_edite, (time.perf_counter() - debut) * 1000)
+                except (KeyError, ValueError) as e:
+                    st.error(f"Opération refusée : {e}")
+            if "edition_xml" in st.session_state:
+                xml_edite, duree_ms = st.session_state["edition_xml"]
+                st.caption(f"Dernière opération + XML : {duree_ms:.1f} ms ({edition.stats['operations']} opération(s), "
+                           f"{edition.stats['segments_regeneres']} segment(s) régénéré(s), "
+                           f"{edition.stats['segments_reutilises']} réutilisé(s))")
+                st.download_button(
+                    f"⬇️ Télécharger XML modifié (Modèle {edition.modelisation})",
+                    data=xml_edite.encode("utf-8"),
+                    file_name=f"{edition.nom or 'instance'}_edite_M{edition.modelisation}.xml",
+                    mime="application/xml",
+                    key="xml_edition",
+                )
+                st.download_button(
+                    "⬇️ Télécharger JSON modifié",
+                    data=afficher_json_joli(edition.vers_json()).encode("utf-8"),
+                    file_name=f"{edition.nom or 'instance'}_edite.json",
+                    mime="application/json",
+                    key="json_edition",
+                )
+                st.dataframe(pd.DataFrame(edition.couts, index=edition.voitures, columns=edition.passagers))
+
+    # Lot : mêmes paramètres de coûts / dépose / encodage que ci-dessus, tailles en plages
+    st.markdown("---")
+    with st.expander("📦 Génération par lot (archive zip)", expanded=False):
+        colL1, colL2, colL3, colL4 = st.columns(4)
+        with colL1:
+            plage_voitures = st.text_input("Voitures (ex. 2-6)", value="2-3", key="lot_voitures")
+        with colL2:
+            plage_passagers = st.text_input("Passagers (ex. 4-8:2)", value="4-6:2", key="lot_passagers")
+        with colL3:
+            plage_capacites = st.text_input("Capacités (ex. 2,3)", value="2", key="lot_capacites")
+        with colL4:
+            plage_graines = st.text_input("Graines (ex. 0-4)", value="0-1", key="lot_graines")
+        modelisations_lot = st.multiselect("Modélisations", [1, 2], default=[1, 2], key="lot_modelisations")
+
+        if st.button("📦 Générer le lot"):
+            try:
+                tailles = [plage(t) for t in (plage_voitures, plage_passagers, plage_capacites, plage_graines)]
+            except ValueError:
+                tailles = None
+                st.error("Plages invalides : utilisez par ex. `2-6`, `4-8:2` ou `2,3`.")
+            if tailles is not None:
+                nb_instances = len(tailles[0]) * len(tailles[1]) * len(tailles[2]) * len(tailles[3])
+                if nb_instances == 0 or not modelisations_lot:
+                    st.warning("Aucune instance à générer.")
+                elif nb_instances > LOT_INSTANCES_MAX:
+                    st.error(f"{nb_instances} instances demandées (maximum {LOT_INSTANCES_MAX} depuis l'app) : "
+                             "utilisez `python generation_lot.py` pour les gros lots.")
+                elif any(
+                    depasse_limites(estimer_instance(V, P, K, m, encodage_capacite))
+                    for V, P, K in itertools.product(*tailles[:3]) for m in modelisations_lot
+                ):
+                    st.error("Au moins une instance du lot dépasse les limites de l'app "
+                             "(cf. estimation ci-dessus) : réduisez les plages ou passez à l'encodage compteur.")
+                else:
+                    barre = st.progress(0.0)
+                    with tempfile.TemporaryDirectory(prefix="lot_dcop_") as dossier_lot:
+                        chemin_manifeste = generer_lot(
+                            *tailles,
+                            os.path.join(dossier_lot, "instances"),
+                            tuple(modelisations_lot),
+                            encodage_capacite,
+                            cache={"dossier": cache_instances().dossier, "taille_max": cache_instances().taille_max},
+                            options={
+                                "largeur": largeur, "hauteur": hauteur, "couts_entiers": couts_entiers,
+                                "mode_depot": "commun" if type_depot == "Unique (commune)" else "par_passager",
+                                "poids_ramassage": poids_ramassage, "poids_depot": poids_depot,
+                            },
+                            progression=lambda fait, total: barre.progress(fait / total),
+                        )
+                        st.success(f"{nb_instances} instance(s) générée(s).")
+                        st.dataframe(pd.read_csv(chemin_manifeste))
+                        # L'archive est écrite fichier par fichier sur disque, puis servie depuis le fichier
+                        chemin_zip = zipper_lot(chemin_manifeste, os.path.join(dossier_lot, "lot_instances.zip"))
+                        with open(chemin_zip, "rb") as flux_zip:
+                            st.download_button(
+                                "⬇️ Télécharger le lot (zip)",
+                                data=flux_zip,
+                                file_name="lot_instances.zip",
+                                mime="application/zip",
+                                key="zip_lot",
+                            )
+
 # ==============================================================================
 # 2) ANALYSE DES RÉSULTATS (ONGLETS M1 vs M2)
 # ==============================================================================
@@ -293,6 +592,7 @@ else:
             default_csv_path="results/bench.csv",
             uploader_key="uploader_bench_m1",
             chemin_key="chemin_bench_m1",
+            modelisation=1,
         )
 
     with tab2:
@@ -302,7 +602,8 @@ else:
             default_csv_path="results/bench2.csv",
             uploader_key="uploader_bench_m2",
             chemin_key="chemin_bench_m2",
+            modelisation=2,
         )
 
     st.markdown("---")
-    st.caption("Astuce : Exécute ton lanceur pour remplir `results/bench.csv` et `results/bench2.csv`. Les logs sont dans `results/logs/`.")
+    st.caption("Astuce : Exécute `python lanceur_bench.py` pour remplir `results/bench.csv` et `results/bench2.csv`. Les logs sont dans `results/logs/`. Avec `--magasin results/magasin`, saisis ce dossier comme chemin.")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# bench_constructeurs.py — Micro-benchmarks des constructeurs d'instances (constructeur_dcop.py) :
+# temps, pic mémoire (tracemalloc) et octets produits sur une grille de tailles, comparés à une référence.
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from constructeur_dcop import (
+    VERSION_CONSTRUCTEUR,
+    InstanceCompacte,
+    construire_instance_xcsp,
+    construire_instance_xcsp_alt,
+    construire_json_a_partir_positions,
+    estimer_instance,
+    generer_positions_aleatoires,
+    json_vers_xml,
+)
+from generation_lot import aplatir, plage
+
+# Fonctions mesurées (nom du cas = nom de la fonction, suffixe _M1 / _M2 pour la modélisation)
+CAS = ("construire_json_a_partir_positions", "construire_instance_xcsp", "construire_instance_xcsp_alt",
+       "json_vers_xml_M1", "json_vers_xml_M2")
+
+def entrees(n_voitures: int, n_passagers: int, capacite: int, graine: int = 0) -> dict:
+    """Positions tirées comme generer_instance_aleatoire (destination commune) + JSON et arguments des constructeurs."""
+    pos_v = generer_positions_aleatoires(n_voitures, 100.0, 100.0, graine)
+    pos_p = generer_positions_aleatoires(n_passagers, 100.0, 100.0, graine + 1)
+    positions = {
+        "voitures": [(f"v{i+1}", int(capacite), pos_v[i]) for i in range(n_voitures)],
+        "passagers": [(f"p{j+1}", pos_p[j]) for j in range(n_passagers)],
+        "mode_depot": "commun",
+        "dest_commune": generer_positions_aleatoires(1, 100.0, 100.0, graine + 500)[0],
+    }
+    obj_json = construire_json_a_partir_positions(f"bench{n_voitures}V_{n_passagers}P_K{capacite}", **positions)
+    return {"positions": positions, "json": obj_json,
+            "arguments": InstanceCompacte.depuis_json(obj_json).arguments_constructeur()}
+
+def appel(cas: str, donnees: dict, encodage_capacite: str) -> Callable[[], object]:
+    """Fonction sans argument exécutant le cas sur des entrées déjà construites."""
+    if cas == "construire_json_a_partir_positions":
+        return lambda: construire_json_a_partir_positions("bench", **donnees["positions"])
+    if cas == "construire_instance_xcsp":
+        return lambda: construire_instance_xcsp(*donnees["arguments"], encodage_capacite=encodage_capacite)
+    if cas == "construire_instance_xcsp_alt":
+        return lambda: construire_instance_xcsp_alt(*donnees["arguments"], encodage_capacite=encodage_capacite)
+    modelisation = int(cas[-1])
+    return lambda: json_vers_xml(donnees["json"], modelisation, encodage_capacite)
+
+def octets_sortie(sortie) -> int:
+    """Taille UTF-8 du XML produit, ou du JSON sérialisé (json.dumps) pour un objet."""
+    texte = sortie if isinstance(sortie, str) else json.dumps(sortie, ensure_ascii=False)
+    return len(texte.encode("utf-8"))
+
+def mesurer(fonction: Callable[[], object], repetitions: int = 5) -> dict:
+    """
+    Un appel d'échauffement, `repetitions` appels chronométrés (GC désactivé pendant l'appel),
+    puis un appel sous tracemalloc pour le pic mémoire (les entrées, déjà construites, n'y comptent pas).
+    """
+    sortie = fonction()
+    octets = octets_sortie(sortie)
+    del sortie
+    temps = []
+    for _ in range(max(1, repetitions)):
+        gc.collect()
+        gc.disable()
+        try:
+            debut = time.perf_counter()
+            fonction()
+            temps.append(time.perf_counter() - debut)
+        finally:
+            gc.enable()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        sortie = fonction()
+        pic = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del sortie
+    return {"temps_min_s": min(temps), "temps_median_s": statistics.median(temps), "temps_max_s": max(temps),
+            "pic_memoire_octets": int(pic), "octets_sortie": octets, "repetitions": len(temps)}
+
+def octets_estimes(cas: str, n_voitures: int, n_passagers: int, capacite: int, encodage_capacite: str) -> int:
+    """Taille XML estimée (estimer_instance) pour écarter les cas trop gros avant de les construire."""
+    if cas == "construire_json_a_partir_positions":
+        return 0
+    modelisation = 2 if cas in ("construire_instance_xcsp_alt", "json_vers_xml_M2") else 1
+    return estimer_instance(n_voitures, n_passagers, capacite, modelisation, encodage_capacite)["octets_xml"]
+
+def lancer(
+    voitures: List[int],
+    passagers: List[int],
+    capacites: List[int],
+    encodages: List[str],
+    cas: List[str] = CAS,
+    repetitions: int = 5,
+    max_octets: float = 50e6,
+) -> List[dict]:
+    """
+    Mesure chaque cas sur la grille voitures × passagers × capacités × encodages. Le JSON depuis
+    positions ne dépend pas de l'encodage : mesuré une seule fois par taille (encodage vide).
+    Les cas dont le XML estimé dépasse max_octets sont sautés.
+    """
+    resultats = []
+    for V, P, K in itertools.product(voitures, passagers, capacites):
+        donnees = entrees(V, P, K)
+        for nom_cas, encodage in itertools.product(cas, encodages):
+            if nom_cas == "construire_json_a_partir_positions":
+                if encodage != encodages[0]:
+                    continue
+                encodage = ""
+            identifiant = f"{nom_cas}[V={V},P={P},K={K}" + (f",{encodage}]" if encodage else "]")
+            estimes = octets_estimes(nom_cas, V, P, K, encodage)
+            if estimes > max_octets:
+                print(f"[SKIP] {identifiant} : ~{estimes / 1e6:.0f} Mo estimés")
+                continue
+            mesure = mesurer(appel(nom_cas, donnees, encodage), repetitions)
+            resultats.append({"id": identifiant, "cas": nom_cas, "n_voitures": V, "n_passagers": P,
+                              "capacite": K, "encodage": encodage, **mesure})
+            print(f"[OK] {identifiant} : {mesure['temps_min_s'] * 1000:.2f} ms, "
+                  f"pic {mesure['pic_memoire_octets'] / 1024:.0f} Kio, {mesure['octets_sortie']} octets")
+    return resultats
+
+def metadonnees() -> dict:
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "version_constructeur": VERSION_CONSTRUCTEUR,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processeur": platform.processor(),
+    }
+
+def bruit_temps(mesure: dict) -> float:
+    """Dispersion des répétitions (médiane - min) ; 0 pour une seule répétition."""
+    return mesure.get("temps_median_s", mesure["temps_min_s"]) - mesure["temps_min_s"]
+
+def comparer(resultats: List[dict], reference: List[dict], seuil_temps: float = 0.25,
+             seuil_memoire: float = 0.10, plancher_s: float = 2e-3) -> List[dict]:
+    """
+    Ratios mesure / référence par cas commun (temps minimal, pic mémoire, octets produits).
+    Régression de temps si le temps minimal augmente de plus de seuil_temps, d'au moins
+    max(plancher_s, bruit des deux mesures), et dépasse la répétition la plus lente de la
+    référence (médiane pour les références sans temps_max_s) : un cas de quelques
+    millisecondes ne sort pas du bruit sur du code inchangé. Régression aussi si la mémoire
+    augmente de plus de seuil_memoire, ou si les octets produits changent (sortie différente).
+    """
+    par_id: Dict[str, dict] = {r["id"]: r for r in reference}
+    lignes = []
+    for r in resultats:
+        ref = par_id.get(r["id"])
+        if ref is None:
+            continue
+        ratio_temps = r["temps_min_s"] / ref["temps_min_s"] if ref["temps_min_s"] > 0 else float("nan")
+        ratio_memoire = r["pic_memoire_octets"] / ref["pic_memoire_octets"] if ref["pic_memoire_octets"] > 0 else float("nan")
+        motifs = []
+        hausse = r["temps_min_s"] - ref["temps_min_s"]
+        plus_lent_ref = ref.get("temps_max_s", ref.get("temps_median_s", ref["temps_min_s"]))
+        if (ratio_temps > 1 + seuil_temps and hausse > max(plancher_s, bruit_temps(ref), bruit_temps(r))
+                and r["temps_min_s"] > plus_lent_ref):
+            motifs.append("temps")
+        if ratio_memoire > 1 + seuil_memoire:
+            motifs.append("memoire")
+        if r["octets_sortie"] != ref["octets_sortie"]:
+            motifs.append("sortie")
+        lignes.append({"id": r["id"], "ratio_temps": ratio_temps, "ratio_memoire": ratio_memoire,
+                       "octets_sortie": r["octets_sortie"], "octets_reference": ref["octets_sortie"],
+                       "regression": motifs})
+    return lignes
+
+def charger(chemin: str) -> dict:
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+def sauver(chemin: str, resultats: List[dict]) -> None:
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"meta": metadonnees(), "resultats": resultats}, f, indent=2, ensure_ascii=False)
+
+def main():
+    ap = argparse.ArgumentParser(description="Micro-benchmarks des constructeurs d'instances (temps, pic mémoire, octets).")
+    ap.add_argument("--voitures", type=plage, nargs="+", default=[[2, 5, 10]], help='Nombres de voitures (ex. "2-6" "10")')
+    ap.add_argument("--passagers", type=plage, nargs="+", default=[[8, 20, 50]], help="Nombres de passagers")
+    ap.add_argument("--capacites", type=plage, nargs="+", default=[[2]], help="Capacités par voiture")
+    ap.add_argument("--encodages", nargs="+", choices=["sous_ensembles", "compteur"], default=["sous_ensembles", "compteur"])
+    ap.add_argument("--cas", nargs="+", choices=CAS, default=list(CAS), help="Fonctions mesurées")
+    ap.add_argument("--repetitions", type=int, default=5, help="Appels chronométrés par cas (on garde le min et la médiane)")
+    ap.add_argument("--max-octets", type=float, default=50e6, help="Cas sautés au-delà de cette taille XML estimée")
+    ap.add_argument("--sortie", default="results/bench_constructeurs.json", help="Fichier JSON des mesures")
+    ap.add_argument("--reference", default=None, help="Mesures de référence (JSON) à comparer ; code 1 si régression")
+    ap.add_argument("--seuil-temps", type=float, default=0.25, help="Hausse de temps tolérée (0.25 = +25 %%)")
+    ap.add_argument("--seuil-memoire", type=float, default=0.10, help="Hausse de pic mémoire tolérée")
+    ap.add_argument("--plancher-temps", type=float, default=2e-3, help="Hausse de temps minimale (s) pour une régression")
+    args = ap.parse_args()
+
+    resultats = lancer(
+        aplatir(args.voitures), aplatir(args.passagers), aplatir(args.capacites), args.encodages,
+        cas=args.cas, repetitions=args.repetitions, max_octets=args.max_octets,
+    )
+    sauver(args.sortie, resultats)
+    print(f"[OK] {len(resultats)} mesure(s) sauvée(s) : {args.sortie}")
+
+    if args.reference:
+        lignes = comparer(resultats, charger(args.reference)["resultats"], args.seuil_temps, args.seuil_memoire,
+                          args.plancher_temps)
+        for l in lignes:
+            etat = "REGRESSION " + "+".join(l["regression"]) if l["regression"] else "OK"
+            print(f"[{etat}] {l['id']} : temps x{l['ratio_temps']:.2f}, mémoire x{l['ratio_memoire']:.2f}")
+        regressions = [l for l in lignes if l["regression"]]
+        print(f"[INFO] {len(lignes)} cas comparé(s) à {args.reference}, {len(regressions)} régression(s).")
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# cache_instances.py
+# Cache disque adressé par contenu des instances générées (JSON) et de leurs XML,
+# avec taille maximale, éviction LRU et compteurs de succès / échecs.
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+from typing import BinaryIO, Dict, Optional
+
+from constructeur_dcop import (
+    VERSION_CONSTRUCTEUR,
+    StatsGeneration,
+    construire_json_a_partir_positions,
+    ecrire_xml,
+    generer_instance_aleatoire,
+    iterer_json_vers_xml,
+)
+
+class CacheInstances:
+    """
+    Entrées rangées sous <dossier>/<2 premiers caractères>/<clé>.<json|xml>[.gz], la clé étant le
+    SHA-256 de VERSION_CONSTRUCTEUR et de tous les paramètres de génération. L'horodatage
+    d'accès (mtime, mis à jour à chaque succès) sert à l'éviction LRU : au-delà de `taille_max`
+    octets, les entrées les moins récemment utilisées sont supprimées.
+    Plusieurs processus peuvent partager le dossier (écritures atomiques) ; les compteurs
+    `stats` sont propres à chaque objet.
+    """
+
+    def __init__(self, dossier: str = "cache_instances", taille_max: int = 512 * 1024 ** 2, compresser: bool = False):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self.compresser = compresser
+        self.stats = {"succes": 0, "echecs": 0, "evictions": 0}
+        os.makedirs(dossier, exist_ok=True)
+
+    # ---------- Clés et fichiers ----------
+    @staticmethod
+    def cle(*parties) -> str:
+        """
+        Empreinte SHA-256 (hex) de la version des constructeurs et des paramètres (sérialisés en JSON canonique).
+        Les objets non sérialisables qui offrent description() (ex. ReseauRoutier) y contribuent par celle-ci.
+        """
+        contenu = json.dumps([VERSION_CONSTRUCTEUR, *parties], sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+                             default=lambda objet: objet.description())
+        return hashlib.sha256(contenu.encode("utf-8")).hexdigest()
+
+    def _chemin(self, cle: str, extension: str) -> str:
+        suffixe = ".gz" if self.compresser else ""
+        return os.path.join(self.dossier, cle[:2], f"{cle}.{extension}{suffixe}")
+
+    def _trouver(self, cle: str, extension: str) -> Optional[str]:
+        """Chemin de l'entrée si présente (compressée ou non), en la marquant comme récemment utilisée."""
+        for chemin in (self._chemin(cle, extension), self._autre_chemin(cle, extension)):
+            if os.path.exists(chemin):
+                try:
+                    os.utime(chemin)
+                except FileNotFoundError:                   # évincée entre-temps par un autre processus
+                    continue
+                self.stats["succes"] += 1
+                return chemin
+        self.stats["echecs"] += 1
+        return None
+
+    def _autre_chemin(self, cle: str, extension: str) -> str:
+        suffixe = "" if self.compresser else ".gz"
+        return os.path.join(self.dossier, cle[:2], f"{cle}.{extension}{suffixe}")
+
+    def _ecrire(self, cle: str, extension: str, ecrire) -> str:
+        """Écrit une entrée (texte) via ecrire(flux) dans un fichier temporaire, le renomme, puis évince."""
+        chemin = self._chemin(cle, extension)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        temporaire = f"{chemin}.tmp{os.getpid()}"
+        ouvrir = gzip.open if self.compresser else open
+        with ouvrir(temporaire, "wt", encoding="utf-8") as f:
+            ecrire(f)
+        os.replace(temporaire, chemin)
+        self.evincer(garder=chemin)
+        return chemin
+
+    @staticmethod
+    def _lire_texte(chemin: str) -> str:
+        ouvrir = gzip.open if chemin.endswith(".gz") else open
+        with ouvrir(chemin, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    # ---------- Instances JSON ----------
+    def _json(self, cle: str, generer) -> dict:
+        chemin = self._trouver(cle, "json")
+        if chemin is not None:
+            return json.loads(self._lire_texte(chemin))
+        obj_json = generer()
+        self._ecrire(cle, "json", lambda f: json.dump(obj_json, f, ensure_ascii=False))
+        return obj_json
+
+    def instance_aleatoire(self, nom: str, n_voitures: int, n_passagers: int, capacite: int, graine: int, **options) -> dict:
+        """generer_instance_aleatoire(...) mis en cache (options : largeur, hauteur, mode_depot, poids...)."""
+        parametres = {"nom": nom, "n_voitures": n_voitures, "n_passagers": n_passagers,
+                      "capacite": capacite, "graine": graine, **options}
+        cle = self.cle("instance_aleatoire", parametres)
+        return self._json(cle, lambda: generer_instance_aleatoire(**parametres))
+
+    def instance_positions(self, nom: str, voitures, passagers, **options) -> dict:
+        """construire_json_a_partir_positions(...) mis en cache (sans retourner_matrice)."""
+        cle = self.cle("positions", nom, voitures, passagers, options)
+        return self._json(cle, lambda: construire_json_a_partir_positions(nom, voitures, passagers, **options))
+
+    # ---------- XML ----------
+    def chemin_xml(self, obj_json: dict, modelisation: int = 1, encodage_capacite: str = "sous_ensembles",
+                   stats: Optional[StatsGeneration] = None, placement: str = "cyclique") -> str:
+        """
+        Chemin du XML (éventuellement .gz) de cette instance, généré en flux s'il est absent.
+        La clé porte sur le contenu complet du JSON : toute modification donne une nouvelle entrée.
+        `stats` n'est rempli que si le XML est généré (échec du cache). Le placement M2 n'entre dans
+        la clé que s'il n'est pas cyclique (les entrées existantes restent valides).
+        """
+        placement = placement if modelisation == 2 else "cyclique"
+        cle = self.cle("xml", obj_json, modelisation, encodage_capacite, *([placement] if placement != "cyclique" else []))
+        chemin = self._trouver(cle, "xml")
+        if chemin is None:
+            chemin = self._ecrire(cle, "xml", lambda f: ecrire_xml(
+                f, iterer_json_vers_xml(obj_json, modelisation, encodage_capacite, stats, placement)))
+        return chemin
+
+    def ouvrir_xml(self, obj_json: dict, modelisation: int = 1, encodage_capacite: str = "sous_ensembles",
+                   stats: Optional[StatsGeneration] = None, placement: str = "cyclique") -> BinaryIO:
+        """XML en lecture binaire : fichier du cache, ou tampon décompressé pour une entrée .gz."""
+        chemin = self.chemin_xml(obj_json, modelisation, encodage_capacite, stats, placement)
+        if chemin.endswith(".gz"):
+            with gzip.open(chemin, "rb") as f:
+                return io.BytesIO(f.read())
+        return open(chemin, "rb")
+
+    def copier_xml(self, obj_json: dict, destination: str, modelisation: int = 1, encodage_capacite: str = "sous_ensembles",
+                   stats: Optional[StatsGeneration] = None, placement: str = "cyclique") -> None:
+        """Écrit le XML (décompressé) à `destination`."""
+        with self.ouvrir_xml(obj_json, modelisation, encodage_capacite, stats, placement) as source, open(destination, "wb") as cible:
+            shutil.copyfileobj(source, cible)
+
+    # ---------- Taille et éviction ----------
+    def _entrees(self):
+        for racine, _, fichiers in os.walk(self.dossier):
+            for nom in fichiers:
+                if ".tmp" in nom:
+                    continue
+                chemin = os.path.join(racine, nom)
+                try:
+                    infos = os.stat(chemin)
+                except FileNotFoundError:
+                    continue
+                yield infos.st_mtime, infos.st_size, chemin
+
+    def taille(self) -> int:
+        """Taille totale des entrées (octets)."""
+        return sum(taille for _, taille, _ in self._entrees())
+
+    def evincer(self, garder: Optional[str] = None) -> int:
+        """
+        Supprime les entrées les moins récemment utilisées jusqu'à repasser sous taille_max
+        (sauf `garder`, l'entrée qui vient d'être écrite).
+        """
+        entrees = sorted(self._entrees())
+        total = sum(taille for _, taille, _ in entrees)
+        supprimees = 0
+        for _, taille, chemin in entrees:
+            if total <= self.taille_max:
+                break
+            if chemin == garder:
+                continue
+            try:
+                os.remove(chemin)
+            except FileNotFoundError:
+                pass
+            total -= taille
+            supprimees += 1
+        self.stats["evictions"] += supprimees
+        return supprimees
+
+    def vider(self) -> None:
+        shutil.rmtree(self.dossier, ignore_errors=True)
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def statistiques(self) -> Dict[str, float]:
+        """Compteurs succès / échecs / évictions, taux de succès et taille disque."""
+        total = self.stats["succes"] + self.stats["echecs"]
+        return {**self.stats, "taux_succes": self.stats["succes"] / total if total else 0.0, "taille_octets": self.taille()}
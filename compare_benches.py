@@ -2,9 +2,17 @@
 # compare_benches.py — Comparaison M1 (bench.csv) vs M2 (bench2.csv) sans comparer les coûts
 import pandas as pd
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # sans affichage : exécutable en lot
 import matplotlib.pyplot as plt
 from pathlib import Path
 import argparse
+import itertools
+import json
+import sys
+
+import magasin_resultats
+from solveur_exact import nom_instance_depuis_xml, optima_depuis_dossier
 
 # ---------- IO utils ----------
 def read_flexible(path: Path) -> pd.DataFrame:
@@ -20,6 +28,27 @@ def coerce_numeric(df: pd.DataFrame, cols):
             df[c] = pd.to_numeric(df[c], errors="coerce")
     return df
 
+def ajouter_ecart_optimum(df: pd.DataFrame, dossier_instances: Path) -> pd.DataFrame:
+    """
+    Ajoute cout_optimal (optimum exact des instances JSON du dossier) et ecart_pct
+    (écart relatif de total_cost à cet optimum) à chaque ligne.
+    """
+    noms = df["instance_name"] if "instance_name" in df.columns else df["xml_file"].map(nom_instance_depuis_xml)
+    optima = optima_depuis_dossier(str(dossier_instances), noms.dropna().astype(str))
+    df["cout_optimal"] = noms.map(optima)
+    df["total_cost"] = pd.to_numeric(df["total_cost"], errors="coerce")
+    df["ecart_pct"] = (df["total_cost"] - df["cout_optimal"]) / df["cout_optimal"] * 100
+    return df
+
+def ajouter_graine(df: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute seed, lue dans le nom d'instance (instance{V}V_{P}P_K{K}_s{graine}) ; 0 si absente."""
+    if "seed" in df.columns:
+        return df
+    noms = df["instance_name"] if "instance_name" in df.columns else df["xml_file"].map(nom_instance_depuis_xml)
+    graines = noms.astype(str).str.extract(r"_s(\d+)$", expand=False)
+    df["seed"] = pd.to_numeric(graines, errors="coerce").fillna(0).astype(int)
+    return df
+
 # ---------- Aggregations ----------
 def algo_summary(df: pd.DataFrame, metrics):
     """
@@ -36,6 +65,157 @@ def algo_summary(df: pd.DataFrame, metrics):
     out = out.reset_index()
     return out
 
+def bootstrap_ic(valeurs, n_boot: int, niveau: float, rng: np.random.Generator):
+    """Moyenne et intervalle de confiance bootstrap (percentile) de la moyenne : (moyenne, bas, haut)."""
+    valeurs = np.asarray(valeurs, dtype=float)
+    valeurs = valeurs[np.isfinite(valeurs)]
+    if valeurs.size == 0:
+        return np.nan, np.nan, np.nan
+    moyenne = float(valeurs.mean())
+    if valeurs.size == 1 or n_boot <= 0:
+        return moyenne, moyenne, moyenne
+    moyennes = valeurs[rng.integers(0, valeurs.size, size=(n_boot, valeurs.size))].mean(axis=1)
+    alpha = (1 - niveau) / 2
+    return moyenne, float(np.quantile(moyennes, alpha)), float(np.quantile(moyennes, 1 - alpha))
+
+def _runs_par_instance(df: pd.DataFrame, metrics):
+    """
+    Une ligne par (algorithm, nb_variables, seed, instance) : les runs répétés d'une même instance
+    sont moyennés, l'instance (graine) étant l'unité rééchantillonnée par le bootstrap.
+    """
+    cles = ["algorithm", "nb_variables", "seed"] + (["instance_name"] if "instance_name" in df.columns else [])
+    metrics = [m for m in metrics if m in df.columns]
+    dff = coerce_numeric(ajouter_graine(df[[c for c in df.columns if c in cles + metrics + ["xml_file"]]].copy()),
+                         ["nb_variables"])
+    dff = dff.dropna(subset=["algorithm", "nb_variables"])
+    if dff.empty:
+        return pd.DataFrame(columns=cles + ["n_runs"] + metrics)
+    return dff.groupby(cles).agg(n_runs=("algorithm", "size"), **{m: (m, "mean") for m in metrics}).reset_index()
+
+def scaling_summary(df: pd.DataFrame, metrics, n_boot: int = 2000, niveau: float = 0.95, graine: int = 0):
+    """
+    Moyenne et IC bootstrap par (algorithm, nb_variables) sur les graines.
+    columns: algorithm, nb_variables, n_runs, n_seeds, mean_<m>, ci_low_<m>, ci_high_<m>
+    """
+    unites = _runs_par_instance(df, metrics)
+    metrics = [m for m in metrics if m in unites.columns]
+    rng = np.random.default_rng(graine)
+    lignes = []
+    for (algo, taille), groupe in unites.groupby(["algorithm", "nb_variables"], sort=True):
+        ligne = {"algorithm": algo, "nb_variables": int(taille),
+                 "n_runs": int(groupe["n_runs"].sum()), "n_seeds": int(groupe["seed"].nunique())}
+        for m in metrics:
+            ligne[f"mean_{m}"], ligne[f"ci_low_{m}"], ligne[f"ci_high_{m}"] = bootstrap_ic(groupe[m], n_boot, niveau, rng)
+        lignes.append(ligne)
+    return pd.DataFrame(lignes)
+
+def scaling_exponents(df: pd.DataFrame, metrics, n_boot: int = 2000, niveau: float = 0.95, graine: int = 0):
+    """
+    Exposant empirique b de metric ≈ a · nb_variables^b par algorithme (moindres carrés en log-log
+    sur les instances, valeurs > 0 seulement). IC bootstrap : rééchantillonnage des instances dans
+    chaque taille, les tailles restant fixes ; NaN si une taille a moins de deux instances (le
+    rééchantillonnage ne ferait que redonner la pente ponctuelle).
+    columns: algorithm, metric, exponent, ci_low, ci_high, r2, n_sizes, n_points
+    """
+    unites = _runs_par_instance(df, metrics)
+    rng = np.random.default_rng(graine)
+    alpha = (1 - niveau) / 2
+    lignes = []
+    for algo, groupe in unites.groupby("algorithm", sort=True):
+        for m in [m for m in metrics if m in groupe.columns]:
+            points = groupe.loc[groupe[m] > 0, ["nb_variables", m]].sort_values("nb_variables")
+            tailles = points["nb_variables"].to_numpy(dtype=float)
+            if points.empty or np.unique(tailles).size < 2:
+                continue
+            x = np.log(tailles)
+            y = np.log(points[m].to_numpy(dtype=float))
+            xc = x - x.mean()
+            pente = float(xc @ (y - y.mean()) / (xc @ xc))
+            residus = y - y.mean() - pente * xc
+            total = float(((y - y.mean()) ** 2).sum())
+            r2 = 1 - float(residus @ residus) / total if total > 0 else 1.0
+            bas = haut = np.nan
+            effectifs = np.unique(tailles, return_counts=True)[1]
+            if n_boot > 0 and effectifs.min() >= 2:
+                # Rééchantillonnage par taille ; x inchangé donc pente = xc·(Y - moyenne(Y)) / xc·xc
+                echantillons = np.empty((n_boot, y.size))
+                debut = 0
+                for n in effectifs:
+                    echantillons[:, debut:debut + n] = y[debut + rng.integers(0, n, size=(n_boot, n))]
+                    debut += n
+                pentes = (echantillons - echantillons.mean(axis=1, keepdims=True)) @ xc / (xc @ xc)
+                bas, haut = float(np.quantile(pentes, alpha)), float(np.quantile(pentes, 1 - alpha))
+            lignes.append({"algorithm": algo, "metric": m, "exponent": pente, "ci_low": bas, "ci_high": haut,
+                           "r2": r2, "n_sizes": int(np.unique(tailles).size), "n_points": int(y.size)})
+    return pd.DataFrame(lignes)
+
+# ---------- Regression gate ----------
+def lire_run(chemin: Path, colonnes) -> pd.DataFrame:
+    """Un jeu de résultats : CSV, magasin Parquet, ou dossier contenant bench.csv / bench2.csv."""
+    if chemin.is_dir():
+        if magasin_resultats.partitions(str(chemin)):
+            df = magasin_resultats.lire(str(chemin), colonnes)
+            df["algorithm"] = df["algorithm"].astype(str)
+            return df
+        morceaux = [read_flexible(chemin / nom) for nom in ("bench.csv", "bench2.csv") if (chemin / nom).exists()]
+        return pd.concat(morceaux, ignore_index=True) if morceaux else pd.DataFrame(columns=colonnes)
+    return read_flexible(chemin)
+
+def apparier_runs(df_ref: pd.DataFrame, df_new: pd.DataFrame, metrics) -> pd.DataFrame:
+    """
+    Lignes présentes dans les deux runs, appariées sur (xml_file, algorithm) ; les runs répétés
+    sont moyennés. columns: xml_file, algorithm, <m>_ref, <m>_new
+    """
+    def moyennes(df):
+        df = coerce_numeric(df.dropna(subset=["xml_file", "algorithm"]).copy(), metrics)
+        df["algorithm"] = df["algorithm"].astype(str)
+        return df.groupby(["xml_file", "algorithm"])[[m for m in metrics if m in df.columns]].mean()
+    return moyennes(df_ref).join(moyennes(df_new), how="inner", lsuffix="_ref", rsuffix="_new").reset_index()
+
+def test_permutation_apparie(ref, new, n_perm: int, rng: np.random.Generator):
+    """
+    Test apparié sur d = log(new / ref) (paires > 0 seulement), H1 : new > ref. La statistique est
+    la moyenne de d, sa loi sous H0 est obtenue par inversion aléatoire des signes (énumération
+    exacte jusqu'à 16 paires). Retourne (n, ratio géométrique exp(moyenne d), p-valeur unilatérale).
+    """
+    ref, new = np.asarray(ref, dtype=float), np.asarray(new, dtype=float)
+    garde = np.isfinite(ref) & np.isfinite(new) & (ref > 0) & (new > 0)
+    d = np.log(new[garde] / ref[garde])
+    if d.size == 0:
+        return 0, np.nan, np.nan
+    observe = d.mean()
+    exact = d.size <= 16
+    if exact:
+        signes = np.array(list(itertools.product((1.0, -1.0), repeat=d.size)))
+    else:
+        signes = rng.choice((1.0, -1.0), size=(n_perm, d.size))
+    extremes = np.count_nonzero(signes @ d / d.size >= observe - 1e-12)
+    p = extremes / len(signes) if exact else (extremes + 1) / (n_perm + 1)
+    return int(d.size), float(np.exp(observe)), float(p)
+
+def regression_report(paires: pd.DataFrame, metrics, seuil_pct: float = 10.0, alpha: float = 0.05,
+                      n_perm: int = 10000, graine: int = 0):
+    """
+    Une entrée par (algorithm, metric), plus algorithm="*" (toutes lignes) : variation relative
+    (ratio géométrique new/ref - 1, en %) et p-valeur. Régression si variation > seuil_pct et p < alpha.
+    """
+    rng = np.random.default_rng(graine)
+    groupes = [("*", paires)] + list(paires.groupby("algorithm", sort=True))
+    entrees = []
+    for algo, groupe in groupes:
+        for m in metrics:
+            if f"{m}_ref" not in groupe.columns or f"{m}_new" not in groupe.columns:
+                continue
+            n, ratio, p = test_permutation_apparie(groupe[f"{m}_ref"], groupe[f"{m}_new"], n_perm, rng)
+            variation = (ratio - 1) * 100 if n else None
+            entrees.append({
+                "algorithm": algo, "metric": m, "n_pairs": n,
+                "ratio": None if n == 0 else ratio, "change_pct": variation,
+                "p_value": None if n == 0 else p,
+                "regression": bool(n and variation > seuil_pct and p < alpha),
+            })
+    return entrees
+
 # ---------- Plots ----------
 def grouped_bar_compare(df_m1, df_m2, metric_mean_col, title, ylabel, out_png: Path):
     """
@@ -64,8 +244,42 @@ def grouped_bar_compare(df_m1, df_m2, metric_mean_col, title, ylabel, out_png: P
     ax.legend()
     ax.grid(True, axis="y", alpha=0.3)
     fig.tight_layout()
-    plt.savefig(out_png, dpi=150)
-    plt.show()
+    fig.savefig(out_png, dpi=150)
+    plt.close(fig)
+    print(f"[OK] Sauvé : {out_png}")
+
+def scaling_curves_compare(sc_m1, sc_m2, metric, title, ylabel, out_png: Path):
+    """
+    sc_m1/sc_m2: sorties de scaling_summary. Courbes log-log moyenne (± IC) vs nb_variables,
+    une couleur par algorithme, M1 en trait plein et M2 en pointillés.
+    """
+    col = f"mean_{metric}"
+    algos = sorted(set(sc_m1.get("algorithm", [])) | set(sc_m2.get("algorithm", [])))
+    if not algos or col not in sc_m1.columns and col not in sc_m2.columns:
+        print(f"[WARN] Aucune donnée de passage à l'échelle pour {metric}.")
+        return
+    couleurs = dict(zip(algos, plt.rcParams["axes.prop_cycle"].by_key()["color"] * len(algos)))
+    fig, ax = plt.subplots()
+    for sc, nom_modele, style in ((sc_m1, "M1", "o-"), (sc_m2, "M2", "s--")):
+        if col not in sc.columns:
+            continue
+        for algo, groupe in sc.groupby("algorithm", sort=True):
+            groupe = groupe[groupe[col] > 0].sort_values("nb_variables")
+            if groupe.empty:
+                continue
+            ax.plot(groupe["nb_variables"], groupe[col], style, color=couleurs[algo], label=f"{algo} {nom_modele}")
+            ax.fill_between(groupe["nb_variables"], groupe[f"ci_low_{metric}"].clip(lower=groupe[col].min() * 1e-3),
+                            groupe[f"ci_high_{metric}"], color=couleurs[algo], alpha=0.15)
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_title(title)
+    ax.set_xlabel("nb_variables")
+    ax.set_ylabel(ylabel)
+    ax.legend(fontsize="small")
+    ax.grid(True, which="both", alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(out_png, dpi=150)
+    plt.close(fig)
     print(f"[OK] Sauvé : {out_png}")
 
 # ---------- Main ----------
@@ -74,6 +288,21 @@ def main():
     ap.add_argument("--bench", default="results/bench.csv", help="CSV Modélisation 1")
     ap.add_argument("--bench2", default="results/bench2.csv", help="CSV Modélisation 2")
     ap.add_argument("--outdir", default="results/figs_compare", help="Dossier de sortie des figures")
+    ap.add_argument("--instances", default=None,
+                    help="Dossier des instances JSON : écart de coût à l'optimum exact par algorithme (optionnel)")
+    ap.add_argument("--magasin", default=None,
+                    help="Magasin Parquet (magasin_resultats) à lire au lieu de --bench / --bench2")
+    ap.add_argument("--bootstrap", type=int, default=2000,
+                    help="Rééchantillonnages bootstrap des IC et exposants de passage à l'échelle (0 : sans IC)")
+    ap.add_argument("--niveau", type=float, default=0.95, help="Niveau de confiance des IC")
+    ap.add_argument("--graine", type=int, default=0, help="Graine du bootstrap et des permutations")
+    ap.add_argument("--regression", nargs=2, metavar=("REF", "NEW"), default=None,
+                    help="Mode régression : compare deux runs (CSV, magasin ou dossier de bench*.csv) au lieu de M1 vs M2")
+    ap.add_argument("--seuil-regression", type=float, default=10.0,
+                    help="Hausse relative (%%) au-delà de laquelle une métrique significativement plus haute est une régression")
+    ap.add_argument("--alpha", type=float, default=0.05, help="Seuil de significativité du test apparié")
+    ap.add_argument("--permutations", type=int, default=10000, help="Permutations du test apparié (> 16 paires)")
+    ap.add_argument("--rapport", default=None, help="Rapport JSON du mode régression (défaut : <outdir>/regression_report.json)")
     args = ap.parse_args()
 
     p1 = Path(args.bench).expanduser().resolve()
@@ -81,12 +310,43 @@ def main():
     outdir = Path(args.outdir).expanduser().resolve()
     outdir.mkdir(parents=True, exist_ok=True)
 
-    # Lecture
-    df1 = read_flexible(p1)
-    df2 = read_flexible(p2)
+    metrics = ["runtime_ms", "msgs_total", "ncccs"]
+
+    # Mode régression : code de sortie 1 si une métrique régresse, 2 si aucune ligne commune
+    if args.regression:
+        ref, new = (Path(c).expanduser().resolve() for c in args.regression)
+        paires = apparier_runs(lire_run(ref, ["xml_file", "algorithm"] + metrics),
+                               lire_run(new, ["xml_file", "algorithm"] + metrics), metrics)
+        entrees = regression_report(paires, metrics, args.seuil_regression, args.alpha, args.permutations, args.graine)
+        regressions = [e for e in entrees if e["regression"]]
+        rapport = {
+            "reference": str(ref), "candidate": str(new), "n_pairs": len(paires),
+            "threshold_pct": args.seuil_regression, "alpha": args.alpha,
+            "status": "no_pairs" if paires.empty else ("regression" if regressions else "ok"),
+            "results": entrees,
+        }
+        chemin_rapport = Path(args.rapport).expanduser().resolve() if args.rapport else outdir / "regression_report.json"
+        chemin_rapport.write_text(json.dumps(rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+        for e in entrees:
+            if e["n_pairs"]:
+                print(f"[{'REGRESSION' if e['regression'] else 'OK'}] {e['algorithm']} / {e['metric']} : "
+                      f"{e['change_pct']:+.1f}% (p={e['p_value']:.3g}, n={e['n_pairs']})")
+        print(f"[OK] Rapport sauvé : {chemin_rapport}")
+        if paires.empty:
+            print("[ERR] Aucun couple (xml_file, algorithm) commun aux deux runs.")
+            sys.exit(2)
+        sys.exit(1 if regressions else 0)
+
+    # Lecture (magasin : seulement les colonnes utiles, partition par modélisation)
+    if args.magasin:
+        colonnes = ["algorithm", "xml_file", "instance_name", "nb_variables"] + metrics + (["total_cost"] if args.instances else [])
+        df1 = magasin_resultats.lire(args.magasin, colonnes, modelisations=[1])
+        df2 = magasin_resultats.lire(args.magasin, colonnes, modelisations=[2])
+    else:
+        df1 = read_flexible(p1)
+        df2 = read_flexible(p2)
 
     # Coercition numérique (SANS total_cost)
-    metrics = ["runtime_ms", "msgs_total", "ncccs"]
     df1 = coerce_numeric(df1, metrics)
     df2 = coerce_numeric(df2, metrics)
 
@@ -109,6 +369,41 @@ def main():
     sum_m2.to_csv(sum_m2_path, index=False)
     print(f"[OK] Synthèses sauvées: {sum_m1_path} ; {sum_m2_path}")
 
+    # Écart à l'optimum exact (chaque modélisation contre son propre optimum)
+    if args.instances:
+        dossier_instances = Path(args.instances).expanduser().resolve()
+        for df, nom_modele in ((df1, "M1"), (df2, "M2")):
+            if "total_cost" not in df.columns:
+                continue
+            ecarts = algo_summary(ajouter_ecart_optimum(df, dossier_instances), ["ecart_pct"])
+            chemin_ecarts = outdir / f"gap_{nom_modele}.csv"
+            ecarts.to_csv(chemin_ecarts, index=False)
+            print(f"[OK] Écarts à l'optimum {nom_modele} sauvés: {chemin_ecarts}")
+
+    # Passage à l'échelle : IC bootstrap par taille, exposants log-log, courbes M1 vs M2
+    if "nb_variables" in df1.columns and "nb_variables" in df2.columns:
+        options_boot = {"n_boot": args.bootstrap, "niveau": args.niveau, "graine": args.graine}
+        sc_m1 = scaling_summary(df1, metrics, **options_boot)
+        sc_m2 = scaling_summary(df2, metrics, **options_boot)
+        sc_m1.to_csv(outdir / "scaling_M1.csv", index=False)
+        sc_m2.to_csv(outdir / "scaling_M2.csv", index=False)
+        exposants = pd.concat([
+            scaling_exponents(df, metrics, **options_boot).assign(modelisation=nom_modele)
+            for df, nom_modele in ((df1, "M1"), (df2, "M2"))
+        ], ignore_index=True)
+        if not exposants.empty:
+            exposants = exposants[["modelisation"] + [c for c in exposants.columns if c != "modelisation"]]
+        exposants.to_csv(outdir / "scaling_exponents.csv", index=False)
+        print(f"[OK] Passage à l'échelle sauvé: {outdir / 'scaling_M1.csv'} ; {outdir / 'scaling_M2.csv'} ; "
+              f"{outdir / 'scaling_exponents.csv'}")
+        for metric, titre, ylabel in (("runtime_ms", "Temps d'exécution", "ms"),
+                                      ("msgs_total", "Messages échangés", "messages"),
+                                      ("ncccs", "NCCCs", "NCCCs")):
+            scaling_curves_compare(sc_m1, sc_m2, metric, f"{titre} vs nb_variables — M1 vs M2 (log-log)",
+                                   ylabel, outdir / f"scaling_{metric}.png")
+    else:
+        print("[WARN] Colonne nb_variables absente : pas d'analyse de passage à l'échelle.")
+
     # Graphes comparatifs (moyennes)
     if "mean_runtime_ms" in m1.columns and "mean_runtime_ms" in m2.columns:
         grouped_bar_compare(
@@ -1,12 +1,270 @@
 # constructeur_dcop.py
+from collections import Counter
 from itertools import combinations
 from xml.sax.saxutils import escape
-import math, json, random
-from typing import Dict, List, Tuple
+import math, json, os, random, time
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
 
 # Constante pour l'infini (utilisée dans la modélisation 1 & 2)
 INFINITY_COST = "infinity"
 
+# Version des constructeurs : à incrémenter dès que le JSON ou le XML produit change
+# (elle entre dans la clé du cache d'instances, cf. cache_instances.py)
+VERSION_CONSTRUCTEUR = "1"
+
+# Encodages disponibles pour les contraintes de capacité :
+#  - "sous_ensembles" : interdiction de chaque sous-ensemble de K+1 passagers (C(P, K+1) contraintes)
+#  - "compteur"       : décomposition en compteur séquentiel (variables auxiliaires 0..K, O(P) contraintes)
+ENCODAGES_CAPACITE = ("sous_ensembles", "compteur")
+
+# Coût des couples (voiture, passager) écartés par l'élagage des candidats (cf. candidats_proches) :
+# absents du JSON, ni variable x_ij (M1) ni valeur du domaine de y_j (M2) dans le XML
+COUT_NON_CANDIDAT = int(np.iinfo(np.int32).max)
+
+# Placements des variables y_j de la Modélisation 2 sur les agents (cf. placer_variables_m2) :
+#  - "cyclique"    : y_j hébergée par la voiture j mod N (historique)
+#  - "plus_proche" : voiture de coût minimal pour le passager
+#  - "partition"   : coupe entre agents minimale sous une charge maximale par agent
+PLACEMENTS = ("cyclique", "plus_proche", "partition")
+
+def _verifier_encodage(encodage_capacite: str) -> None:
+    if encodage_capacite not in ENCODAGES_CAPACITE:
+        raise ValueError(
+            f"Encodage de capacité inconnu '{encodage_capacite}'. Choisissez parmi {ENCODAGES_CAPACITE}."
+        )
+
+def _tuples_compteur(K: int, valeurs: List[int], valeur_comptee: int, initial: bool) -> List[str]:
+    """
+    Tuples autorisés (coût 0) d'un pas de compteur séquentiel borné par K.
+    initial=True  : portée (val, s)        avec s = [val == valeur_comptee]
+    initial=False : portée (s_prec, val, s) avec s = s_prec + [val == valeur_comptee] <= K
+    """
+    tuples = []
+    precedents = [0] if initial else range(K + 1)
+    for s_prec in precedents:
+        for val in valeurs:
+            s = s_prec + (1 if val == valeur_comptee else 0)
+            if s > K:
+                continue
+            tuples.append(f"0: {val} {s}" if initial else f"0: {s_prec} {val} {s}")
+    return tuples
+
+class _RegistreRelations:
+    """
+    Relations dédupliquées par contenu : chaque corps (arité, defaultCost, tuples) distinct
+    n'est émis qu'une fois, les contraintes suivantes référencent le nom déjà enregistré.
+    """
+
+    def __init__(self):
+        self._nom_par_contenu: Dict[Tuple[int, str, int, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._nom_par_contenu)
+
+    def enregistrer(self, nom: str, arity: int, nb_tuples: int, corps: str, default_cost: str = "0") -> Optional[str]:
+        """Retourne la ligne <relation> si ce contenu est nouveau, None s'il a déjà été émis."""
+        cle = (arity, default_cost, nb_tuples, corps)
+        if cle in self._nom_par_contenu:
+            return None
+        self._nom_par_contenu[cle] = nom
+        return f'    <relation name="{nom}" arity="{arity}" semantics="soft" defaultCost="{default_cost}" nbTuples="{nb_tuples}">{corps}</relation>'
+
+    def nom(self, arity: int, nb_tuples: int, corps: str, default_cost: str = "0") -> str:
+        """Nom de la relation (déjà enregistrée) portant ce contenu."""
+        return self._nom_par_contenu[(arity, default_cost, nb_tuples, corps)]
+
+class StatsGeneration:
+    """
+    Mesures par phase d'une génération XML, remplies par les constructeurs quand on leur passe
+    `stats=StatsGeneration()` (avec stats=None, rien n'est mesuré ni alloué).
+    Par phase : temps_s (temps passé à produire les lignes, hors consommateur), elements
+    (contraintes, variables, relations ou lignes selon la phase), octets (UTF-8 des lignes émises,
+    saut de ligne compris) et taille_max (plus grande structure conservée en mémoire).
+    """
+
+    PHASES = ("validation", "variables", "couts", "amo", "tout_zero", "capacite", "registre_relations", "assemblage")
+
+    def __init__(self):
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def ajouter(self, phase: str, temps_s: float = 0.0, elements: int = 0, octets: int = 0, taille_max: int = 0) -> None:
+        mesure = self.phases.setdefault(phase, {"temps_s": 0.0, "elements": 0, "octets": 0, "taille_max": 0})
+        mesure["temps_s"] += temps_s
+        mesure["elements"] += elements
+        mesure["octets"] += octets
+        mesure["taille_max"] = max(mesure["taille_max"], taille_max)
+
+    @property
+    def temps_total_s(self) -> float:
+        return sum(mesure["temps_s"] for mesure in self.phases.values())
+
+    def lignes(self) -> List[dict]:
+        """Une ligne par phase mesurée, dans l'ordre de PHASES (pour un DataFrame ou un CSV)."""
+        ordre = sorted(self.phases, key=lambda p: self.PHASES.index(p) if p in self.PHASES else len(self.PHASES))
+        return [{"phase": phase, **self.phases[phase]} for phase in ordre]
+
+    def resume(self) -> str:
+        """Temps par phase sur une ligne (journaux) : "validation=0.1ms variables=2.3ms ... total=12.0ms"."""
+        morceaux = [f"{l['phase']}={l['temps_s'] * 1000:.1f}ms" for l in self.lignes() if l["temps_s"] > 0]
+        return " ".join(morceaux + [f"total={self.temps_total_s * 1000:.1f}ms"])
+
+def _mesurer_lignes(stats: StatsGeneration, phase: str, lignes: Iterator[str]) -> Iterator[str]:
+    """Relaie les lignes en cumulant dans `stats` le temps passé à les produire, leur nombre et leurs octets."""
+    horloge = time.perf_counter
+    temps_s, nb, octets = 0.0, 0, 0
+    try:
+        debut = horloge()
+        for ligne in lignes:
+            temps_s += horloge() - debut
+            nb += 1
+            octets += len(ligne.encode("utf-8")) + 1
+            yield ligne
+            debut = horloge()
+        temps_s += horloge() - debut
+    finally:
+        stats.ajouter(phase, temps_s, nb, octets)
+
+def _assembler(lignes: Iterator[str], stats: Optional[StatsGeneration] = None) -> str:
+    """"\n".join(lignes) ; avec stats, la liste des lignes et le join sont mesurés (phase « assemblage »)."""
+    if stats is None:
+        return "\n".join(lignes)
+    liste = list(lignes)
+    debut = time.perf_counter()
+    texte = "\n".join(liste)
+    stats.ajouter("assemblage", time.perf_counter() - debut, len(liste), len(texte.encode("utf-8")), len(liste))
+    return texte
+
+def _matrice_couts(voitures: List[str], passagers: List[str], couts) -> np.ndarray:
+    """
+    Coûts sous forme de matrice |V| x |P| (voitures en lignes), à partir du dict (v, p) -> coût
+    ou directement d'un tableau 2-D (InstanceCompacte.couts, éventuellement memmap).
+    """
+    if isinstance(couts, np.ndarray):
+        if couts.shape != (len(voitures), len(passagers)):
+            raise ValueError(
+                f"Matrice de coûts de forme {couts.shape}, attendue ({len(voitures)}, {len(passagers)})"
+            )
+        # Coûts flottants tronqués comme int()
+        return couts if np.issubdtype(couts.dtype, np.integer) else couts.astype(np.int64)
+    for v in voitures:
+        for p in passagers:
+            if (v, p) not in couts:
+                raise ValueError(f"Coût manquant pour ({v},{p})")
+    return np.array(
+        [[int(couts[(v, p)]) for p in passagers] for v in voitures], dtype=np.int64
+    ).reshape(len(voitures), len(passagers))
+
+def _candidats(matrice: np.ndarray) -> Optional[np.ndarray]:
+    """Masque |V| x |P| des couples candidats si la matrice en écarte (COUT_NON_CANDIDAT), None sinon."""
+    masque = np.asarray(matrice) != COUT_NON_CANDIDAT
+    return None if masque.all() else masque
+
+def _listes_candidats(matrice: np.ndarray) -> Tuple[List, List]:
+    """
+    (voitures candidates de chaque passager, passagers candidats de chaque voiture), indices à partir
+    de 1 comme dans les noms XCSP ; toutes les voitures / tous les passagers sans élagage.
+    """
+    nb_voitures, nb_passagers = np.asarray(matrice).shape
+    masque = _candidats(matrice)
+    if masque is None:
+        return [range(1, nb_voitures + 1)] * nb_passagers, [range(1, nb_passagers + 1)] * nb_voitures
+    return _grouper_indices(masque.T), _grouper_indices(masque)
+
+def _grouper_indices(masque: np.ndarray) -> List[List[int]]:
+    """Indices (à partir de 1) des colonnes vraies de chaque ligne du masque, en une passe NumPy."""
+    lignes, colonnes = np.nonzero(masque)
+    coupures = np.cumsum(np.bincount(lignes, minlength=masque.shape[0]))[:-1]
+    return [groupe.tolist() for groupe in np.split(colonnes + 1, coupures)]
+
+def _relation_compteur(K: int, valeurs: List[int], valeur_comptee: int, initial: bool) -> tuple:
+    """Clé de contenu (arité, defaultCost, nbTuples, corps) d'un pas de compteur, comme dans le registre des relations."""
+    tuples = _tuples_compteur(K, valeurs, valeur_comptee, initial)
+    return (2 if initial else 3, INFINITY_COST, len(tuples), " | ".join(tuples))
+
+def _resume_tailles(nb_agents: int, nb_variables: int, nb_relations: int, arites: Counter, domaines: Dict[str, int]) -> dict:
+    arites = {a: n for a, n in sorted(arites.items()) if n}
+    return {
+        "nb_agents": nb_agents,
+        "nb_variables": nb_variables,
+        "nb_relations": nb_relations,
+        "nb_contraintes": sum(arites.values()),
+        "max_arity": max(arites, default=1),
+        "domaines": domaines,
+        "arites": arites,
+    }
+
+def _ligne_contrainte(nom_contrainte: str, arity: int, portee: str, nom_rel: str) -> str:
+    return f'    <constraint name="{nom_contrainte}" arity="{arity}" scope="{portee}" reference="{nom_rel}"/>'
+
+def _iterer_relations_contraintes(enumeration, nb_relations: int, nb_contraintes: int) -> Iterator[str]:
+    """
+    Émet les sections <relations> puis <constraints> à partir d'une énumération rejouable
+    (fonction sans argument retournant un générateur de _contraintes_m1 / _contraintes_m2).
+    Seul le registre des relations distinctes est conservé entre les deux passes.
+    """
+    relations = _RegistreRelations()
+    yield f'  <relations nbRelations="{nb_relations}">'
+    for relation, _, _ in enumeration():
+        ligne = relations.enregistrer(*relation)
+        if ligne is not None:
+            yield ligne
+    yield '  </relations>'
+
+    yield f'  <constraints nbConstraints="{nb_contraintes}">'
+    for (_, arity, nb_tuples, corps, default_cost), nom_contrainte, portee in enumeration():
+        yield _ligne_contrainte(nom_contrainte, arity, portee, relations.nom(arity, nb_tuples, corps, default_cost))
+    yield '  </constraints>'
+
+def _famille_contrainte(nom_contrainte: str) -> str:
+    """Phase de StatsGeneration d'une contrainte, d'après le préfixe de son nom (cout_ / c_ : coûts unaires)."""
+    for prefixe, famille in (("amo_", "amo"), ("pas_de_tout_zero_", "tout_zero"), ("cap_", "capacite"), ("cpt_", "capacite")):
+        if nom_contrainte.startswith(prefixe):
+            return famille
+    return "couts"
+
+def _iterer_relations_contraintes_mesurees(enumeration, nb_relations: int, nb_contraintes: int, stats: StatsGeneration) -> Iterator[str]:
+    """
+    _iterer_relations_contraintes avec cumul dans `stats`, par famille de contraintes (couts, amo,
+    tout_zero, capacite), du temps des deux passes, du nombre de contraintes et des octets émis ;
+    taille du registre des relations dans la phase « registre_relations ».
+    """
+    horloge = time.perf_counter
+    relations = _RegistreRelations()
+    cumuls: Dict[str, List[float]] = {}                   # famille -> [temps_s, contraintes, octets]
+
+    def cumuler(famille, debut, ligne, contrainte):
+        cumul = cumuls.setdefault(famille, [0.0, 0, 0])
+        cumul[0] += horloge() - debut
+        cumul[1] += contrainte
+        if ligne is not None:
+            cumul[2] += len(ligne.encode("utf-8")) + 1
+
+    try:
+        yield f'  <relations nbRelations="{nb_relations}">'
+        debut = horloge()
+        for relation, nom_contrainte, _ in enumeration():
+            ligne = relations.enregistrer(*relation)
+            cumuler(_famille_contrainte(nom_contrainte), debut, ligne, 0)
+            if ligne is not None:
+                yield ligne
+            debut = horloge()
+        yield '  </relations>'
+        stats.ajouter("registre_relations", elements=len(relations), taille_max=len(relations))
+
+        yield f'  <constraints nbConstraints="{nb_contraintes}">'
+        debut = horloge()
+        for (_, arity, nb_tuples, corps, default_cost), nom_contrainte, portee in enumeration():
+            ligne = _ligne_contrainte(nom_contrainte, arity, portee, relations.nom(arity, nb_tuples, corps, default_cost))
+            cumuler(_famille_contrainte(nom_contrainte), debut, ligne, 1)
+            yield ligne
+            debut = horloge()
+        yield '  </constraints>'
+    finally:
+        for famille, (temps_s, nb, octets) in cumuls.items():
+            stats.ajouter(famille, temps_s, int(nb), int(octets))
+
 def euclid(a: Tuple[float,float], b: Tuple[float,float]) -> float:
     """Calcule la distance euclidienne entre deux points (tuples de flottants)."""
     return math.hypot(a[0]-b[0], a[1]-b[1])
@@ -15,264 +273,666 @@ def euclid(a: Tuple[float,float], b: Tuple[float,float]) -> float:
 # MODÉLISATION 1 : Variable par Voiture-Passager (x_ij = 1 si voiture i prend passager j)
 # ======================================================================
 
-def construire_instance_xcsp(
+def _contraintes_m1(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite):
+    """
+    Énumère les contraintes de la Modélisation 1 dans l'ordre d'émission.
+    Chaque élément : ((nom_rel, arity, nbTuples, corps, defaultCost), nom_contrainte, portée).
+    """
+    nb_voitures = len(voitures)
+    # Couples candidats (tous sans élagage) : seuls les x_ij correspondants existent
+    voitures_de, passagers_de = _listes_candidats(matrice)
+
+    # 5. Contraintes de Coûts Unitaires (Soft)
+    for i in range(1, nb_voitures+1):
+        ligne = matrice[i-1].tolist()
+        for j in passagers_de[i-1]:
+            nom_var = f"x{i}{j}"
+            cout = int(ligne[j-1])
+            # Coût 'cout' si la variable prend la valeur 1 (relation partagée par toutes les variables de même coût)
+            yield (f"Cout_{cout}", 1, 1, f"{cout}: 1", "0"), f"cout_{nom_var}", nom_var
+
+    # 6. Contraintes d'Unicité par Passager (AMO + Interdiction Tout-Zéro)
+    for j, p in enumerate(passagers, start=1):
+        candidates = voitures_de[j-1]
+        # A. AMO (Au Plus Une) : pour chaque paire de voitures, interdire (1,1)
+        for i1, i2 in combinations(candidates, 2):
+            yield ("AMO", 2, 1, f"{INFINITY_COST}: 1 1", "0"), f"amo_{p}_{i1}_{i2}", f"x{i1}{j} x{i2}{j}"
+        # B. Au Moins Une (interdiction du tout-zéro sur toutes les voitures candidates pour ce passager)
+        zeros = " ".join("0" for _ in candidates)
+        toutes_vars = " ".join(f"x{i}{j}" for i in candidates)
+        yield ((f"PAS_DE_TOUT_ZERO_{len(candidates)}", len(candidates), 1, f"{INFINITY_COST}: {zeros}", "0"),
+               f"pas_de_tout_zero_{p}", toutes_vars)
+
+    # 7. Contraintes de Capacité par Voiture (Interdiction Tout-Un sur K+1, ou compteur séquentiel)
+    for i, v in enumerate(voitures, start=1):
+        K = int(capacite_par_voiture[v])
+        candidats_i = passagers_de[i-1]
+        if K >= len(candidats_i):
+            continue
+        if encodage_capacite == "compteur":
+            # s_i_1 = x_i1 ; s_i_j = s_i_(j-1) + x_ij ; le domaine {0..K} borne la somme
+            relations = {}
+            for initial in (True, False):
+                tuples = _tuples_compteur(K, [0, 1], 1, initial)
+                relations[initial] = (f"CPT_INIT_K{K}" if initial else f"CPT_K{K}", 2 if initial else 3,
+                                      len(tuples), " | ".join(tuples), INFINITY_COST)
+            precedent = None
+            for j in candidats_i:
+                initial = precedent is None
+                portee_str = f"x{i}{j} s{i}_{j}" if initial else f"s{i}_{precedent} x{i}{j} s{i}_{j}"
+                yield relations[initial], f"cpt_{v}_{j}", portee_str
+                precedent = j
+            continue
+        uns = " ".join("1" for _ in range(K + 1))
+        for idx, sous_ensemble in enumerate(combinations(candidats_i, K + 1), start=1):
+            portee_str = " ".join(f"x{i}{j}" for j in sous_ensemble)
+            yield (f"CAP_AU_PLUS_{K}", K+1, 1, f"{INFINITY_COST}: {uns}", "0"), f"cap_{v}_{idx}", portee_str
+
+def _dimensions_m1(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite) -> dict:
+    """
+    Tailles de la Modélisation 1 en forme close (relations dédupliquées) : agents, variables,
+    relations, contraintes, arité max (maxConstraintArity), domaines et histogramme des arités.
+    """
+    capacites_par_voiture = [int(capacite_par_voiture[v]) for v in voitures]
+    masque = _candidats(matrice)
+    if masque is not None:
+        # Une relation unaire Cout_{c} par coût distinct des couples candidats
+        return _tailles_elaguees_m1(masque, capacites_par_voiture, len(np.unique(matrice[masque])), encodage_capacite)
+    # Une relation unaire Cout_{c} par coût distinct
+    return _tailles_m1(len(voitures), len(passagers), capacites_par_voiture, len(np.unique(matrice)), encodage_capacite)
+
+def _tailles_elaguees_m1(masque: np.ndarray, capacites_par_voiture, nb_relations_couts, encodage_capacite) -> dict:
+    """
+    Formules de _dimensions_m1 pour une instance élaguée, à partir des candidats par voiture (n_i) et
+    par passager (m_j) : n_i unaires et C(n_i, K+1) capacités (ou n_i pas de compteur) par voiture,
+    C(m_j, 2) AMO et un tout-zéro d'arité m_j par passager. Relations distinctes comptées sur leur
+    contenu, comme le registre du constructeur (une capacité par K, un tout-zéro par arité...).
+    """
+    par_voiture = masque.sum(axis=1).tolist()
+    par_passager = masque.sum(axis=0)
+    arites = Counter({1: int(masque.sum())})
+    arites[2] += int((par_passager * (par_passager - 1) // 2).sum())
+    for m, nb in enumerate(np.bincount(par_passager).tolist()):
+        arites[m] += nb
+    relations = {(m, "0", 1, f"{INFINITY_COST}: " + " ".join(["0"] * m)) for m in set(par_passager.tolist())}
+    if (par_passager >= 2).any():
+        relations.add((2, "0", 1, f"{INFINITY_COST}: 1 1"))                 # AMO
+    compteurs = []
+    for K, n in zip(capacites_par_voiture, par_voiture):
+        if K >= n:
+            continue
+        if encodage_capacite == "compteur":
+            compteurs.append((K, n))
+            arites[2] += 1
+            arites[3] += n - 1
+            relations.add(_relation_compteur(K, [0, 1], 1, True))
+            if n >= 2:
+                relations.add(_relation_compteur(K, [0, 1], 1, False))
+        else:
+            # K = 1 : "infinity: 1 1" d'arité 2, même contenu que la relation AMO
+            arites[K + 1] += math.comb(n, K + 1)
+            relations.add((K + 1, "0", 1, f"{INFINITY_COST}: " + " ".join(["1"] * (K + 1))))
+    domaines = {"bin": 2, **{f"cpt{K}": K + 1 for K in sorted({K for K, _ in compteurs})}}
+    return _resume_tailles(masque.shape[0], int(masque.sum()) + sum(n for _, n in compteurs),
+                           nb_relations_couts + len(relations), arites, domaines)
+
+def _tailles_m1(nb_voitures, nb_passagers, capacites_par_voiture, nb_relations_couts, encodage_capacite) -> dict:
+    """Formules de _dimensions_m1 à partir des seules tailles (nb_relations_couts : coûts unaires distincts)."""
+    capacites = {K for K in capacites_par_voiture if K < nb_passagers}
+
+    # arité max : max(nb_voitures pour la contrainte "tout-zéro",
+    #                max(K)+1 pour les capacités (si K < nb_passagers),
+    #                2 pour les AMO)
+    max_k_plus_1 = max((K + 1 for K in capacites_par_voiture), default=2)
+    # Compteur : contraintes (s_prec, x, s) ternaires, binaire (x, s) pour le premier passager
+    capacites_compteur = []
+    if encodage_capacite == "compteur":
+        capacites_compteur = sorted(capacites)
+        max_k_plus_1 = (3 if nb_passagers > 1 else 2) if capacites_compteur else 2
+
+    nb_relations = nb_relations_couts
+    nb_relations += 1 if nb_voitures >= 2 and nb_passagers >= 1 else 0    # AMO
+    nb_relations += 1 if nb_passagers >= 1 else 0                          # tout-zéro
+    arites = Counter()
+    arites[1] += nb_voitures * nb_passagers
+    arites[2] += nb_passagers * math.comb(nb_voitures, 2)
+    arites[nb_voitures] += nb_passagers
+
+    if encodage_capacite == "compteur":
+        # Relation initiale identique pour tout K >= 1 ; relation de pas propre à chaque K
+        nb_relations += len({min(K, 1) for K in capacites})
+        nb_relations += len(capacites) if nb_passagers >= 2 else 0
+    else:
+        nb_relations += len(capacites)
+        # K = 1 : "infinity: 1 1" d'arité 2, même contenu que la relation AMO
+        if 1 in capacites and nb_voitures >= 2:
+            nb_relations -= 1
+    nb_voitures_compteur = 0
+    for K in capacites_par_voiture:
+        if K >= nb_passagers:
+            continue
+        if encodage_capacite == "compteur":
+            nb_voitures_compteur += 1
+            arites[2] += 1
+            arites[3] += nb_passagers - 1
+        else:
+            arites[K + 1] += math.comb(nb_passagers, K + 1)
+
+    domaines = {"bin": 2}
+    domaines.update({f"cpt{K}": K + 1 for K in capacites_compteur})
+    return {
+        "nb_agents": nb_voitures,
+        "nb_variables": nb_voitures * nb_passagers + nb_voitures_compteur * nb_passagers,
+        "nb_relations": nb_relations,
+        "nb_contraintes": sum(arites.values()),
+        "max_arity": max(nb_voitures if nb_voitures > 0 else 1, max_k_plus_1, 2),
+        "domaines": domaines,
+        "arites": {a: n for a, n in sorted(arites.items()) if n},
+    }
+
+def iterer_instance_xcsp(
     voitures: List[str],
     passagers: List[str],
     capacite_par_voiture: Dict[str, int],
-    couts: Dict[Tuple[str, str], int],
+    couts: Union[Dict[Tuple[str, str], int], np.ndarray],
     nom: str = "ramassage_auto",
     format_str: str = "XCSP 2.1_FRODO",
-) -> str:
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+) -> Iterator[str]:
     """
-    Construit une instance DCOP (Modélisation 1) :
-    Variables x_ij = {0, 1}. Agent = Voiture i.
-    Sortie : XCSP 2.1_FRODO (tags conformes : name, arity, semantics, defaultCost, scope, maximize, etc.)
+    Version en flux de construire_instance_xcsp : produit les lignes XML une à une.
+    nbRelations / nbConstraints sont calculés en forme close ; les relations puis les
+    contraintes sont émises en deux passes sur l'énumération, sans rien mettre en mémoire.
+    stats : StatsGeneration à remplir (temps, éléments et octets par phase), None pour ne rien mesurer.
     """
+    debut = time.perf_counter() if stats is not None else 0.0
+    _verifier_encodage(encodage_capacite)
+
     # 1. Validations initiales
     for v in voitures:
         if v not in capacite_par_voiture:
             raise ValueError(f"Capacité manquante pour la voiture {v}")
-    for v in voitures:
-        for p in passagers:
-            if (v, p) not in couts:
-                raise ValueError(f"Coût manquant pour ({v},{p})")
+    matrice = _matrice_couts(voitures, passagers, couts)
+    dims = _dimensions_m1(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite)
+    if stats is not None:
+        stats.ajouter("validation", time.perf_counter() - debut, matrice.size, taille_max=matrice.size)
 
-    nb_voitures = len(voitures)
-    nb_passagers = len(passagers)
-    nb_agents = nb_voitures
-    nb_variables = nb_voitures * nb_passagers
+    entete = _lignes_entete_m1(voitures, passagers, capacite_par_voiture, dims, nom, format_str, matrice)
+    # 5-7. Relations puis contraintes (deux passes sur la même énumération)
+    enumeration = lambda: _contraintes_m1(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite)
+    if stats is None:
+        yield from entete
+        yield from _iterer_relations_contraintes(enumeration, dims["nb_relations"], dims["nb_contraintes"])
+    else:
+        yield from _mesurer_lignes(stats, "variables", entete)
+        yield from _iterer_relations_contraintes_mesurees(enumeration, dims["nb_relations"], dims["nb_contraintes"], stats)
+    yield '</instance>'
 
-    # arité max : max(nb_voitures pour la contrainte "tout-zéro",
-    #                max(K)+1 pour les capacités (si K < nb_passagers),
-    #                2 pour les AMO)
-    max_k_plus_1 = 2
-    if capacite_par_voiture:
-        max_k_plus_1 = max((int(capacite_par_voiture[v]) + 1) for v in voitures)
-    max_arity = max(nb_voitures if nb_voitures > 0 else 1, max_k_plus_1, 2)
-
-    xml = []
-    xml.append('<instance>')
-    xml.append(
-        f'  <presentation name="{escape(nom)}" maxConstraintArity="{max_arity}" format="{escape(format_str)}" maximize="false"/>'
-    )
+def _lignes_entete_m1(voitures, passagers, capacite_par_voiture, dims, nom, format_str, matrice) -> Iterator[str]:
+    """<instance>, présentation, agents, domaines et variables (couples candidats) de la Modélisation 1."""
+    _, passagers_de = _listes_candidats(matrice)
+    yield '<instance>'
+    yield f'  <presentation name="{escape(nom)}" maxConstraintArity="{dims["max_arity"]}" format="{escape(format_str)}" maximize="false"/>'
 
     # 2. Agents
-    xml.append(f'  <agents nbAgents="{nb_agents}">')
+    yield f'  <agents nbAgents="{dims["nb_agents"]}">'
     for v in voitures:
-        xml.append(f'    <agent name="{escape(v)}"/>')
-    xml.append('  </agents>')
+        yield f'    <agent name="{escape(v)}"/>'
+    yield '  </agents>'
 
-    # 3. Domaines
-    xml.append('  <domains nbDomains="1">')
-    xml.append('    <domain name="bin" nbValues="2">0 1</domain>')
-    xml.append('  </domains>')
+    # 3. Domaines ("bin" puis un domaine cpt{K} = {0..K} par capacité K encodée en compteur)
+    yield f'  <domains nbDomains="{len(dims["domaines"])}">'
+    yield '    <domain name="bin" nbValues="2">0 1</domain>'
+    capacites_compteur = [int(nom_dom[3:]) for nom_dom in dims["domaines"] if nom_dom.startswith("cpt")]
+    for K in capacites_compteur:
+        yield f'    <domain name="cpt{K}" nbValues="{K+1}">{" ".join(str(c) for c in range(K+1))}</domain>'
+    yield '  </domains>'
 
     # 4. Variables
-    xml.append(f'  <variables nbVariables="{nb_variables}">')
-    noms_variables = {}
+    voitures_compteur = [
+        (i, v) for i, v in enumerate(voitures, start=1)
+        if int(capacite_par_voiture[v]) in capacites_compteur and int(capacite_par_voiture[v]) < len(passagers_de[i-1])
+    ]
+    yield f'  <variables nbVariables="{dims["nb_variables"]}">'
     for i, v in enumerate(voitures, start=1):
-        for j, p in enumerate(passagers, start=1):
-            nom_var = f"x{i}{j}"
-            noms_variables[(v, p)] = nom_var
+        for j in passagers_de[i-1]:
             # x_ij = 1 si la voiture i prend le passager j. La voiture i est l'agent.
-            xml.append(f'    <variable name="{nom_var}" domain="bin" agent="{escape(v)}"/>')
-    xml.append('  </variables>')
+            yield f'    <variable name="x{i}{j}" domain="bin" agent="{escape(v)}"/>'
+    # s_i_j = nombre de passagers candidats 1..j pris par la voiture i (compteur séquentiel)
+    for i, v in voitures_compteur:
+        K = int(capacite_par_voiture[v])
+        for j in passagers_de[i-1]:
+            yield f'    <variable name="s{i}_{j}" domain="cpt{K}" agent="{escape(v)}"/>'
+    yield '  </variables>'
 
-    relations, contraintes = [], []
+def construire_instance_xcsp(
+    voitures: List[str],
+    passagers: List[str],
+    capacite_par_voiture: Dict[str, int],
+    couts: Union[Dict[Tuple[str, str], int], np.ndarray],
+    nom: str = "ramassage_auto",
+    format_str: str = "XCSP 2.1_FRODO",
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+) -> str:
+    """
+    Construit une instance DCOP (Modélisation 1) :
+    Variables x_ij = {0, 1}. Agent = Voiture i.
+    Capacités : sous-ensembles K+1 interdits, ou compteur séquentiel s_i_j = {0..K}
+    (encodage_capacite="compteur", taille O(|V|·|P|·K)).
+    Sortie : XCSP 2.1_FRODO (tags conformes : name, arity, semantics, defaultCost, scope, maximize, etc.)
+    stats : StatsGeneration à remplir (cf. iterer_instance_xcsp), phase « assemblage » comprise.
+    """
+    return _assembler(iterer_instance_xcsp(
+        voitures, passagers, capacite_par_voiture, couts, nom=nom, format_str=format_str,
+        encodage_capacite=encodage_capacite, stats=stats,
+    ), stats)
 
-    # 5. Contraintes de Coûts Unitaires (Soft)
-    for (v, p), nom_var in noms_variables.items():
-        cout = int(couts[(v, p)])
-        nom_rel = f"Cout_{nom_var}"
-        relations.append(
-            # Coût 'cout' si la variable prend la valeur 1
-            f'    <relation name="{nom_rel}" arity="1" semantics="soft" defaultCost="0" nbTuples="1">{cout}: 1</relation>'
-        )
-        contraintes.append(
-            f'    <constraint name="cout_{nom_var}" arity="1" scope="{nom_var}" reference="{nom_rel}"/>'
-        )
+# ======================================================================
+# MODÉLISATION 2 : Variable par Passager (y_j = {v1, v2, ...})
+# ======================================================================
 
-    # 6. Contraintes d'Unicité par Passager (AMO + Interdiction Tout-Zéro)
-    for j, p in enumerate(passagers, start=1):
-        # A. AMO (Au Plus Une) : pour chaque paire de voitures, interdire (1,1)
-        indices_voitures = list(enumerate(voitures, start=1))
-        for (i1, _), (i2, _) in combinations(indices_voitures, 2):
-            v1, v2 = f"x{i1}{j}", f"x{i2}{j}"
-            nom_rel = f"AMO_{p}_{i1}_{i2}"
-            relations.append(
-                f'    <relation name="{nom_rel}" arity="2" semantics="soft" defaultCost="0" nbTuples="1">{INFINITY_COST}: 1 1</relation>'
-            )
-            contraintes.append(
-                f'    <constraint name="amo_{p}_{i1}_{i2}" arity="2" scope="{v1} {v2}" reference="{nom_rel}"/>'
-            )
-        # B. Au Moins Une (interdiction du tout-zéro sur toutes les voitures pour ce passager)
-        toutes_vars = " ".join(f"x{i}{j}" for i in range(1, nb_voitures+1))
-        zeros = " ".join("0" for _ in voitures)
-        nom_rel = f"PAS_DE_TOUT_ZERO_{p}"
-        relations.append(
-            f'    <relation name="{nom_rel}" arity="{nb_voitures}" semantics="soft" defaultCost="0" nbTuples="1">{INFINITY_COST}: {zeros}</relation>'
-        )
-        contraintes.append(
-            f'    <constraint name="pas_de_tout_zero_{p}" arity="{nb_voitures}" scope="{toutes_vars}" reference="{nom_rel}"/>'
-        )
+def _contraintes_m2(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite):
+    """
+    Énumère les contraintes de la Modélisation 2 dans l'ordre d'émission.
+    Chaque élément : ((nom_rel, arity, nbTuples, corps, defaultCost), nom_contrainte, portée).
+    """
+    nb_passagers = len(passagers)
+    # Voitures candidates (valeurs du domaine de y_j) ; toutes sans élagage
+    voitures_de, passagers_de = _listes_candidats(matrice)
+    domaine_de, valeurs_domaines = _domaines_m2(matrice)
 
-    # 7. Contraintes de Capacité par Voiture (Interdiction Tout-Un sur K+1)
-    for i, v in enumerate(voitures, start=1):
+    # 5. Contraintes de coût unaires (soft) ; valeur de domaine de la voiture i = i (1..N)
+    for j in range(1, nb_passagers+1):
+        nom_var = f"y{j}"
+        candidates = voitures_de[j-1]
+        couts_j = matrice[np.asarray(candidates, dtype=np.int64) - 1, j-1].tolist()
+        tuples_cout = [f"{int(cout)}: {i}" for i, cout in zip(candidates, couts_j)]
+        if not tuples_cout:
+            # Cas pathologique : aucune voiture; on met relation vide avec defaultCost=0 (variable sans choix)
+            relation = (f"Cost_{nom_var}", 1, 0, "", "0")
+        else:
+            relation = (f"Cost_{nom_var}", 1, len(tuples_cout), "\n" + " | ".join(tuples_cout) + "\n    ", "0")
+        yield relation, f"c_{nom_var}", nom_var
+
+    # 6. Capacités par voiture : pour chaque voiture v de capacité K,
+    #    interdire tout sous-ensemble de K+1 passagers assignés à v (valeur domaine = valeur_v)
+    if nb_passagers == 0:
+        return
+    for valeur_v, v in enumerate(voitures, start=1):
         K = int(capacite_par_voiture[v])
-        if K >= nb_passagers:
-            continue
-        indices_passagers = range(1, nb_passagers+1)
-        for idx, sous_ensemble in enumerate(combinations(indices_passagers, K + 1), start=1):
-            vars_portee = [f"x{i}{j}" for j in sous_ensemble]
-            portee_str = " ".join(vars_portee)
-            uns = " ".join("1" for _ in vars_portee)
-            nom_rel = f"CAP_AU_PLUS_{v}_{idx}"
-            relations.append(
-                f'    <relation name="{nom_rel}" arity="{K+1}" semantics="soft" defaultCost="0" nbTuples="1">{INFINITY_COST}: {uns}</relation>'
-            )
-            contraintes.append(
-                f'    <constraint name="cap_{v}_{idx}" arity="{K+1}" scope="{portee_str}" reference="{nom_rel}"/>'
-            )
+        candidats_v = passagers_de[valeur_v-1]
+        if K >= len(candidats_v):
+            continue  # aucune contrainte (capacité >= nb passagers candidats)
 
-    # 8. Assemblage final
-    xml.append(f'  <relations nbRelations="{len(relations)}">')
-    xml.extend(relations)
-    xml.append('  </relations>')
+        if encodage_capacite == "compteur":
+            # s_1 = [y_1 == v] ; s_j = s_(j-1) + [y_j == v] ; le domaine {0..K} borne la somme
+            # (deux relations par voiture et par domaine de y_j, construites une seule fois)
+            relations = {}
+            precedent = None
+            for j in candidats_v:
+                nom_var, initial = f"y{j}", precedent is None
+                cle = (initial, domaine_de[j-1])
+                if cle not in relations:
+                    tuples = _tuples_compteur(K, valeurs_domaines[cle[1]], valeur_v, initial)
+                    suffixe = "" if cle[1] == "cars" else f"_{cle[1].upper()}"
+                    relations[cle] = (f"CPT_V{valeur_v}_K{K}_INIT{suffixe}" if initial else f"CPT_V{valeur_v}_K{K}{suffixe}",
+                                      2 if initial else 3, len(tuples), " | ".join(tuples), INFINITY_COST)
+                portee_str = (f"{nom_var} s{valeur_v}_{j}" if initial
+                              else f"s{valeur_v}_{precedent} {nom_var} s{valeur_v}_{j}")
+                yield relations[cle], f"cpt_{escape(v)}_{j}", portee_str
+                precedent = j
+            continue
 
-    xml.append(f'  <constraints nbConstraints="{len(contraintes)}">')
-    xml.extend(contraintes)
-    xml.append('  </constraints>')
-    xml.append('</instance>')
-    return "\n".join(xml)
+        valeurs_interdites = " ".join(str(valeur_v) for _ in range(K + 1))
+        for idx, sous_ensemble in enumerate(combinations([f"y{j}" for j in candidats_v], K + 1), start=1):
+            relation = (f"CAP_V{valeur_v}_K{K}", K+1, 1, f"{INFINITY_COST}: {valeurs_interdites}", "0")
+            yield relation, f"cap_{escape(v)}_{idx}", " ".join(sous_ensemble)
 
-# ======================================================================
-# MODÉLISATION 2 : Variable par Passager (y_j = {v1, v2, ...})
-# ======================================================================
+def _dimensions_m2(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite) -> dict:
+    """Tailles de la Modélisation 2 en forme close (mêmes clés que _dimensions_m1)."""
+    capacites_par_voiture = [int(capacite_par_voiture[v]) for v in voitures]
+    masque = _candidats(matrice) if voitures else None
+    # Une relation unaire par vecteur de coûts distinct (qui fixe aussi les voitures candidates)
+    if not voitures:
+        nb_relations_couts = 1 if passagers else 0
+    else:
+        nb_relations_couts = len(np.unique(matrice.T, axis=0))
+    if masque is not None:
+        return _tailles_elaguees_m2(masque, capacites_par_voiture, nb_relations_couts, encodage_capacite, matrice)
+    return _tailles_m2(len(voitures), len(passagers), capacites_par_voiture, nb_relations_couts, encodage_capacite)
 
-def construire_instance_xcsp_alt(
-    voitures: List[str],
-    passagers: List[str],
-    capacite_par_voiture: Dict[str, int],
-    couts: Dict[Tuple[str, str], int],
-    nom: str = "ramassage_alt_auto",
-    format_str: str = "XCSP 2.1_FRODO",
-) -> str:
+def _tailles_elaguees_m2(masque: np.ndarray, capacites_par_voiture, nb_relations_couts, encodage_capacite, matrice) -> dict:
     """
-    Construit une instance DCOP (Modélisation 2) :
-    Variables y_j = {1, 2, ..., N_voitures}. Agent = voiture "responsable" (cyclique).
-    Unicité par passager naturelle. Capacités : facteurs n-aires (K+1) soft interdits.
+    Formules de _dimensions_m2 pour une instance élaguée : une unaire par passager, C(n_i, K+1)
+    capacités (ou n_i pas de compteur) par voiture ayant n_i passagers candidats. Une relation de
+    capacité par voiture ; en compteur, une par voiture et par domaine des y_j de son compteur.
     """
-    nb_voitures = len(voitures)
-    nb_passagers = len(passagers)
-    nb_agents = nb_voitures
+    domaine_de, valeurs_domaines = _domaines_m2(matrice)
+    arites = Counter({1: masque.shape[1]})
+    relations = set()
+    compteurs = []
+    for valeur_v, (K, n) in enumerate(zip(capacites_par_voiture, masque.sum(axis=1).tolist()), start=1):
+        if K >= n:
+            continue
+        if encodage_capacite == "compteur":
+            compteurs.append((K, n))
+            arites[2] += 1
+            arites[3] += n - 1
+            candidats = np.flatnonzero(masque[valeur_v - 1]).tolist()
+            relations.add(_relation_compteur(K, valeurs_domaines[domaine_de[candidats[0]]], valeur_v, True))
+            for nom in {domaine_de[j] for j in candidats[1:]}:
+                relations.add(_relation_compteur(K, valeurs_domaines[nom], valeur_v, False))
+        else:
+            arites[K + 1] += math.comb(n, K + 1)
+            relations.add((K + 1, "0", 1, f"{INFINITY_COST}: " + " ".join([str(valeur_v)] * (K + 1))))
+    domaines = {nom: len(valeurs) for nom, valeurs in valeurs_domaines.items()}
+    domaines.update({f"cpt{K}": K + 1 for K in sorted({K for K, _ in compteurs})})
+    return _resume_tailles(masque.shape[0], masque.shape[1] + sum(n for _, n in compteurs),
+                           nb_relations_couts + len(relations), arites, domaines)
 
-    # 1. Agent de chaque variable/passager (cyclique)
-    agent_par_passager = {
-        passagers[j]: voitures[j % nb_voitures] for j in range(nb_passagers)
-    } if nb_voitures > 0 else {}
+def _tailles_m2(nb_voitures, nb_passagers, capacites_par_voiture, nb_relations_couts, encodage_capacite) -> dict:
+    """Formules de _dimensions_m2 à partir des seules tailles (nb_relations_couts : vecteurs de coûts distincts)."""
 
     # arité max : max(1 pour les unaires, max(K)+1 pour capacités (si K < nb_passagers))
     max_k_plus_1 = 1
-    if capacite_par_voiture and nb_passagers > 0:
-        max_k_plus_1 = max((int(capacite_par_voiture[v]) + 1) for v in voitures)
+    if capacites_par_voiture and nb_passagers > 0:
+        max_k_plus_1 = max((K + 1 for K in capacites_par_voiture), default=1)
         # seulement pertinent si K < nb_passagers, sinon pas de facteur n-aire pour cette voiture
         max_k_plus_1 = max(min(max_k_plus_1, nb_passagers), 1)
-    max_arity = max(1, max_k_plus_1)
+    capacites_compteur = []
+    if encodage_capacite == "compteur":
+        capacites_compteur = sorted({K for K in capacites_par_voiture if K < nb_passagers})
+        max_k_plus_1 = (3 if nb_passagers > 1 else 2) if capacites_compteur else 1
 
-    xml = []
-    xml.append('<instance>')
-    xml.append(
-        f'  <presentation name="{escape(nom)}" maxConstraintArity="{max_arity}" format="{escape(format_str)}" maximize="false"/>'
-    )
+    nb_relations = nb_relations_couts
+    arites = Counter({1: nb_passagers})
+    nb_voitures_compteur = 0
+    for K in capacites_par_voiture:
+        if nb_passagers == 0 or K >= nb_passagers:
+            continue
+        if encodage_capacite == "compteur":
+            nb_voitures_compteur += 1
+            nb_relations += 2 if nb_passagers >= 2 else 1
+            arites[2] += 1
+            arites[3] += nb_passagers - 1
+        else:
+            nb_relations += 1
+            arites[K + 1] += math.comb(nb_passagers, K + 1)
 
-    # 2. Agents
-    xml.append(f'  <agents nbAgents="{nb_agents}">')
-    for v in voitures:
-        xml.append(f'    <agent name="{escape(v)}"/>')
-    xml.append('  </agents>')
-
-    # 3. Domaines
-    xml.append('  <domains nbDomains="1">')
-    if nb_voitures > 0:
-        valeurs_domaine = " ".join(str(i+1) for i in range(nb_voitures))  # 1..N
-        xml.append(f'    <domain name="cars" nbValues="{nb_voitures}">{valeurs_domaine}</domain>')
+    domaines = {"cars": nb_voitures}
+    domaines.update({f"cpt{K}": K + 1 for K in capacites_compteur})
+    return {
+        "nb_agents": nb_voitures,
+        "nb_variables": nb_passagers + nb_voitures_compteur * nb_passagers,
+        "nb_relations": nb_relations,
+        "nb_contraintes": sum(arites.values()),
+        "max_arity": max(1, max_k_plus_1),
+        "domaines": domaines,
+        "arites": {a: n for a, n in sorted(arites.items()) if n},
+    }
+
+def _structure_coupe_m2(nb_passagers: int, capacites: List[int], encodage_capacite: str) -> Tuple[bool, np.ndarray]:
+    """
+    Graphe primal de la Modélisation 2 vu des agents (cf. graphe_contraintes.graphe_primal) :
+    (clique, compteurs). clique : les y_j forment une clique (sous-ensembles, une capacité 1 <= K < P) ;
+    compteurs : masque des voitures à compteur, qui hébergent s{i}_j relié à y_j et y_(j+1).
+    """
+    capacites = np.asarray(capacites, dtype=np.int64).reshape(-1)
+    if encodage_capacite == "compteur":
+        return False, capacites < nb_passagers
+    return bool(((capacites >= 1) & (capacites < nb_passagers)).any()), np.zeros(len(capacites), dtype=bool)
+
+def coupe_placement_m2(hotes: np.ndarray, capacites: List[int], encodage_capacite: str = "sous_ensembles") -> int:
+    """
+    Taille de coupe d'un placement : arêtes du graphe primal (variables partageant une contrainte)
+    dont les extrémités sont hébergées par deux agents différents. En forme close, sans construire
+    le graphe : (P² - Σ n_a²) / 2 pour la clique des y_j, et pour chaque voiture à compteur i,
+    une arête y_j–s{i}_j (+ y_j–s{i}_(j-1) si j > 1) par y_j hébergée ailleurs.
+    Instance élaguée : même formule (structure sans élagage), qui majore la coupe réelle.
+    """
+    hotes = np.asarray(hotes, dtype=np.int64)
+    nb_passagers = len(hotes)
+    clique, compteurs = _structure_coupe_m2(nb_passagers, capacites, encodage_capacite)
+    coupe = 0
+    if clique:
+        charges = np.bincount(hotes, minlength=len(compteurs))
+        coupe += (nb_passagers ** 2 - int((charges ** 2).sum())) // 2
+    if compteurs.any():
+        aretes = np.where(np.arange(nb_passagers) > 0, 2, 1)
+        coupe += int((aretes * (compteurs.sum() - compteurs[hotes])).sum())
+    return coupe
+
+def placer_variables_m2(
+    matrice: np.ndarray,
+    capacites: List[int],
+    encodage_capacite: str = "sous_ensembles",
+    placement: str = "cyclique",
+    charge_max: Optional[int] = None,
+    passes: int = 10,
+) -> np.ndarray:
+    """
+    Indice de la voiture (agent) hébergeant chaque y_j, matrice |V| x |P| des coûts.
+    "cyclique" : j mod N. "plus_proche" : voiture de coût minimal (sans borne de charge).
+    "partition" : au plus charge_max variables y_j par agent (défaut ceil(1,5 · P / N)) ; passagers
+    pris par coût minimal croissant, chacun sur l'agent qui ajoute le moins d'arêtes coupées
+    (coupe_placement_m2), puis `passes` passes de déplacements isolés et d'échanges de deux y_j
+    (charges inchangées, utiles quand charge_max bloque les déplacements) qui réduisent la coupe.
+    À coupe égale, la voiture la moins coûteuse pour le passager l'emporte. Le placement cyclique
+    est gardé s'il coupe moins (il respecte toujours charge_max).
+    """
+    if placement not in PLACEMENTS:
+        raise ValueError(f"Placement inconnu '{placement}'. Choisissez parmi {PLACEMENTS}.")
+    matrice = np.asarray(matrice)
+    nb_voitures, nb_passagers = matrice.shape
+    if nb_voitures == 0:
+        return np.zeros(nb_passagers, dtype=np.int64)
+    if placement == "cyclique":
+        return np.arange(nb_passagers, dtype=np.int64) % nb_voitures
+    if placement == "plus_proche":
+        return np.argmin(matrice, axis=0).astype(np.int64)
+
+    if charge_max is None:
+        charge_max = math.ceil(1.5 * nb_passagers / nb_voitures)
+    if charge_max * nb_voitures < nb_passagers:
+        raise ValueError(f"charge_max={charge_max} trop faible pour {nb_passagers} variables sur {nb_voitures} agents")
+    clique, compteurs = _structure_coupe_m2(nb_passagers, capacites, encodage_capacite)
+    # Arêtes y_j–compteur d'une voiture à compteur : s{i}_j, et s{i}_(j-1) si j > 1
+    aretes = np.where(np.arange(nb_passagers) > 0, 2, 1)
+    nb_compteurs = int(compteurs.sum())
+    hotes = np.full(nb_passagers, -1, dtype=np.int64)
+    charges = np.zeros(nb_voitures, dtype=np.int64)
+    for place, j in enumerate(np.argsort(matrice.min(axis=0), kind="stable").tolist()):
+        ajout = (place - charges) * clique + aretes[j] * (nb_compteurs - compteurs)
+        ajout = np.where(charges < charge_max, ajout, np.iinfo(np.int64).max)
+        a = int(np.lexsort((matrice[:, j], ajout))[0])
+        hotes[j] = a
+        charges[a] += 1
+
+    for _ in range(passes):
+        deplacements = 0
+        for j in range(nb_passagers):
+            a = hotes[j]
+            # Arêtes coupées en moins si y_j passe de a à b
+            gain = (charges + 1 - charges[a]) * clique + aretes[j] * (compteurs.astype(np.int64) - compteurs[a])
+            ameliore = (gain > 0) | ((gain == 0) & (matrice[:, j] < matrice[a, j]))
+            ameliore &= charges < charge_max
+            ameliore[a] = False
+            if not ameliore.any():
+                continue
+            candidats = np.flatnonzero(ameliore)
+            b = int(candidats[np.lexsort((matrice[candidats, j], -gain[candidats]))[0]])
+            hotes[j] = b
+            charges[a] -= 1
+            charges[b] += 1
+            deplacements += 1
+        # Échanges y_j <-> y_k : la clique ne dépend que des charges, seules les arêtes de compteur
+        # changent, et seulement si y_j et y_k n'en ont pas le même nombre (y_1 n'en a qu'une)
+        for j in np.flatnonzero(aretes < aretes.max()).tolist():
+            sur_compteur = compteurs[hotes].astype(np.int64)
+            gain = (sur_compteur - sur_compteur[j]) * (aretes[j] - aretes)
+            k = int(np.argmax(gain))
+            if gain[k] > 0:
+                hotes[j], hotes[k] = hotes[k], hotes[j]
+                deplacements += 1
+        if not deplacements:
+            break
+    cyclique = np.arange(nb_passagers, dtype=np.int64) % nb_voitures
+    if coupe_placement_m2(cyclique, capacites, encodage_capacite) < coupe_placement_m2(hotes, capacites, encodage_capacite):
+        return cyclique
+    return hotes
+
+def placement_m2(
+    obj_json: Union[dict, "InstanceCompacte"],
+    encodage_capacite: str = "sous_ensembles",
+    placement: str = "cyclique",
+    charge_max: Optional[int] = None,
+) -> dict:
+    """Placement des y_j d'une instance : hotes (indices de voiture), charges par agent et coupe."""
+    instance = obj_json if isinstance(obj_json, InstanceCompacte) else InstanceCompacte.depuis_json(obj_json)
+    capacites = instance.capacites.tolist()
+    hotes = placer_variables_m2(instance.couts, capacites, encodage_capacite, placement, charge_max)
+    return {
+        "hotes": hotes,
+        "charges": np.bincount(hotes, minlength=len(instance.voitures)),
+        "coupe": coupe_placement_m2(hotes, capacites, encodage_capacite),
+    }
+
+def iterer_instance_xcsp_alt(
+    voitures: List[str],
+    passagers: List[str],
+    capacite_par_voiture: Dict[str, int],
+    couts: Union[Dict[Tuple[str, str], int], np.ndarray],
+    nom: str = "ramassage_alt_auto",
+    format_str: str = "XCSP 2.1_FRODO",
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+    placement: str = "cyclique",
+    charge_max: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Version en flux de construire_instance_xcsp_alt : produit les lignes XML une à une,
+    avec nbRelations / nbConstraints calculés en forme close.
+    stats : StatsGeneration à remplir (temps, éléments et octets par phase), None pour ne rien mesurer.
+    placement / charge_max : agent hébergeant chaque y_j (cf. placer_variables_m2).
+    """
+    debut = time.perf_counter() if stats is not None else 0.0
+    _verifier_encodage(encodage_capacite)
+
+    matrice = _matrice_couts(voitures, passagers, couts)
+    dims = _dimensions_m2(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite)
+    capacites = [int(capacite_par_voiture[v]) for v in voitures]
+    hotes = placer_variables_m2(matrice, capacites, encodage_capacite, placement, charge_max)
+    if stats is not None:
+        stats.ajouter("validation", time.perf_counter() - debut, matrice.size, taille_max=matrice.size)
+
+    entete = _lignes_entete_m2(voitures, passagers, capacite_par_voiture, dims, nom, format_str, hotes, matrice)
+    # 5-6. Relations puis contraintes (deux passes sur la même énumération)
+    enumeration = lambda: _contraintes_m2(voitures, passagers, capacite_par_voiture, matrice, encodage_capacite)
+    if stats is None:
+        yield from entete
+        yield from _iterer_relations_contraintes(enumeration, dims["nb_relations"], dims["nb_contraintes"])
     else:
-        xml.append(f'    <domain name="cars" nbValues="0"></domain>')
-    xml.append('  </domains>')
+        yield from _mesurer_lignes(stats, "variables", entete)
+        yield from _iterer_relations_contraintes_mesurees(enumeration, dims["nb_relations"], dims["nb_contraintes"], stats)
+    yield '</instance>'
 
-    # 4. Variables
-    xml.append(f'  <variables nbVariables="{nb_passagers}">')
-    nom_var_par_passager = {}
-    for j, p in enumerate(passagers, start=1):
-        nom_var = f"y{j}"
-        nom_var_par_passager[p] = nom_var
-        agent_p = agent_par_passager.get(p, voitures[0] if nb_voitures else "a0")
-        xml.append(f'    <variable name="{nom_var}" domain="cars" agent="{escape(agent_p)}"/>')
-    xml.append('  </variables>')
+def _domaines_m2(matrice: np.ndarray) -> Tuple[List[str], Dict[str, List[int]]]:
+    """
+    Domaine de chaque y_j : "cars" (1..N) sans élagage ; sinon un domaine par ensemble distinct de
+    voitures candidates ("cars" s'il les contient toutes, cars_1, cars_2, ... dans l'ordre des passagers).
+    Retourne (nom du domaine par passager, {nom: valeurs}).
+    """
+    nb_voitures, nb_passagers = np.asarray(matrice).shape
+    masque = _candidats(matrice) if nb_voitures else None
+    if masque is None:
+        return ["cars"] * nb_passagers, {"cars": list(range(1, nb_voitures + 1))}
+    noms: Dict[Tuple[int, ...], str] = {}
+    domaine_de = []
+    for valeurs in map(tuple, _grouper_indices(masque.T)):
+        if valeurs not in noms:
+            noms[valeurs] = "cars" if len(valeurs) == nb_voitures else f"cars_{len(noms) + 1 - ('cars' in noms.values())}"
+        domaine_de.append(noms[valeurs])
+    return domaine_de, {nom: list(valeurs) for valeurs, nom in noms.items()}
 
-    relations, contraintes = [], []
+def _lignes_entete_m2(voitures, passagers, capacite_par_voiture, dims, nom, format_str, hotes, matrice) -> Iterator[str]:
+    """<instance>, présentation, agents, domaines et variables de la Modélisation 2 (y_j hébergée par voitures[hotes[j]])."""
+    nb_voitures = len(voitures)
+    domaine_de, valeurs_domaines = _domaines_m2(matrice)
+    _, passagers_de = _listes_candidats(matrice)
+    yield '<instance>'
+    yield f'  <presentation name="{escape(nom)}" maxConstraintArity="{dims["max_arity"]}" format="{escape(format_str)}" maximize="false"/>'
 
-    # Mapping voiture -> valeur de domaine
-    id_voiture_vers_valeur = {v: i+1 for i, v in enumerate(voitures)}
+    # 2. Agents
+    yield f'  <agents nbAgents="{dims["nb_agents"]}">'
+    for v in voitures:
+        yield f'    <agent name="{escape(v)}"/>'
+    yield '  </agents>'
 
-    # 5. Contraintes de coût unaires (soft)
-    for j, p in enumerate(passagers, start=1):
-        nom_var = nom_var_par_passager[p]
-        nom_rel = f"Cost_{nom_var}"
+    # 3. Domaines ("cars" (ou un domaine par ensemble de voitures candidates) puis un domaine
+    #    cpt{K} = {0..K} par capacité K encodée en compteur)
+    capacites_compteur = [int(nom_dom[3:]) for nom_dom in dims["domaines"] if nom_dom.startswith("cpt")]
+    yield f'  <domains nbDomains="{len(dims["domaines"])}">'
+    for nom_dom, valeurs in valeurs_domaines.items():
+        yield f'    <domain name="{nom_dom}" nbValues="{len(valeurs)}">{" ".join(str(i) for i in valeurs)}</domain>'
+    for K in capacites_compteur:
+        yield f'    <domain name="cpt{K}" nbValues="{K+1}">{" ".join(str(c) for c in range(K+1))}</domain>'
+    yield '  </domains>'
 
-        tuples_cout = []
-        for v in voitures:
-            valeur_v = id_voiture_vers_valeur[v]  # 1..N
-            cout_v = int(couts[(v, p)])
-            tuples_cout.append(f"{cout_v}: {valeur_v}")
+    # 4. Variables ; agent de chaque variable/passager : voiture "responsable" (placer_variables_m2)
+    voitures_compteur = [
+        (i, v) for i, v in enumerate(voitures, start=1)
+        if int(capacite_par_voiture[v]) in capacites_compteur and int(capacite_par_voiture[v]) < len(passagers_de[i-1])
+    ]
+    yield f'  <variables nbVariables="{dims["nb_variables"]}">'
+    for j, hote in enumerate(hotes.tolist()):
+        agent_p = voitures[hote] if nb_voitures else "a0"
+        yield f'    <variable name="y{j+1}" domain="{domaine_de[j]}" agent="{escape(agent_p)}"/>'
+    # s{i}_j = nombre de passagers candidats 1..j affectés à la voiture i (compteur séquentiel, hébergé par i)
+    for i, v in voitures_compteur:
+        K = int(capacite_par_voiture[v])
+        for j in passagers_de[i-1]:
+            yield f'    <variable name="s{i}_{j}" domain="cpt{K}" agent="{escape(v)}"/>'
+    yield '  </variables>'
 
-        nb_tuples = len(tuples_cout)
-        if nb_tuples == 0:
-            # Cas pathologique : aucune voiture; on met relation vide avec defaultCost=0 (variable sans choix)
-            relations.append(
-                f'    <relation name="{nom_rel}" arity="1" semantics="soft" defaultCost="0" nbTuples="0"></relation>'
-            )
-        else:
-            relations.append(
-                f'    <relation name="{nom_rel}" arity="1" semantics="soft" defaultCost="0" nbTuples="{nb_tuples}">\n'
-                + " | ".join(tuples_cout)
-                + '\n    </relation>'
-            )
-        contraintes.append(
-            f'    <constraint name="c_{nom_var}" arity="1" scope="{nom_var}" reference="{nom_rel}"/>'
-        )
+def construire_instance_xcsp_alt(
+    voitures: List[str],
+    passagers: List[str],
+    capacite_par_voiture: Dict[str, int],
+    couts: Union[Dict[Tuple[str, str], int], np.ndarray],
+    nom: str = "ramassage_alt_auto",
+    format_str: str = "XCSP 2.1_FRODO",
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+    placement: str = "cyclique",
+    charge_max: Optional[int] = None,
+) -> str:
+    """
+    Construit une instance DCOP (Modélisation 2) :
+    Variables y_j = {1, 2, ..., N_voitures}. Agent = voiture "responsable" (placement : cyclique,
+    plus proche ou partition, cf. placer_variables_m2).
+    Unicité par passager naturelle. Capacités : facteurs n-aires (K+1) soft interdits,
+    ou compteur séquentiel s{v}_j = {0..K} par voiture (encodage_capacite="compteur").
+    stats : StatsGeneration à remplir (cf. iterer_instance_xcsp_alt), phase « assemblage » comprise.
+    """
+    return _assembler(iterer_instance_xcsp_alt(
+        voitures, passagers, capacite_par_voiture, couts, nom=nom, format_str=format_str,
+        encodage_capacite=encodage_capacite, stats=stats, placement=placement, charge_max=charge_max,
+    ), stats)
 
-    # 6. Capacités par voiture : pour chaque voiture v de capacité K,
-    #    interdire tout sous-ensemble de K+1 passagers assignés à v (valeur domaine = valeur_v)
-    if nb_passagers > 0:
-        for v in voitures:
-            K = int(capacite_par_voiture[v])
-            if K >= nb_passagers:
-                continue  # aucune contrainte (capacité >= nb passagers)
-            valeur_v = id_voiture_vers_valeur[v]
-            vars_passagers = [nom_var_par_passager[p] for p in passagers]
-
-            for idx, sous_ensemble in enumerate(combinations(vars_passagers, K + 1), start=1):
-                portee_str = " ".join(sous_ensemble)
-                valeurs_interdites = " ".join(str(valeur_v) for _ in sous_ensemble)
-                nom_rel = f"CAP_V{valeur_v}_SUBSET{idx}"
-                relations.append(
-                    f'    <relation name="{nom_rel}" arity="{K+1}" semantics="soft" defaultCost="0" nbTuples="1">{INFINITY_COST}: {valeurs_interdites}</relation>'
-                )
-                contraintes.append(
-                    f'    <constraint name="cap_{escape(v)}_{idx}" arity="{K+1}" scope="{portee_str}" reference="{nom_rel}"/>'
-                )
-
-    # 7. Assemblage final
-    xml.append(f'  <relations nbRelations="{len(relations)}">')
-    xml.extend(relations)
-    xml.append('  </relations>')
-
-    xml.append(f'  <constraints nbConstraints="{len(contraintes)}">')
-    xml.extend(contraintes)
-    xml.append('  </constraints>')
-    xml.append('</instance>')
-    return "\n".join(xml)
+def ecrire_xml(flux: TextIO, lignes: Iterable[str]) -> int:
+    """
+    Écrit les lignes produites par un itérateur (iterer_instance_xcsp, iterer_json_vers_xml, ...)
+    dans un fichier texte ouvert, avec le même contenu que la chaîne construite en mémoire.
+    Retourne le nombre de caractères écrits.
+    """
+    nb_caracteres = 0
+    separateur = ""
+    for ligne in lignes:
+        nb_caracteres += flux.write(separateur + ligne)
+        separateur = "\n"
+    return nb_caracteres
 
 # ----------------------------------------------------------------------
 # Fonctions de Génération et Conversion JSON (inchangées)
@@ -283,6 +943,173 @@ def generer_positions_aleatoires(n: int, largeur: float, hauteur: float, graine:
     rng = random.Random(graine)
     return [(rng.uniform(0, largeur), rng.uniform(0, hauteur)) for _ in range(n)]
 
+def candidats_proches(
+    pos_voitures,
+    pos_passagers,
+    k_voisins: Optional[int] = None,
+    rayon: Optional[float] = None,
+) -> np.ndarray:
+    """
+    Masque |V| x |P| des voitures candidates de chaque passager : ses k_voisins voitures les plus
+    proches (distance de ramassage, égalités départagées par indice) et/ou celles à moins de `rayon` ;
+    la plus proche est toujours gardée. Le coût de dépose ne dépend que du passager : les k plus
+    proches sont aussi les k moins chères.
+    Les voitures sont rangées dans une grille uniforme (environ k voitures par case) ; pour chaque
+    passager, on parcourt les anneaux de cases autour de la sienne jusqu'à ce qu'aucune case plus
+    lointaine ne puisse contenir de candidat, sans calculer les |V| x |P| distances.
+    """
+    pos_v = np.asarray(pos_voitures, dtype=float).reshape(-1, 2)
+    pos_p = np.asarray(pos_passagers, dtype=float).reshape(-1, 2)
+    nb_voitures, nb_passagers = len(pos_v), len(pos_p)
+    masque = np.zeros((nb_voitures, nb_passagers), dtype=bool)
+    if k_voisins is None and rayon is None:
+        masque[:] = True
+        return masque
+    if nb_voitures == 0 or nb_passagers == 0:
+        return masque
+    k = nb_voitures if k_voisins is None else min(max(int(k_voisins), 1), nb_voitures)
+
+    # Grille : n x n cases de côté `cote` couvrant les voitures
+    origine = pos_v.min(axis=0)
+    etendue = max(float(np.ptp(pos_v, axis=0).max()), 1e-9)
+    n = max(1, int(math.sqrt(nb_voitures / k)))
+    cote = etendue / n
+    cases_v = np.clip(np.floor((pos_v - origine) / cote).astype(np.int64), 0, n - 1)
+    ordre = np.lexsort((cases_v[:, 1], cases_v[:, 0]))
+    index: Dict[Tuple[int, int], np.ndarray] = {}
+    cles, debuts = np.unique(cases_v[ordre], axis=0, return_index=True)
+    for (cx, cy), debut, fin in zip(cles.tolist(), debuts.tolist(), debuts[1:].tolist() + [nb_voitures]):
+        index[(cx, cy)] = ordre[debut:fin]
+
+    cases_p = np.floor((pos_p - origine) / cote).astype(np.int64)
+    vide = np.empty(0, dtype=np.int64)
+    for j, ((px, py), (cx, cy)) in enumerate(zip(pos_p.tolist(), cases_p.tolist())):
+        # Premier anneau pouvant toucher la grille (passager hors de l'emprise des voitures)
+        r = max(0, -cx, cx - (n - 1), -cy, cy - (n - 1))
+        trouvees, distances = [], []
+        while True:
+            if r == 0:
+                anneau = [index.get((cx, cy), vide)]
+            else:
+                anneau = [index.get((x, y), vide)
+                          for x in range(max(cx - r, 0), min(cx + r, n - 1) + 1)
+                          for y in (cy - r, cy + r) if 0 <= y < n]
+                anneau += [index.get((x, y), vide)
+                           for x in (cx - r, cx + r) if 0 <= x < n
+                           for y in range(max(cy - r + 1, 0), min(cy + r - 1, n - 1) + 1)]
+            for ids in anneau:
+                if len(ids):
+                    trouvees.append(ids)
+                    distances.append(np.hypot(pos_v[ids, 0] - px, pos_v[ids, 1] - py))
+            # Toute voiture d'un anneau plus lointain est à plus de r * cote du passager
+            # (les voitures à moins de `rayon` sont toutes vues quand borne > rayon ; la plus proche
+            # trouvée est bien la plus proche dès qu'elle est à moins de borne)
+            borne = r * cote
+            nb_trouvees = sum(len(ids) for ids in trouvees)
+            if nb_trouvees == nb_voitures:
+                break
+            if nb_trouvees and rayon is not None and borne > rayon and min(d.min() for d in distances) <= borne:
+                break
+            if nb_trouvees >= k and np.partition(np.concatenate(distances), k - 1)[k - 1] <= borne:
+                break
+            r += 1
+        ids, d = np.concatenate(trouvees), np.concatenate(distances)
+        rang = np.lexsort((ids, d))
+        garder = rang[:k] if k_voisins is not None else rang
+        if rayon is not None:
+            garder = garder[d[garder] <= rayon] if (d[garder] <= rayon).any() else rang[:1]
+        masque[ids[garder], j] = True
+    return masque
+
+def matrice_couts_a_partir_positions(
+    voitures: List[Tuple[str, int, Tuple[float, float]]],        # (id_voiture, capacite, (x,y))
+    passagers: List[Tuple[str, Tuple[float, float]]],            # (id_passager, (x,y))
+    couts_entiers: bool = True,
+    mode_depot: str = "aucun",                                   # "aucun" | "commun" | "par_passager"
+    dest_commune: Tuple[float,float] = None,                     # si "commun"
+    dest_par_passager: Dict[str, Tuple[float,float]] = None,     # si "par_passager"
+    poids_ramassage: float = 1.0,
+    poids_depot: float = 1.0,
+    candidats: Optional[np.ndarray] = None,
+    reseau=None,
+) -> np.ndarray:
+    """
+    Matrice des coûts (|V| x |P|, voitures en lignes) calculée en une passe NumPy :
+    Coût(v, p) = poids_ramassage * dist(pos_v, pos_p) + poids_depot * dist(pos_p, dest).
+    Entiers arrondis (int64) si couts_entiers, flottants sinon. Avec un masque `candidats`
+    (cf. candidats_proches), seuls ces couples sont calculés, les autres valent COUT_NON_CANDIDAT.
+    dist : euclidienne, ou distance routière si `reseau` (ReseauRoutier de reseau_routier.py, ou tout
+    objet offrant distances(origines, cibles) et distances_paires(origines, cibles)).
+    """
+    pos_v = np.array([pos_v for (_, _, pos_v) in voitures], dtype=float).reshape(-1, 2)
+    pos_p = np.array([pos_p for (_, pos_p) in passagers], dtype=float).reshape(-1, 2)
+
+    # Distance de dépose : un vecteur par passager, le mode n'est examiné qu'une fois
+    d_depot = np.zeros(len(passagers))
+    if mode_depot == "commun":
+        if dest_commune is None:
+            raise ValueError("dest_commune requise avec mode_depot='commun'")
+        if reseau is not None:
+            d_depot = reseau.distances(pos_p, [dest_commune])[:, 0]
+        else:
+            d_depot = np.hypot(pos_p[:, 0] - dest_commune[0], pos_p[:, 1] - dest_commune[1])
+    elif mode_depot == "par_passager":
+        manquants = [id_p for (id_p, _) in passagers if dest_par_passager is None or id_p not in dest_par_passager]
+        if manquants:
+            raise ValueError(f"Destination manquante pour {manquants[0]}")
+        dest = np.array([dest_par_passager[id_p] for (id_p, _) in passagers], dtype=float).reshape(-1, 2)
+        if reseau is not None:
+            d_depot = reseau.distances_paires(pos_p, dest)
+        else:
+            d_depot = np.hypot(pos_p[:, 0] - dest[:, 0], pos_p[:, 1] - dest[:, 1])
+
+    if reseau is not None:
+        # Une recherche par nœud de départ distinct, pour tous les passagers à la fois (cf. ReseauRoutier)
+        d_ramassage = reseau.distances(pos_v, pos_p)
+        valeur = poids_ramassage * d_ramassage + poids_depot * d_depot[None, :]
+        matrice = np.rint(valeur).astype(np.int64) if couts_entiers else valeur
+        if candidats is not None:
+            matrice = np.where(candidats, matrice, COUT_NON_CANDIDAT).astype(matrice.dtype)
+        return matrice
+    if candidats is not None:
+        lignes, colonnes = np.nonzero(candidats)
+        d_ramassage = np.hypot(pos_v[lignes, 0] - pos_p[colonnes, 0], pos_v[lignes, 1] - pos_p[colonnes, 1])
+        valeur = poids_ramassage * d_ramassage + poids_depot * d_depot[colonnes]
+        matrice = np.full((len(voitures), len(passagers)), COUT_NON_CANDIDAT,
+                          dtype=np.int64 if couts_entiers else float)
+        matrice[lignes, colonnes] = np.rint(valeur) if couts_entiers else valeur
+        return matrice
+    d_ramassage = np.hypot(pos_v[:, None, 0] - pos_p[None, :, 0], pos_v[:, None, 1] - pos_p[None, :, 1])
+    valeur = poids_ramassage * d_ramassage + poids_depot * d_depot[None, :]
+    # np.rint arrondit au pair le plus proche, comme round()
+    return np.rint(valeur).astype(np.int64) if couts_entiers else valeur
+
+def _dict_couts(ids_v: List[str], ids_p: List[str], matrice: np.ndarray, candidats: Optional[np.ndarray] = None) -> dict:
+    """Clé "couts" du JSON : {id_voiture: {id_passager: coût}}, couples candidats seulement si masque."""
+    if candidats is None:
+        return {id_v: dict(zip(ids_p, ligne)) for id_v, ligne in zip(ids_v, matrice.tolist())}
+    return {
+        id_v: {ids_p[j]: ligne[j] for j in np.flatnonzero(garder).tolist()}
+        for id_v, ligne, garder in zip(ids_v, matrice.tolist(), candidats)
+    }
+
+def _infos_depot(mode_depot, dest_commune, dest_par_passager, poids_ramassage, poids_depot) -> dict:
+    """Destinations et poids à stocker dans le JSON d'instance pour la traçabilité."""
+    infos = {}
+    if mode_depot == "commun" and dest_commune is not None:
+        infos["destination"] = {"x": dest_commune[0], "y": dest_commune[1]}
+        infos["mode_depot"] = "commun"
+        infos["poids_ramassage"] = poids_ramassage
+        infos["poids_depot"] = poids_depot
+    if mode_depot == "par_passager" and dest_par_passager is not None:
+        infos["destinations"] = {
+            id_p: {"x": d[0], "y": d[1]} for id_p, d in dest_par_passager.items()
+        }
+        infos["mode_depot"] = "par_passager"
+        infos["poids_ramassage"] = poids_ramassage
+        infos["poids_depot"] = poids_depot
+    return infos
+
 def construire_json_a_partir_positions(
     nom: str,
     voitures: List[Tuple[str, int, Tuple[float, float]]],        # (id_voiture, capacite, (x,y))
@@ -293,29 +1120,32 @@ def construire_json_a_partir_positions(
     dest_par_passager: Dict[str, Tuple[float,float]] = None,     # si "par_passager"
     poids_ramassage: float = 1.0,
     poids_depot: float = 1.0,
+    retourner_matrice: bool = False,
+    k_voisins: Optional[int] = None,
+    rayon: Optional[float] = None,
+    reseau=None,
 ):
     """
     Construit un objet JSON décrivant l'instance (positions/capacités/coûts).
     Coût(v, p) = poids_ramassage * dist(pos_v, pos_p) + poids_depot * dist(pos_p, dest).
+    Avec k_voisins et/ou rayon, seuls les couples candidats (cf. candidats_proches) sont calculés et
+    écrits dans "couts" ; la clé "elagage" marque l'instance comme élaguée.
+    reseau : distances routières (cf. matrice_couts_a_partir_positions), décrites dans la clé "reseau" ;
+    l'élagage reste fondé sur la distance euclidienne.
+    Si retourner_matrice, retourne (obj_json, matrice |V| x |P|) (cf. matrice_couts_a_partir_positions).
     """
-    # Calcul des coûts
-    couts = {}
-    for id_v, _, pos_v in voitures:
-        for id_p, pos_p in passagers:
-            d_ramassage = euclid(pos_v, pos_p)
-            d_depot = 0.0
-
-            if mode_depot == "commun":
-                if dest_commune is None:
-                    raise ValueError("dest_commune requise avec mode_depot='commun'")
-                d_depot = euclid(pos_p, dest_commune)
-            elif mode_depot == "par_passager":
-                if dest_par_passager is None or id_p not in dest_par_passager:
-                    raise ValueError(f"Destination manquante pour {id_p}")
-                d_depot = euclid(pos_p, dest_par_passager[id_p])
-
-            valeur = poids_ramassage * d_ramassage + poids_depot * d_depot
-            couts[(id_v, id_p)] = int(round(valeur)) if couts_entiers else valeur
+    elagage = k_voisins is not None or rayon is not None
+    candidats = None
+    if elagage:
+        candidats = candidats_proches([pos for (_, _, pos) in voitures], [pos for (_, pos) in passagers],
+                                      k_voisins=k_voisins, rayon=rayon)
+    # Calcul des coûts (vectorisé)
+    matrice = matrice_couts_a_partir_positions(
+        voitures, passagers, couts_entiers=couts_entiers, mode_depot=mode_depot,
+        dest_commune=dest_commune, dest_par_passager=dest_par_passager,
+        poids_ramassage=poids_ramassage, poids_depot=poids_depot, candidats=candidats, reseau=reseau,
+    )
+    ids_p = [id_p for (id_p, _) in passagers]
 
     obj_json = {
         "nom": nom,
@@ -327,52 +1157,372 @@ def construire_json_a_partir_positions(
         "positions_passagers": {
             id_p: {"x": pos_p[0], "y": pos_p[1]} for (id_p, pos_p) in passagers
         },
-        "couts": {
-            id_v: {id_p: couts[(id_v, id_p)] for (id_p, _) in passagers}
-            for (id_v, _, _) in voitures
-        },
+        "couts": _dict_couts([id_v for (id_v, _, _) in voitures], ids_p, matrice, candidats),
     }
-    # Stocker les destinations pour la traçabilité
-    if mode_depot == "commun" and dest_commune is not None:
-        obj_json["destination"] = {"x": dest_commune[0], "y": dest_commune[1]}
-        obj_json["mode_depot"] = "commun"
-        obj_json["poids_ramassage"] = poids_ramassage
-        obj_json["poids_depot"] = poids_depot
-    if mode_depot == "par_passager" and dest_par_passager is not None:
-        obj_json["destinations"] = {
-            id_p: {"x": d[0], "y": d[1]} for id_p, d in dest_par_passager.items()
-        }
-        obj_json["mode_depot"] = "par_passager"
-        obj_json["poids_ramassage"] = poids_ramassage
-        obj_json["poids_depot"] = poids_depot
+    obj_json.update(_infos_depot(mode_depot, dest_commune, dest_par_passager, poids_ramassage, poids_depot))
+    if elagage:
+        obj_json["elagage"] = {"k_voisins": k_voisins, "rayon": rayon}
+    if reseau is not None:
+        obj_json["reseau"] = reseau.description()
+    if retourner_matrice:
+        return obj_json, matrice
     return obj_json
 
-def json_vers_xml(obj_json: dict, modelisation: int = 1) -> str:
+def generer_instance_aleatoire(
+    nom: str,
+    n_voitures: int,
+    n_passagers: int,
+    capacite: int,
+    graine: int,
+    largeur: float = 100.0,
+    hauteur: float = 100.0,
+    couts_entiers: bool = True,
+    mode_depot: str = "commun",                                  # "aucun" | "commun" | "par_passager"
+    poids_ramassage: float = 1.0,
+    poids_depot: float = 1.0,
+    k_voisins: Optional[int] = None,
+    rayon: Optional[float] = None,
+    reseau=None,
+) -> dict:
     """
-    Convertit un objet JSON d'instance en chaîne XML XCSP en utilisant la modélisation choisie.
+    Instance aléatoire reproductible, tirée comme dans l'app : voitures v1..vN (graine),
+    passagers p1..pP (graine+1), destination commune (graine+500) ou par passager (graine+999).
+    k_voisins / rayon : élagage des voitures candidates (cf. candidats_proches).
+    reseau : coûts en distance routière ; les positions sont alors tirées dans l'emprise du réseau
+    (largeur / hauteur ignorées).
+    """
+    origine = (0.0, 0.0)
+    if reseau is not None:
+        x0, y0, x1, y1 = reseau.emprise()
+        origine, largeur, hauteur = (x0, y0), x1 - x0, y1 - y0
+
+    def decaler(positions):
+        return [(origine[0] + x, origine[1] + y) for (x, y) in positions]
+
+    pos_voitures = decaler(generer_positions_aleatoires(n_voitures, largeur, hauteur, graine))
+    pos_passagers = decaler(generer_positions_aleatoires(n_passagers, largeur, hauteur, graine + 1))
+    voitures = [(f"v{i+1}", int(capacite), pos_voitures[i]) for i in range(n_voitures)]
+    passagers = [(f"p{j+1}", pos_passagers[j]) for j in range(n_passagers)]
+    dest_commune, dest_par = None, None
+    if mode_depot == "commun":
+        dest_commune = decaler(generer_positions_aleatoires(1, largeur, hauteur, graine + 500))[0]
+    elif mode_depot == "par_passager":
+        pos_dest_par = decaler(generer_positions_aleatoires(n_passagers, largeur, hauteur, graine + 999))
+        dest_par = {passagers[j][0]: pos_dest_par[j] for j in range(n_passagers)}
+    return construire_json_a_partir_positions(
+        nom, voitures, passagers, couts_entiers=couts_entiers, mode_depot=mode_depot,
+        dest_commune=dest_commune, dest_par_passager=dest_par,
+        poids_ramassage=poids_ramassage, poids_depot=poids_depot,
+        k_voisins=k_voisins, rayon=rayon, reseau=reseau,
+    )
+
+# ----------------------------------------------------------------------
+# Représentation compacte (tableaux NumPy) et fichiers .npz / .npy
+# ----------------------------------------------------------------------
+
+class InstanceCompacte:
+    """
+    Instance sous forme de tableaux : identifiants, capacités (int32), positions (float64, NaN si
+    inconnues) et matrice de coûts int32 |V| x |P| (voitures en lignes), sans objet Python par couple.
+    Les couples écartés par l'élagage y valent COUT_NON_CANDIDAT (cf. `candidats`).
+    Les autres clés du JSON (destinations, mode_depot, poids, elagage, ...) sont conservées dans `extras`.
     """
-    voitures = [v["id"] for v in obj_json["voitures"]]
-    passagers = list(obj_json["passagers"])
 
-    # Récupérer les capacités (avec une valeur par défaut si absente)
-    capacite_par_voiture = {v["id"]: int(v.get("capacite", len(passagers))) for v in obj_json["voitures"]}
+    __slots__ = ("nom", "voitures", "passagers", "capacites", "pos_voitures", "pos_passagers", "couts", "extras")
 
-    # Reconstruire le dictionnaire de coûts pour la fonction XCSP
-    couts = {(id_v, id_p): int(obj_json["couts"][id_v][id_p])
-             for id_v in obj_json["couts"]
-             for id_p in obj_json["couts"][id_v]}
+    def __init__(self, nom, voitures, passagers, capacites, couts, pos_voitures=None, pos_passagers=None, extras=None):
+        self.nom = nom
+        self.voitures = np.asarray(voitures, dtype=str).reshape(-1)
+        self.passagers = np.asarray(passagers, dtype=str).reshape(-1)
+        self.capacites = np.asarray(capacites, dtype=np.int32).reshape(-1)
+        self.couts = couts if isinstance(couts, np.memmap) else np.asarray(couts, dtype=np.int32)
+        nb_v, nb_p = len(self.voitures), len(self.passagers)
+        self.couts = self.couts.reshape(nb_v, nb_p)
+        self.pos_voitures = (np.full((nb_v, 2), np.nan) if pos_voitures is None
+                             else np.asarray(pos_voitures, dtype=float).reshape(nb_v, 2))
+        self.pos_passagers = (np.full((nb_p, 2), np.nan) if pos_passagers is None
+                              else np.asarray(pos_passagers, dtype=float).reshape(nb_p, 2))
+        self.extras = dict(extras or {})
+
+    def __repr__(self) -> str:
+        return f"InstanceCompacte(nom={self.nom!r}, voitures={len(self.voitures)}, passagers={len(self.passagers)})"
+
+    # --- Conversions ---------------------------------------------------
+
+    @classmethod
+    def depuis_positions(
+        cls,
+        nom: str,
+        voitures: List[Tuple[str, int, Tuple[float, float]]],
+        passagers: List[Tuple[str, Tuple[float, float]]],
+        mode_depot: str = "aucun",
+        dest_commune: Tuple[float,float] = None,
+        dest_par_passager: Dict[str, Tuple[float,float]] = None,
+        poids_ramassage: float = 1.0,
+        poids_depot: float = 1.0,
+    ) -> "InstanceCompacte":
+        """Même entrée que construire_json_a_partir_positions (coûts entiers), sans dict de coûts."""
+        matrice = matrice_couts_a_partir_positions(
+            voitures, passagers, couts_entiers=True, mode_depot=mode_depot,
+            dest_commune=dest_commune, dest_par_passager=dest_par_passager,
+            poids_ramassage=poids_ramassage, poids_depot=poids_depot,
+        )
+        return cls(
+            nom,
+            [id_v for (id_v, _, _) in voitures],
+            [id_p for (id_p, _) in passagers],
+            [cap for (_, cap, _) in voitures],
+            matrice.astype(np.int32),
+            pos_voitures=[pos for (_, _, pos) in voitures],
+            pos_passagers=[pos for (_, pos) in passagers],
+            extras=_infos_depot(mode_depot, dest_commune, dest_par_passager, poids_ramassage, poids_depot),
+        )
+
+    @classmethod
+    def depuis_json(cls, obj_json: dict, couts: Optional[np.ndarray] = None) -> "InstanceCompacte":
+        """
+        Construit l'instance depuis l'objet JSON (couts dict de dicts, ou matrice fournie). Dans une
+        instance élaguée (clé "elagage"), les couples absents de "couts" sont des non-candidats.
+        """
+        voitures = [v["id"] for v in obj_json["voitures"]]
+        passagers = list(obj_json["passagers"])
+        # Capacité par défaut : nb de passagers (comme json_vers_xml)
+        capacites = [int(v.get("capacite", len(passagers))) for v in obj_json["voitures"]]
+        if couts is None and "elagage" in obj_json:
+            couts = np.full((len(voitures), len(passagers)), COUT_NON_CANDIDAT, dtype=np.int32)
+            rang_p = {id_p: j for j, id_p in enumerate(passagers)}
+            for i, id_v in enumerate(voitures):
+                ligne = obj_json["couts"].get(id_v, {})
+                couts[i, [rang_p[id_p] for id_p in ligne]] = [int(c) for c in ligne.values()]
+        elif couts is None:
+            try:
+                couts = np.array(
+                    [[int(obj_json["couts"][id_v][id_p]) for id_p in passagers] for id_v in voitures],
+                    dtype=np.int32,
+                ).reshape(len(voitures), len(passagers))
+            except KeyError as e:
+                raise ValueError(f"Coût manquant dans le JSON : {e}") from None
+        nan = {"x": math.nan, "y": math.nan}
+        pos_voitures = [(v.get("pos", nan)["x"], v.get("pos", nan)["y"]) for v in obj_json["voitures"]]
+        positions_p = obj_json.get("positions_passagers", {})
+        pos_passagers = [(positions_p.get(p, nan)["x"], positions_p.get(p, nan)["y"]) for p in passagers]
+        extras = {
+            cle: val for cle, val in obj_json.items()
+            if cle not in ("nom", "voitures", "passagers", "positions_passagers", "couts", "couts_npy")
+        }
+        return cls(obj_json.get("nom"), voitures, passagers, capacites, couts,
+                   pos_voitures=pos_voitures, pos_passagers=pos_passagers, extras=extras)
+
+    def vers_json(self, avec_couts: bool = True) -> dict:
+        """Objet JSON au format de construire_json_a_partir_positions."""
+        ids_v, ids_p = self.voitures.tolist(), self.passagers.tolist()
+        obj_json = {
+            "nom": self.nom,
+            "voitures": [
+                {"id": id_v, "capacite": cap, "pos": {"x": pos[0], "y": pos[1]}}
+                for id_v, cap, pos in zip(ids_v, self.capacites.tolist(), self.pos_voitures.tolist())
+            ],
+            "passagers": ids_p,
+            "positions_passagers": {
+                id_p: {"x": pos[0], "y": pos[1]} for id_p, pos in zip(ids_p, self.pos_passagers.tolist())
+            },
+        }
+        if avec_couts:
+            obj_json["couts"] = _dict_couts(ids_v, ids_p, self.couts, self.candidats)
+        obj_json.update(self.extras)
+        return obj_json
+
+    @property
+    def candidats(self) -> Optional[np.ndarray]:
+        """Masque |V| x |P| des couples candidats d'une instance élaguée, None si tous le sont."""
+        return _candidats(self.couts)
+
+    def elaguer(self, k_voisins: Optional[int] = None, rayon: Optional[float] = None) -> "InstanceCompacte":
+        """
+        Nouvelle instance ne gardant que les voitures candidates de chaque passager (cf. candidats_proches).
+        Sans positions connues, seul k_voisins s'applique : les k voitures de coût minimal.
+        """
+        if k_voisins is None and rayon is None:
+            return self
+        masque = np.asarray(self.couts) != COUT_NON_CANDIDAT
+        if not (np.isnan(self.pos_voitures).any() or np.isnan(self.pos_passagers).any()):
+            masque &= candidats_proches(self.pos_voitures, self.pos_passagers, k_voisins=k_voisins, rayon=rayon)
+        elif k_voisins is None:
+            raise ValueError("Élagage par rayon impossible sans positions")
+        else:
+            couts = np.where(masque, self.couts, COUT_NON_CANDIDAT).astype(np.int64)
+            plus_proches = np.zeros_like(masque)
+            np.put_along_axis(plus_proches, np.argsort(couts, axis=0, kind="stable")[:max(int(k_voisins), 1)],
+                              True, axis=0)
+            masque &= plus_proches
+        couts = np.where(masque, self.couts, COUT_NON_CANDIDAT).astype(np.int32)
+        extras = {**self.extras, "elagage": {"k_voisins": k_voisins, "rayon": rayon}}
+        return InstanceCompacte(self.nom, self.voitures, self.passagers, self.capacites, couts,
+                                pos_voitures=self.pos_voitures, pos_passagers=self.pos_passagers, extras=extras)
+
+    def arguments_constructeur(self):
+        """(voitures, passagers, capacite_par_voiture, couts) pour construire_instance_xcsp(_alt)."""
+        voitures = self.voitures.tolist()
+        return voitures, self.passagers.tolist(), dict(zip(voitures, self.capacites.tolist())), self.couts
+
+    # --- Fichiers --------------------------------------------------------
+
+    def sauver_npz(self, chemin: str, compresse: bool = True) -> None:
+        """Tous les tableaux dans un seul .npz (métadonnées JSON dans la clé 'meta')."""
+        sauver = np.savez_compressed if compresse else np.savez
+        sauver(
+            chemin,
+            voitures=self.voitures, passagers=self.passagers, capacites=self.capacites,
+            pos_voitures=self.pos_voitures, pos_passagers=self.pos_passagers, couts=self.couts,
+            meta=np.array(json.dumps({"nom": self.nom, "extras": self.extras}, ensure_ascii=False)),
+        )
+
+    @classmethod
+    def charger_npz(cls, chemin: str) -> "InstanceCompacte":
+        with np.load(chemin, allow_pickle=False) as donnees:
+            meta = json.loads(str(donnees["meta"]))
+            return cls(meta["nom"], donnees["voitures"], donnees["passagers"], donnees["capacites"],
+                       donnees["couts"], pos_voitures=donnees["pos_voitures"],
+                       pos_passagers=donnees["pos_passagers"], extras=meta["extras"])
+
+    def sauver(self, chemin_json: str) -> str:
+        """
+        Écrit le JSON d'instance sans les coûts, et la matrice dans un fichier .npy voisin
+        (<nom>.couts.npy, référencé par la clé "couts_npy"). Retourne le chemin du .npy.
+        """
+        base = chemin_json[:-5] if chemin_json.endswith(".json") else chemin_json
+        chemin_npy = base + ".couts.npy"
+        np.save(chemin_npy, np.ascontiguousarray(self.couts, dtype=np.int32))
+        obj_json = self.vers_json(avec_couts=False)
+        obj_json["couts_npy"] = os.path.basename(chemin_npy)
+        with open(chemin_json, "w", encoding="utf-8") as f:
+            json.dump(obj_json, f, indent=2, ensure_ascii=False)
+        return chemin_npy
+
+    @classmethod
+    def charger(cls, chemin_json: str, mmap: bool = True) -> "InstanceCompacte":
+        """
+        Charge un JSON d'instance. Si une matrice .npy voisine est référencée ("couts_npy"),
+        elle est projetée en mémoire (mmap_mode="r") et lue à la demande.
+        """
+        with open(chemin_json, encoding="utf-8") as f:
+            obj_json = json.load(f)
+        couts = None
+        if "couts_npy" in obj_json:
+            chemin_npy = os.path.join(os.path.dirname(os.path.abspath(chemin_json)), obj_json["couts_npy"])
+            couts = np.load(chemin_npy, mmap_mode="r" if mmap else None)
+        return cls.depuis_json(obj_json, couts=couts)
+
+def iterer_json_vers_xml(
+    obj_json: Union[dict, InstanceCompacte],
+    modelisation: int = 1,
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+    placement: str = "cyclique",
+) -> Iterator[str]:
+    """
+    Version en flux de json_vers_xml : produit les lignes XML une à une
+    (à écrire avec ecrire_xml, sans jamais construire la chaîne complète).
+    Accepte l'objet JSON ou directement une InstanceCompacte. stats : cf. StatsGeneration.
+    placement : agents des y_j en Modélisation 2 (PLACEMENTS), ignoré en Modélisation 1.
+    """
+    instance = obj_json if isinstance(obj_json, InstanceCompacte) else InstanceCompacte.depuis_json(obj_json)
+    voitures, passagers, capacite_par_voiture, couts = instance.arguments_constructeur()
 
     if modelisation == 1:
-        return construire_instance_xcsp(
-            voitures, passagers, capacite_par_voiture, couts, nom=obj_json.get("nom", "ramassage_auto_M1")
+        return iterer_instance_xcsp(
+            voitures, passagers, capacite_par_voiture, couts,
+            nom=instance.nom if instance.nom is not None else "ramassage_auto_M1",
+            encodage_capacite=encodage_capacite, stats=stats,
         )
     elif modelisation == 2:
-        return construire_instance_xcsp_alt(
-            voitures, passagers, capacite_par_voiture, couts, nom=obj_json.get("nom", "ramassage_auto_M2")
+        return iterer_instance_xcsp_alt(
+            voitures, passagers, capacite_par_voiture, couts,
+            nom=instance.nom if instance.nom is not None else "ramassage_auto_M2",
+            encodage_capacite=encodage_capacite, stats=stats, placement=placement,
         )
     else:
         raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
 
+def dimensions_instance(
+    obj_json: Union[dict, InstanceCompacte], modelisation: int = 1, encodage_capacite: str = "sous_ensembles"
+) -> dict:
+    """
+    Tailles exactes du XML que produirait json_vers_xml, sans le générer : nb_agents, nb_variables,
+    nb_relations, nb_contraintes, max_arity (maxConstraintArity), domaines {nom: taille}
+    et arites {arité: nb de contraintes}.
+    """
+    _verifier_encodage(encodage_capacite)
+    instance = obj_json if isinstance(obj_json, InstanceCompacte) else InstanceCompacte.depuis_json(obj_json)
+    voitures, passagers, capacite_par_voiture, couts = instance.arguments_constructeur()
+    if modelisation == 1:
+        return _dimensions_m1(voitures, passagers, capacite_par_voiture, couts, encodage_capacite)
+    elif modelisation == 2:
+        return _dimensions_m2(voitures, passagers, capacite_par_voiture, couts, encodage_capacite)
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+
+# Débit d'écriture mesuré des constructeurs en flux (octets de XML par seconde, ordre de grandeur)
+DEBIT_GENERATION_OCTETS_S = 25e6
+
+def estimer_instance(
+    n_voitures: int,
+    n_passagers: int,
+    capacites: Union[int, List[int]],
+    modelisation: int = 1,
+    encodage_capacite: str = "sous_ensembles",
+    nb_relations_couts: Optional[int] = None,
+) -> dict:
+    """
+    Estimation avant génération, sans rien construire : mêmes clés que dimensions_instance
+    (formules des constructeurs) + octets_xml et temps_s approchés.
+    capacites : capacité commune ou liste par voiture. nb_relations_couts (coûts unaires
+    distincts) inconnu avant le tirage : majoré par |V|·|P| (M1) ou |P| (M2), d'où un
+    nb_relations majorant ; les autres comptes sont exacts.
+    """
+    _verifier_encodage(encodage_capacite)
+    if isinstance(capacites, (int, np.integer)):
+        capacites_par_voiture = [int(capacites)] * n_voitures
+    else:
+        capacites_par_voiture = [int(K) for K in capacites]
+    if modelisation == 1:
+        if nb_relations_couts is None:
+            nb_relations_couts = n_voitures * n_passagers
+        tailles = _tailles_m1(n_voitures, n_passagers, capacites_par_voiture, nb_relations_couts, encodage_capacite)
+        long_var = len(f"x{n_voitures}{n_passagers}")
+        octets_relations = 110 * tailles["nb_relations"]
+    elif modelisation == 2:
+        if nb_relations_couts is None:
+            nb_relations_couts = n_passagers if n_voitures else min(n_passagers, 1)
+        tailles = _tailles_m2(n_voitures, n_passagers, capacites_par_voiture, nb_relations_couts, encodage_capacite)
+        long_var = len(f"y{n_passagers}")
+        # Corps "c: i | ..." des relations unaires : une entrée par voiture
+        octets_relations = 110 * tailles["nb_relations"] + nb_relations_couts * n_voitures * (8 + len(str(n_voitures)))
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+
+    # Longueurs moyennes de ligne : balises fixes + noms, portée = arité x (nom de variable + espace)
+    long_agent = len(f"v{n_voitures}")
+    octets = 400 + 30 * n_voitures + octets_relations
+    octets += tailles["nb_variables"] * (45 + long_var + long_agent)
+    octets += sum(nb * (80 + arite * (long_var + 1)) for arite, nb in tailles["arites"].items())
+    return {**tailles, "octets_xml": int(octets), "temps_s": octets / DEBIT_GENERATION_OCTETS_S}
+
+def json_vers_xml(
+    obj_json: Union[dict, InstanceCompacte],
+    modelisation: int = 1,
+    encodage_capacite: str = "sous_ensembles",
+    stats: Optional[StatsGeneration] = None,
+    placement: str = "cyclique",
+) -> str:
+    """
+    Convertit un objet JSON d'instance en chaîne XML XCSP en utilisant la modélisation choisie.
+    encodage_capacite : "sous_ensembles" (historique) ou "compteur" (taille polynomiale).
+    stats : StatsGeneration à remplir (temps, éléments, octets par phase), None pour ne rien mesurer.
+    placement : agents des y_j en Modélisation 2 (cf. placer_variables_m2).
+    """
+    return _assembler(iterer_json_vers_xml(obj_json, modelisation, encodage_capacite, stats, placement), stats)
+
 def afficher_json_joli(obj: dict) -> str:
     """Affiche un objet JSON avec une indentation propre."""
     return json.dumps(obj, indent=2, ensure_ascii=False)
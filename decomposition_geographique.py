@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# decomposition_geographique.py — Découpage d'une instance en régions géographiques indépendantes
+# (un JSON + XML par région, carte de fusion), résolution parallèle et recombinaison en une affectation globale.
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from constructeur_dcop import (
+    ENCODAGES_CAPACITE,
+    PLACEMENTS,
+    InstanceCompacte,
+    ecrire_xml,
+    generer_instance_aleatoire,
+    iterer_json_vers_xml,
+)
+from evaluateur_solutions import affectation_en_tableau, chemin_journal, charger_affectation, evaluer, resume_violations
+from generation_lot import ecrire_atomique, empreinte_options, nom_instance, nom_xml
+from lanceur_bench import MOTEURS, executer_job
+from simulateur_dcop import ALGORITHMES
+from solveur_exact import affectation_optimale
+
+# Moteurs de résolution des régions : ceux de lanceur_bench, plus l'optimum exact par région
+MOTEURS_REGION = (*MOTEURS, "exact")
+
+def _instance(obj: Union[dict, InstanceCompacte]) -> InstanceCompacte:
+    return obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+
+# ----------------------------------------------------------------------
+# Régions : k-moyennes sur les voitures, passagers répartis sous capacité
+# ----------------------------------------------------------------------
+
+def regrouper_voitures(pos_voitures: np.ndarray, nb_regions: int, graine: int = 0, iterations: int = 50) -> np.ndarray:
+    """
+    Région de chaque voiture : k-moyennes (initialisation k-means++, graine fixée) sur les positions.
+    Les régions restées vides sont supprimées ; les régions sont renumérotées 0..R-1.
+    """
+    pos = np.asarray(pos_voitures, dtype=float).reshape(-1, 2)
+    nb_voitures = len(pos)
+    nb_regions = max(1, min(int(nb_regions), nb_voitures))
+    if nb_voitures == 0:
+        return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(graine)
+    centres = [pos[rng.integers(nb_voitures)]]
+    for _ in range(1, nb_regions):
+        d2 = ((pos[:, None, :] - np.array(centres)[None]) ** 2).sum(axis=2).min(axis=1)
+        total = d2.sum()
+        centres.append(pos[rng.choice(nb_voitures, p=d2 / total)] if total > 0 else pos[rng.integers(nb_voitures)])
+    centres = np.array(centres)
+    region = np.full(nb_voitures, -1, dtype=np.int64)
+    for _ in range(iterations):
+        nouvelle = ((pos[:, None, :] - centres[None]) ** 2).sum(axis=2).argmin(axis=1)
+        if (nouvelle == region).all():
+            break
+        region = nouvelle
+        for r in range(len(centres)):
+            if (region == r).any():
+                centres[r] = pos[region == r].mean(axis=0)
+    return np.unique(region, return_inverse=True)[1].astype(np.int64)
+
+def repartir_passagers(
+    distances: np.ndarray,
+    capacites_regions: np.ndarray,
+    admissibles: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Région de chaque passager, distances |P| x |R| au centre des régions : la plus proche, puis tant
+    qu'une région dépasse sa capacité (somme des capacités de ses voitures), ses passagers les moins
+    pénalisés partent vers la région non pleine la plus proche, par paquets. `admissibles` (|P| x |R|) :
+    régions contenant une voiture candidate du passager (instance élaguée).
+    ValueError si la capacité totale (ou admissible) ne suffit pas.
+    """
+    d = np.asarray(distances, dtype=float)
+    if admissibles is not None:
+        d = np.where(admissibles, d, np.inf)
+    nb_passagers, nb_regions = d.shape
+    capacites_regions = np.asarray(capacites_regions, dtype=np.int64)
+    if capacites_regions.sum() < nb_passagers:
+        raise ValueError(f"Capacité totale {int(capacites_regions.sum())} insuffisante pour {nb_passagers} passagers")
+    region = d.argmin(axis=1) if nb_regions else np.zeros(nb_passagers, dtype=np.int64)
+    if nb_passagers and np.isinf(d[np.arange(nb_passagers), region]).any():
+        raise ValueError("Passager sans région admissible")
+    charges = np.bincount(region, minlength=nb_regions)
+    while True:
+        exces = charges - capacites_regions
+        if (exces <= 0).all():
+            return region
+        surcharges = np.flatnonzero(exces[region] > 0)
+        libres = np.flatnonzero(exces < 0)
+        # Surcoût de chaque déplacement possible (passager d'une région pleine -> région non pleine)
+        surcout = d[surcharges][:, libres] - d[surcharges, region[surcharges]][:, None]
+        if not np.isfinite(surcout).any():
+            raise ValueError("Répartition impossible : capacités des régions admissibles insuffisantes")
+        k, t = np.unravel_index(np.argmin(surcout), surcout.shape)
+        source, cible = region[surcharges[k]], libres[t]
+        # Paquet : passagers de la source, du moins pénalisé au plus pénalisé, vers la même cible
+        dans_source = region[surcharges] == source
+        ordre = np.argsort(np.where(dans_source, surcout[:, t], np.inf), kind="stable")
+        nb = int(min(exces[source], -exces[cible], np.isfinite(surcout[dans_source, t]).sum()))
+        deplaces = surcharges[ordre[:nb]]
+        region[deplaces] = cible
+        charges[source] -= nb
+        charges[cible] += nb
+
+def decouper(obj: Union[dict, InstanceCompacte], nb_regions: int, graine: int = 0) -> Tuple[List[InstanceCompacte], dict]:
+    """
+    Sous-instances <nom>_r<r> (voitures d'une région et passagers qui y sont répartis, mêmes coûts et
+    capacités) et carte de fusion {"instance", "nb_regions", "graine", "regions": [{"region", "nom",
+    "voitures", "passagers", "capacite", "centre"}]}. Positions requises. Les régions sans passager
+    sont conservées (voitures vides) pour que la carte couvre toutes les voitures.
+    """
+    instance = _instance(obj)
+    if np.isnan(instance.pos_voitures).any() or np.isnan(instance.pos_passagers).any():
+        raise ValueError("Découpage géographique impossible : positions inconnues")
+    region_v = regrouper_voitures(instance.pos_voitures, nb_regions, graine)
+    nb_regions = int(region_v.max()) + 1 if len(region_v) else 0
+    centres = np.array([instance.pos_voitures[region_v == r].mean(axis=0) for r in range(nb_regions)]).reshape(-1, 2)
+    distances = np.hypot(instance.pos_passagers[:, None, 0] - centres[None, :, 0],
+                         instance.pos_passagers[:, None, 1] - centres[None, :, 1])
+    capacites_regions = np.bincount(region_v, weights=np.minimum(instance.capacites, len(instance.passagers)),
+                                    minlength=nb_regions)
+    admissibles = None
+    if instance.candidats is not None:
+        admissibles = np.stack([instance.candidats[region_v == r].any(axis=0) for r in range(nb_regions)], axis=1)
+    region_p = repartir_passagers(distances, capacites_regions, admissibles)
+
+    sous_instances, regions = [], []
+    for r in range(nb_regions):
+        iv, ip = np.flatnonzero(region_v == r), np.flatnonzero(region_p == r)
+        nom = f"{instance.nom}_r{r}"
+        sous_instances.append(InstanceCompacte(
+            nom, instance.voitures[iv], instance.passagers[ip], instance.capacites[iv],
+            np.ascontiguousarray(instance.couts[np.ix_(iv, ip)]),
+            pos_voitures=instance.pos_voitures[iv], pos_passagers=instance.pos_passagers[ip], extras=instance.extras,
+        ))
+        regions.append({
+            "region": r, "nom": nom,
+            "voitures": instance.voitures[iv].tolist(), "passagers": instance.passagers[ip].tolist(),
+            "capacite": int(capacites_regions[r]), "centre": {"x": float(centres[r, 0]), "y": float(centres[r, 1])},
+        })
+    carte = {"instance": instance.nom, "nb_regions": nb_regions, "graine": graine, "regions": regions}
+    return sous_instances, carte
+
+# ----------------------------------------------------------------------
+# Fichiers : un JSON + XML par région, carte de fusion
+# ----------------------------------------------------------------------
+
+def chemin_carte(dossier: str, nom: str) -> str:
+    return os.path.join(dossier, f"{nom}.decoupage.json")
+
+def _ecrire_region(tache: tuple) -> str:
+    """
+    Dans un processus du pool : <nom>.json et ses XML (nom_xml) d'une région, toujours réécrits : le
+    contenu d'une région <instance>_r<r> dépend du nombre de régions et de la graine du découpage.
+    """
+    obj_json, dossier_instances, modelisations, encodage_capacite, placement = tache
+    nom = obj_json["nom"]
+    ecrire_atomique(os.path.join(dossier_instances, f"{nom}.json"), lambda f: json.dump(obj_json, f, ensure_ascii=False))
+    for m in modelisations:
+        chemin_xml = os.path.join(dossier_instances, nom_xml(nom, m, encodage_capacite, placement))
+        ecrire_atomique(chemin_xml, lambda f: ecrire_xml(
+            f, iterer_json_vers_xml(obj_json, m, encodage_capacite, placement=placement)))
+    return nom
+
+def ecrire_decoupage(
+    obj: Union[dict, InstanceCompacte],
+    dossier: str,
+    nb_regions: int,
+    modelisations: Tuple[int, ...] = (1, 2),
+    encodage_capacite: str = "sous_ensembles",
+    placement: str = "cyclique",
+    graine: int = 0,
+    nb_processus: Optional[int] = None,
+) -> str:
+    """
+    Écrit l'instance globale et chaque région dans <dossier>/instances/ (disposition de lanceur_bench :
+    <nom>.json, XML nommés par nom_xml ; régions réécrites à chaque appel, en parallèle) et la carte <dossier>/<nom>.decoupage.json
+    (régions, modélisations, encodage, placement). Retourne le chemin de la carte.
+    """
+    instance = _instance(obj)
+    sous_instances, carte = decouper(instance, nb_regions, graine)
+    dossier_instances = os.path.join(dossier, "instances")
+    os.makedirs(dossier_instances, exist_ok=True)
+    chemin_global = os.path.join(dossier_instances, f"{instance.nom}.json")
+    obj_global = obj if isinstance(obj, dict) else instance.vers_json()
+    ecrire_atomique(chemin_global, lambda f: json.dump(obj_global, f, ensure_ascii=False))
+    taches = [(s.vers_json(), dossier_instances, tuple(modelisations), encodage_capacite, placement)
+              for s in sous_instances if len(s.passagers)]
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        for nom in pool.map(_ecrire_region, taches):
+            print(f"[OK] Région {nom} écrite")
+    carte.update({"json": os.path.basename(chemin_global), "modelisations": list(modelisations),
+                  "encodage_capacite": encodage_capacite, "placement": placement})
+    chemin = chemin_carte(dossier, instance.nom)
+    ecrire_atomique(chemin, lambda f: json.dump(carte, f, indent=2, ensure_ascii=False))
+    return chemin
+
+# ----------------------------------------------------------------------
+# Résolution parallèle et recombinaison
+# ----------------------------------------------------------------------
+
+def _voitures_par_passager(tableau: np.ndarray, modelisation: int) -> np.ndarray:
+    """Indice de voiture de chaque passager (-1 si aucune ou plusieurs) depuis affectation_en_tableau."""
+    if modelisation == 2:
+        return tableau
+    uns = tableau == 1
+    return np.where(uns.sum(axis=0) == 1, uns.argmax(axis=0), -1)
+
+def _resoudre_region(tache: tuple) -> dict:
+    """
+    Dans un processus du pool : résout une région (executer_job de lanceur_bench, ou optimum exact)
+    et relit son affectation dans le journal. Retourne {"nom", "statut", "total_cost", "runtime_ms",
+    "affectation"} ; affectation vide si le journal n'est pas relisible (noms M1 ambigus).
+    """
+    nom, dossier, modelisation, algorithme, moteur, timeout, options, encodage_capacite, placement, graine = tache
+    dossier_instances, dossier_logs = os.path.join(dossier, "instances"), os.path.join(dossier, "logs")
+    instance = InstanceCompacte.charger(os.path.join(dossier_instances, f"{nom}.json"))
+    if moteur == "exact":
+        resultat = affectation_optimale(instance)
+        return {"nom": nom, "statut": "ok", "total_cost": None if resultat is None else resultat[0],
+                "runtime_ms": None, "affectation": {} if resultat is None else resultat[1]}
+    ligne = executer_job({
+        "instance": nom, "modelisation": modelisation, "algorithme": algorithme, "timeout": timeout,
+        "moteur": moteur, "options": options, "encodage_capacite": encodage_capacite, "placement": placement,
+        "graine": graine, "dossier_instances": dossier_instances, "dossier_logs": dossier_logs,
+    })
+    journal = chemin_journal(dossier_logs, nom_xml(nom, modelisation, encodage_capacite, placement), algorithme)
+    voitures = instance.voitures.tolist()
+    try:
+        indices = _voitures_par_passager(
+            affectation_en_tableau(instance, modelisation, charger_affectation(journal)), modelisation)
+    except ValueError as e:
+        print(f"[WARN] {nom} : {e}")
+        indices = np.full(len(instance.passagers), -1)
+    cout = ligne["ligne"]["total_cost"]
+    return {
+        "nom": nom, "statut": ligne["statut"], "total_cost": None if cout in ("", None) else int(cout),
+        "runtime_ms": ligne["ligne"]["runtime_ms"],
+        "affectation": {p: voitures[i] for p, i in zip(instance.passagers.tolist(), indices.tolist()) if 0 <= i < len(voitures)},
+    }
+
+def recombiner(obj: Union[dict, InstanceCompacte], affectations: List[Dict[str, str]]) -> dict:
+    """
+    Affectation globale {passager: voiture} réunissant celles des régions, évaluée sur l'instance
+    complète (evaluateur_solutions, sous forme de x_ij) : total_cost (None si un passager est sans
+    voiture ou une contrainte est violée), faisable, violations.
+    """
+    instance = _instance(obj)
+    globale = {p: v for affectation in affectations for p, v in affectation.items()}
+    rang_v = {v: i for i, v in enumerate(instance.voitures.tolist())}
+    X = np.zeros((len(instance.voitures), len(instance.passagers)), dtype=np.int64)
+    for j, p in enumerate(instance.passagers.tolist()):
+        if p in globale:
+            X[rang_v[globale[p]], j] = 1
+    resultat = evaluer(instance, 1, X)
+    return {"affectation": globale, "total_cost": resultat["total_cost"], "faisable": resultat["faisable"],
+            "violations": resultat["violations"]}
+
+def resoudre_decoupage(
+    chemin: str,
+    modelisation: int = 2,
+    algorithme: str = "MaxSum",
+    moteur: str = "simulateur",
+    timeout: float = 60.0,
+    options: Optional[dict] = None,
+    graine: int = 0,
+    nb_processus: Optional[int] = None,
+) -> dict:
+    """
+    Résout toutes les régions d'une carte de découpage dans un pool de processus, puis recombine.
+    Écrit <dossier>/<instance>_M<m>_<algo>.solution.json (affectation globale, coût total, résultats
+    par région) et le retourne.
+    """
+    if moteur not in MOTEURS_REGION:
+        raise ValueError(f"Moteur inconnu '{moteur}'. Choisissez parmi {MOTEURS_REGION}.")
+    with open(chemin, encoding="utf-8") as f:
+        carte = json.load(f)
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    os.makedirs(os.path.join(dossier, "logs"), exist_ok=True)
+    options = {"cycles": 200, "memoire_jvm": "2g", "frodo_jar": "frodo2.jar", "frodo_agents": "agents", **(options or {})}
+    taches = [(r["nom"], dossier, modelisation, algorithme, moteur, timeout, options,
+               carte["encodage_capacite"], carte["placement"], graine)
+              for r in carte["regions"] if r["passagers"]]
+    regions = []
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        for futur in as_completed([pool.submit(_resoudre_region, t) for t in taches]):
+            resultat = futur.result()
+            print(f"[OK] {resultat['nom']} : coût={resultat['total_cost']} ({resultat['statut']})")
+            regions.append(resultat)
+    regions.sort(key=lambda r: r["nom"])
+    instance = InstanceCompacte.charger(os.path.join(dossier, "instances", carte["json"]))
+    solution = recombiner(instance, [r["affectation"] for r in regions])
+    solution.update({
+        "instance": carte["instance"], "modelisation": modelisation, "algorithm": algorithme, "moteur": moteur,
+        "nb_regions": len(regions),
+        "regions": [{cle: r[cle] for cle in ("nom", "statut", "total_cost", "runtime_ms")} for r in regions],
+        # Régions résolues en parallèle : le temps de résolution est celui de la plus lente
+        "runtime_ms": max((r["runtime_ms"] or 0 for r in regions), default=0),
+    })
+    sortie = os.path.join(dossier, f"{carte['instance']}_M{modelisation}_{algorithme if moteur != 'exact' else 'exact'}.solution.json")
+    ecrire_atomique(sortie, lambda f: json.dump(solution, f, indent=2, ensure_ascii=False))
+    return solution
+
+def main():
+    ap = argparse.ArgumentParser(description="Découpage géographique d'une instance en régions résolues en parallèle.")
+    ap.add_argument("--instance", default=None, help="JSON d'instance (avec positions) ; sinon instance aléatoire")
+    ap.add_argument("--voitures", type=int, default=20, help="Instance aléatoire : nombre de voitures")
+    ap.add_argument("--passagers", type=int, default=100, help="Instance aléatoire : nombre de passagers")
+    ap.add_argument("--capacite", type=int, default=6, help="Instance aléatoire : capacité par voiture")
+    ap.add_argument("--graine", type=int, default=0, help="Graine de l'instance aléatoire et des k-moyennes")
+    ap.add_argument("--k-voisins", type=int, default=None, help="Instance aléatoire : élagage des candidats")
+    ap.add_argument("--regions", type=int, default=4, help="Nombre de régions (k-moyennes sur les voitures)")
+    ap.add_argument("--dossier", default="results/decoupage", help="Dossier de sortie (instances/, logs/, carte)")
+    ap.add_argument("--modelisations", type=int, nargs="+", choices=[1, 2], default=[1, 2])
+    ap.add_argument("--encodage", choices=ENCODAGES_CAPACITE, default="sous_ensembles")
+    ap.add_argument("--placement", choices=PLACEMENTS, default="cyclique")
+    ap.add_argument("--resoudre", action="store_true", help="Résoudre les régions et recombiner")
+    ap.add_argument("--moteur", choices=MOTEURS_REGION, default="simulateur")
+    ap.add_argument("--algorithmes", nargs="+", default=["MaxSum"],
+                    help=f"Algorithmes (simulateur : {', '.join(ALGORITHMES)} ; ignoré avec le moteur exact)")
+    ap.add_argument("--timeout", type=float, default=60.0, help="Timeout par région (s)")
+    ap.add_argument("--cycles", type=int, default=200, help="Cycles du simulateur")
+    ap.add_argument("--frodo-jar", default="frodo2.jar")
+    ap.add_argument("--frodo-agents", default="agents")
+    ap.add_argument("--memoire-jvm", default="2g")
+    ap.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut : nb de CPU)")
+    args = ap.parse_args()
+
+    if args.instance:
+        with open(args.instance, encoding="utf-8") as f:
+            obj_json = json.load(f)
+    else:
+        obj_json = generer_instance_aleatoire(
+            nom_instance(args.voitures, args.passagers, args.capacite, args.graine,
+                         empreinte_options({"k_voisins": args.k_voisins})),
+            args.voitures, args.passagers, args.capacite, args.graine, k_voisins=args.k_voisins)
+    chemin = ecrire_decoupage(obj_json, args.dossier, args.regions, tuple(args.modelisations), args.encodage,
+                              args.placement, args.graine, args.jobs)
+    print(f"[OK] Carte de découpage : {chemin}")
+    if not args.resoudre:
+        return
+    options = {"cycles": args.cycles, "frodo_jar": args.frodo_jar, "frodo_agents": args.frodo_agents,
+               "memoire_jvm": args.memoire_jvm}
+    for m in args.modelisations:
+        for algo in (["exact"] if args.moteur == "exact" else args.algorithmes):
+            solution = resoudre_decoupage(chemin, m, algo, args.moteur, args.timeout, options, args.graine, args.jobs)
+            etat = "faisable" if solution["faisable"] else f"infaisable ({resume_violations(solution['violations'], 5)})"
+            print(f"[OK] M{m} / {algo} : coût total={solution['total_cost']}, {solution['nb_regions']} région(s), {etat}")
+            if obj_json.get("cout_optimal") is not None:
+                print(f"[INFO] Optimum global : {obj_json['cout_optimal']}")
+        if args.moteur == "exact":
+            break
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+# edition_instance.py — Édition incrémentale d'une instance (voitures / passagers ajoutés, retirés, déplacés,
+# capacités modifiées) : matrice de coûts mise à jour ligne ou colonne, XML réassemblé depuis les segments intacts.
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from constructeur_dcop import (
+    INFINITY_COST,
+    PLACEMENTS,
+    InstanceCompacte,
+    _RegistreRelations,
+    _ligne_contrainte,
+    _tailles_m1,
+    _tailles_m2,
+    _tuples_compteur,
+    _verifier_encodage,
+    json_vers_xml,
+    placer_variables_m2,
+)
+from reseau_routier import ajouter_arguments, charger_reseau, options_reseau
+
+# Opérations acceptées par InstanceEditable.appliquer (clé "op" d'un script d'édition)
+OPERATIONS = ("ajouter_passager", "retirer_passager", "deplacer_passager",
+              "ajouter_voiture", "retirer_voiture", "deplacer_voiture", "fixer_capacite")
+
+def _reserver(tableau: np.ndarray, taille: int, axe: int) -> np.ndarray:
+    """Tableau dont la dimension `axe` peut accueillir `taille` éléments (capacité doublée au besoin)."""
+    if tableau.shape[axe] >= taille:
+        return tableau
+    forme = list(tableau.shape)
+    forme[axe] = max(2 * tableau.shape[axe], taille, 8)
+    agrandi = np.zeros(forme, dtype=tableau.dtype)
+    agrandi[tuple(slice(0, n) for n in tableau.shape)] = tableau
+    return agrandi
+
+class InstanceEditable:
+    """
+    Instance modifiable en place, pour les scénarios « what-if » : chaque opération met à jour la matrice
+    de coûts sur une ligne ou une colonne (O(|P|) ou O(|V|)) et ne marque à régénérer que les segments XML
+    qu'elle touche (variables, relations et contraintes d'une voiture ou d'un passager). vers_xml()
+    réassemble le XML à partir des segments intacts ; il est identique, octet pour octet, à
+    json_vers_xml(self.instance(), ...).
+    Les retraits déplacent le dernier élément à la place libérée (ordre non conservé), pour que seuls
+    les noms x{i}{j} / y{j} de cet élément changent. Instances non élaguées seulement.
+    reseau : ReseauRoutier de l'instance (clé « reseau »), requis pour recalculer ses coûts en distance routière.
+    """
+
+    def __init__(
+        self,
+        instance: Union[dict, InstanceCompacte],
+        modelisation: int = 1,
+        encodage_capacite: str = "sous_ensembles",
+        placement: str = "cyclique",
+        format_str: str = "XCSP 2.1_FRODO",
+        reseau=None,
+    ):
+        instance = instance if isinstance(instance, InstanceCompacte) else InstanceCompacte.depuis_json(instance)
+        _verifier_encodage(encodage_capacite)
+        if modelisation not in (1, 2):
+            raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+        if placement not in PLACEMENTS:
+            raise ValueError(f"Placement inconnu '{placement}'. Choisissez parmi {PLACEMENTS}.")
+        if instance.candidats is not None:
+            raise ValueError("Instance élaguée : l'édition incrémentale suppose tous les couples candidats")
+        if len(instance.voitures) == 0 or len(instance.passagers) == 0:
+            raise ValueError("Il faut au moins une voiture et un passager")
+        decrit = instance.extras.get("reseau")
+        if (decrit is None) != (reseau is None) or (reseau is not None and decrit["empreinte"] != reseau.empreinte):
+            raise ValueError("Le réseau routier fourni doit être celui de l'instance (clé « reseau »)")
+        self.nom = instance.nom
+        self.modelisation = modelisation
+        self.encodage_capacite = encodage_capacite
+        self.placement = placement
+        self.format_str = format_str
+        self.reseau = reseau
+        self.extras = dict(instance.extras)
+        if "destinations" in self.extras:
+            # Modifiées par les opérations : copie, pour ne pas toucher le JSON d'origine
+            self.extras["destinations"] = dict(self.extras["destinations"])
+        self._ids_v: List[str] = instance.voitures.tolist()
+        self._ids_p: List[str] = instance.passagers.tolist()
+        self._capacites: List[int] = instance.capacites.tolist()
+        self._rang_v = {id_v: a for a, id_v in enumerate(self._ids_v)}
+        self._rang_p = {id_p: b for b, id_p in enumerate(self._ids_p)}
+        # Tableaux à capacité doublée au besoin : seules les |V| premières lignes / |P| premières colonnes comptent
+        self._couts = np.array(instance.couts, dtype=np.int32)
+        self._pos_v = np.array(instance.pos_voitures, dtype=float)
+        self._pos_p = np.array(instance.pos_passagers, dtype=float)
+        self._depot = self._distances_depot(self._ids_p, self._pos_p)
+        # Segments XML (None : à régénérer)
+        nb_v, nb_p = self.nb_voitures, self.nb_passagers
+        self._vars_x: List[Optional[List[str]]] = [None] * nb_v    # M1 : <variable> x{i}{j} de la voiture i
+        self._couts_x: List[Optional[List[str]]] = [None] * nb_v   # M1 : contraintes cout_x{i}{j}
+        self._vars_s: List[Optional[List[str]]] = [None] * nb_v    # compteur : <variable> s{i}_j
+        self._capacite: List[Optional[List[str]]] = [None] * nb_v  # contraintes de capacité de la voiture i
+        self._passager: List[Optional[str]] = [None] * nb_p        # M1 : AMO + tout-zéro du passager j
+        self._relation_y: List[Optional[tuple]] = [None] * nb_p    # M2 : relation Cost_y{j}
+        self._relations_cap: Dict[tuple, List[tuple]] = {}
+        self.stats = Counter()
+
+    def __repr__(self) -> str:
+        return (f"InstanceEditable(nom={self.nom!r}, voitures={self.nb_voitures}, passagers={self.nb_passagers}, "
+                f"M{self.modelisation}, {self.encodage_capacite})")
+
+    # --- État ------------------------------------------------------------
+
+    @property
+    def nb_voitures(self) -> int:
+        return len(self._ids_v)
+
+    @property
+    def nb_passagers(self) -> int:
+        return len(self._ids_p)
+
+    @property
+    def voitures(self) -> List[str]:
+        return list(self._ids_v)
+
+    @property
+    def passagers(self) -> List[str]:
+        return list(self._ids_p)
+
+    @property
+    def couts(self) -> np.ndarray:
+        """Vue |V| x |P| de la matrice de coûts courante (voitures en lignes)."""
+        return self._couts[:self.nb_voitures, :self.nb_passagers]
+
+    def instance(self) -> InstanceCompacte:
+        """Copie de l'état courant en InstanceCompacte (évaluation, solveurs, json_vers_xml)."""
+        nb_v, nb_p = self.nb_voitures, self.nb_passagers
+        return InstanceCompacte(self.nom, self._ids_v, self._ids_p, self._capacites, self.couts.copy(),
+                                pos_voitures=self._pos_v[:nb_v], pos_passagers=self._pos_p[:nb_p], extras=self.extras)
+
+    def vers_json(self) -> dict:
+        return self.instance().vers_json()
+
+    # --- Coûts -------------------------------------------------------------
+
+    def _poids(self) -> Tuple[float, float]:
+        return float(self.extras.get("poids_ramassage", 1.0)), float(self.extras.get("poids_depot", 1.0))
+
+    def _distances(self, origines: np.ndarray, cibles: np.ndarray) -> np.ndarray:
+        """Matrice |origines| x |cibles| des distances routières (réseau de l'instance)."""
+        if np.isnan(origines).any() or np.isnan(cibles).any():
+            raise ValueError("Positions inconnues : fournir les coûts explicitement")
+        return self.reseau.distances(origines, cibles)
+
+    def _distances_depot(self, ids_p: List[str], pos_p: np.ndarray) -> np.ndarray:
+        """Distance de dépose de chaque passager (mêmes opérations que matrice_couts_a_partir_positions)."""
+        pos_p = np.asarray(pos_p, dtype=float).reshape(-1, 2)[:len(ids_p)]
+        mode = self.extras.get("mode_depot", "aucun")
+        if mode == "commun":
+            dest = self.extras["destination"]
+            if self.reseau is not None:
+                return self._distances(pos_p, np.array([[dest["x"], dest["y"]]], dtype=float))[:, 0]
+            return np.hypot(pos_p[:, 0] - dest["x"], pos_p[:, 1] - dest["y"])
+        if mode == "par_passager":
+            destinations = self.extras.get("destinations", {})
+            manquants = [id_p for id_p in ids_p if id_p not in destinations]
+            if manquants:
+                raise ValueError(f"Destination manquante pour {manquants[0]}")
+            dest = np.array([(destinations[id_p]["x"], destinations[id_p]["y"]) for id_p in ids_p],
+                            dtype=float).reshape(-1, 2)
+            if self.reseau is not None:
+                if np.isnan(pos_p).any():
+                    raise ValueError("Positions inconnues : fournir les coûts explicitement")
+                return self.reseau.distances_paires(pos_p, dest)
+            return np.hypot(pos_p[:, 0] - dest[:, 0], pos_p[:, 1] - dest[:, 1])
+        return np.zeros(len(ids_p))
+
+    def _arrondir(self, valeur: np.ndarray) -> np.ndarray:
+        if np.isnan(valeur).any():
+            raise ValueError("Positions inconnues : fournir les coûts explicitement")
+        return np.rint(valeur).astype(np.int32)
+
+    def _colonne_couts(self, b: int) -> np.ndarray:
+        """Coûts du passager b pour chaque voiture : O(|V|)."""
+        poids_ramassage, poids_depot = self._poids()
+        pos_v, (x, y) = self._pos_v[:self.nb_voitures], self._pos_p[b]
+        if self.reseau is not None:
+            return self._arrondir(poids_ramassage * self._distances(pos_v, self._pos_p[b:b + 1])[:, 0]
+                                  + poids_depot * self._depot[b])
+        return self._arrondir(poids_ramassage * np.hypot(pos_v[:, 0] - x, pos_v[:, 1] - y) + poids_depot * self._depot[b])
+
+    def _ligne_couts(self, a: int) -> np.ndarray:
+        """Coûts de la voiture a pour chaque passager : O(|P|)."""
+        poids_ramassage, poids_depot = self._poids()
+        pos_p, (x, y) = self._pos_p[:self.nb_passagers], self._pos_v[a]
+        if self.reseau is not None:
+            d_ramassage = self._distances(self._pos_v[a:a + 1], pos_p)[0]
+        else:
+            d_ramassage = np.hypot(x - pos_p[:, 0], y - pos_p[:, 1])
+        return self._arrondir(poids_ramassage * d_ramassage + poids_depot * self._depot[:self.nb_passagers])
+
+    def _fixer_destination(self, id_p: str, destination) -> None:
+        if destination is None:
+            return
+        if self.extras.get("mode_depot") != "par_passager":
+            raise ValueError("Destination par passager sans objet hors mode_depot='par_passager'")
+        self.extras["destinations"] = {**self.extras.get("destinations", {}),
+                                       id_p: {"x": float(destination[0]), "y": float(destination[1])}}
+
+    def _modifiee(self) -> None:
+        # L'optimum éventuellement stocké ne vaut plus pour l'instance modifiée
+        self.extras.pop("cout_optimal", None)
+        self.stats["operations"] += 1
+
+    # --- Opérations --------------------------------------------------------
+
+    def _voiture(self, id_v: str) -> int:
+        if id_v not in self._rang_v:
+            raise KeyError(f"Voiture inconnue : {id_v}")
+        return self._rang_v[id_v]
+
+    def _passager_rang(self, id_p: str) -> int:
+        if id_p not in self._rang_p:
+            raise KeyError(f"Passager inconnu : {id_p}")
+        return self._rang_p[id_p]
+
+    def ajouter_passager(self, id_p: str, pos: Optional[Sequence[float]] = None, destination=None,
+                         couts: Optional[Sequence[int]] = None) -> int:
+        """
+        Ajoute un passager en dernière position (indice retourné). Coûts calculés depuis pos (et sa
+        destination en mode par_passager), ou fournis par voiture dans `couts`.
+        """
+        if id_p in self._rang_p:
+            raise ValueError(f"Passager déjà présent : {id_p}")
+        b = self.nb_passagers
+        self._couts = _reserver(self._couts, b + 1, 1)
+        self._pos_p = _reserver(self._pos_p, b + 1, 0)
+        self._depot = _reserver(self._depot, b + 1, 0)
+        self._pos_p[b] = (np.nan, np.nan) if pos is None else pos
+        self._fixer_destination(id_p, destination)
+        self._depot[b] = self._distances_depot([id_p], self._pos_p[b:b + 1])[0] if pos is not None else 0.0
+        self._couts[:self.nb_voitures, b] = (self._colonne_couts(b) if couts is None
+                                             else np.asarray(couts, dtype=np.int32).reshape(self.nb_voitures))
+        self._ids_p.append(id_p)
+        self._rang_p[id_p] = b
+        for a in range(self.nb_voitures):
+            for lignes, ligne in ((self._vars_x[a], self._ligne_var_x), (self._couts_x[a], self._ligne_cout_x)):
+                if lignes is not None:
+                    lignes.append(ligne(a, b))
+        self._passager.append(None)
+        self._relation_y.append(None)
+        self._capacites_apres_passager(b, ajout=True)
+        self._modifiee()
+        return b
+
+    def retirer_passager(self, id_p: str) -> None:
+        """Retire un passager ; le dernier passager prend sa place (seuls ses segments changent de nom)."""
+        b = self._passager_rang(id_p)
+        dernier = self.nb_passagers - 1
+        if dernier == 0:
+            raise ValueError("Impossible de retirer le dernier passager")
+        if b != dernier:
+            id_dernier = self._ids_p[dernier]
+            self._couts[:, b] = self._couts[:, dernier]
+            self._pos_p[b], self._depot[b] = self._pos_p[dernier], self._depot[dernier]
+            self._ids_p[b] = id_dernier
+            self._rang_p[id_dernier] = b
+            for a in range(self.nb_voitures):
+                if self._couts_x[a] is not None:
+                    self._couts_x[a][b] = self._ligne_cout_x(a, b)
+            self._passager[b] = None
+            self._relation_y[b] = None
+        self._ids_p.pop()
+        del self._rang_p[id_p]
+        if id_p in self.extras.get("destinations", {}):
+            self.extras["destinations"] = {cle: d for cle, d in self.extras["destinations"].items() if cle != id_p}
+        for a in range(self.nb_voitures):
+            for lignes in (self._vars_x[a], self._couts_x[a]):
+                if lignes is not None:
+                    lignes.pop()
+        self._passager.pop()
+        self._relation_y.pop()
+        self._capacites_apres_passager(dernier, ajout=False)
+        self._modifiee()
+
+    def deplacer_passager(self, id_p: str, pos: Sequence[float], destination=None) -> None:
+        """Nouvelle position (et destination en mode par_passager) : une colonne de coûts, O(|V|)."""
+        b = self._passager_rang(id_p)
+        self._pos_p[b] = pos
+        self._fixer_destination(id_p, destination)
+        self._depot[b] = self._distances_depot([id_p], self._pos_p[b:b + 1])[0]
+        self._couts[:self.nb_voitures, b] = self._colonne_couts(b)
+        for a in range(self.nb_voitures):
+            if self._couts_x[a] is not None:
+                self._couts_x[a][b] = self._ligne_cout_x(a, b)
+        self._relation_y[b] = None
+        self._modifiee()
+
+    def ajouter_voiture(self, id_v: str, capacite: int, pos: Optional[Sequence[float]] = None,
+                        couts: Optional[Sequence[int]] = None) -> int:
+        """Ajoute une voiture en dernière position (indice retourné) ; coûts depuis pos ou fournis par passager."""
+        if id_v in self._rang_v:
+            raise ValueError(f"Voiture déjà présente : {id_v}")
+        a = self.nb_voitures
+        self._couts = _reserver(self._couts, a + 1, 0)
+        self._pos_v = _reserver(self._pos_v, a + 1, 0)
+        self._pos_v[a] = (np.nan, np.nan) if pos is None else pos
+        self._couts[a, :self.nb_passagers] = (self._ligne_couts(a) if couts is None
+                                              else np.asarray(couts, dtype=np.int32).reshape(self.nb_passagers))
+        self._ids_v.append(id_v)
+        self._capacites.append(int(capacite))
+        self._rang_v[id_v] = a
+        for segments in (self._vars_x, self._couts_x, self._vars_s, self._capacite):
+            segments.append(None)
+        self._apres_changement_voitures()
+        self._modifiee()
+        return a
+
+    def retirer_voiture(self, id_v: str) -> None:
+        """Retire une voiture ; la dernière voiture prend sa place (seuls ses segments changent de nom)."""
+        a = self._voiture(id_v)
+        dernier = self.nb_voitures - 1
+        if dernier == 0:
+            raise ValueError("Impossible de retirer la dernière voiture")
+        if a != dernier:
+            id_dernier = self._ids_v[dernier]
+            self._couts[a] = self._couts[dernier]
+            self._pos_v[a] = self._pos_v[dernier]
+            self._capacites[a] = self._capacites[dernier]
+            self._ids_v[a] = id_dernier
+            self._rang_v[id_dernier] = a
+            for segments in (self._vars_x, self._couts_x, self._vars_s, self._capacite):
+                segments[a] = None
+        self._ids_v.pop()
+        self._capacites.pop()
+        del self._rang_v[id_v]
+        for segments in (self._vars_x, self._couts_x, self._vars_s, self._capacite):
+            segments.pop()
+        self._apres_changement_voitures()
+        self._modifiee()
+
+    def deplacer_voiture(self, id_v: str, pos: Sequence[float]) -> None:
+        """Nouvelle position d'une voiture : une ligne de coûts, O(|P|)."""
+        a = self._voiture(id_v)
+        self._pos_v[a] = pos
+        self._couts[a, :self.nb_passagers] = self._ligne_couts(a)
+        self._couts_x[a] = None
+        # M2 : chaque relation Cost_y{j} contient le coût de cette voiture
+        self._relation_y = [None] * self.nb_passagers
+        self._modifiee()
+
+    def fixer_capacite(self, id_v: str, capacite: int) -> None:
+        """Nouvelle capacité : seuls les compteurs et contraintes de capacité de la voiture sont régénérés."""
+        a = self._voiture(id_v)
+        self._capacites[a] = int(capacite)
+        self._vars_s[a] = None
+        self._capacite[a] = None
+        self._modifiee()
+
+    def appliquer(self, operation: dict):
+        """
+        Applique une opération décrite par un dict (script d'édition JSON) :
+        {"op": "deplacer_passager", "id": "p3", "pos": [x, y]}, {"op": "fixer_capacite", "id": "v1", "capacite": 2}, ...
+        """
+        op = operation.get("op")
+        if op not in OPERATIONS:
+            raise ValueError(f"Opération inconnue '{op}'. Choisissez parmi {OPERATIONS}.")
+        arguments = {cle: val for cle, val in operation.items() if cle not in ("op", "id")}
+        return getattr(self, op)(operation["id"], **arguments)
+
+    def _capacites_apres_passager(self, b: int, ajout: bool) -> None:
+        """
+        Après l'ajout (ou le retrait) du passager d'indice b = dernier : les compteurs reçoivent (ou perdent)
+        une ligne ; les sous-ensembles K+1 d'une voiture contrainte sont renumérotés, donc régénérés.
+        """
+        nb_p = self.nb_passagers
+        for a, K in enumerate(self._capacites):
+            avant = K < (nb_p - 1 if ajout else nb_p + 1)
+            apres = K < nb_p
+            if self.encodage_capacite != "compteur" or avant != apres:
+                if avant or apres:
+                    self._vars_s[a] = None
+                    self._capacite[a] = None
+                continue
+            if not apres:
+                continue
+            for lignes, ligne in ((self._vars_s[a], self._ligne_var_s), (self._capacite[a], self._ligne_compteur)):
+                if lignes is None:
+                    continue
+                if ajout:
+                    lignes.append(ligne(a, b))
+                else:
+                    lignes.pop()
+
+    def _apres_changement_voitures(self) -> None:
+        # M1 : AMO et tout-zéro portent sur toutes les voitures ; M2 : les Cost_y{j} ont une entrée par voiture
+        self._passager = [None] * self.nb_passagers
+        self._relation_y = [None] * self.nb_passagers
+
+    # --- Segments ----------------------------------------------------------
+
+    def _ligne_var_x(self, a: int, b: int) -> str:
+        return f'    <variable name="x{a+1}{b+1}" domain="bin" agent="{escape(self._ids_v[a])}"/>'
+
+    def _ligne_cout_x(self, a: int, b: int) -> str:
+        nom_var = f"x{a+1}{b+1}"
+        return _ligne_contrainte(f"cout_{nom_var}", 1, nom_var, f"Cout_{int(self._couts[a, b])}")
+
+    def _ligne_var_s(self, a: int, b: int) -> str:
+        return f'    <variable name="s{a+1}_{b+1}" domain="cpt{self._capacites[a]}" agent="{escape(self._ids_v[a])}"/>'
+
+    def _ligne_compteur(self, a: int, b: int) -> str:
+        """Pas b du compteur séquentiel de la voiture a (mêmes noms que _contraintes_m1 / _contraintes_m2)."""
+        i, j = a + 1, b + 1
+        v = self._ids_v[a] if self.modelisation == 1 else escape(self._ids_v[a])
+        nom_var = f"x{i}{j}" if self.modelisation == 1 else f"y{j}"
+        relations = self._relations_capacite(a)
+        if b == 0:
+            return _ligne_contrainte(f"cpt_{v}_{j}", 2, f"{nom_var} s{i}_{j}", relations[0][0])
+        return _ligne_contrainte(f"cpt_{v}_{j}", 3, f"s{i}_{j-1} {nom_var} s{i}_{j}", relations[1][0])
+
+    def _relations_capacite(self, a: int) -> List[tuple]:
+        """Relations (dans l'ordre d'émission) des contraintes de capacité de la voiture a, mémorisées."""
+        K, nb_p, nb_v = self._capacites[a], self.nb_passagers, self.nb_voitures
+        # M1 : ne dépendent que de K ; M2 : aussi de la valeur de la voiture et du domaine "cars"
+        cle = (K, nb_p >= 2) if self.modelisation == 1 else (K, nb_p >= 2, a + 1, nb_v)
+        if cle in self._relations_cap:
+            return self._relations_cap[cle]
+        if self.encodage_capacite == "compteur":
+            valeurs, comptee = ([0, 1], 1) if self.modelisation == 1 else (list(range(1, nb_v + 1)), a + 1)
+            relations = []
+            for initial in ((True, False) if nb_p >= 2 else (True,)):
+                tuples = _tuples_compteur(K, valeurs, comptee, initial)
+                if self.modelisation == 1:
+                    nom = f"CPT_INIT_K{K}" if initial else f"CPT_K{K}"
+                else:
+                    nom = f"CPT_V{a+1}_K{K}_INIT" if initial else f"CPT_V{a+1}_K{K}"
+                relations.append((nom, 2 if initial else 3, len(tuples), " | ".join(tuples), INFINITY_COST))
+        elif self.modelisation == 1:
+            relations = [(f"CAP_AU_PLUS_{K}", K + 1, 1, f"{INFINITY_COST}: {' '.join('1' for _ in range(K + 1))}", "0")]
+        else:
+            interdites = " ".join(str(a + 1) for _ in range(K + 1))
+            relations = [(f"CAP_V{a+1}_K{K}", K + 1, 1, f"{INFINITY_COST}: {interdites}", "0")]
+        self._relations_cap[cle] = relations
+        return relations
+
+    def _segment(self, segments: list, indice: int, construire):
+        """Segment en cache, ou construit (et mis en cache) s'il a été invalidé."""
+        if segments[indice] is None:
+            segments[indice] = construire(indice)
+            self.stats["segments_regeneres"] += 1
+        else:
+            self.stats["segments_reutilises"] += 1
+        return segments[indice]
+
+    def _construire_vars_x(self, a: int) -> List[str]:
+        return [self._ligne_var_x(a, b) for b in range(self.nb_passagers)]
+
+    def _construire_couts_x(self, a: int) -> List[str]:
+        return [self._ligne_cout_x(a, b) for b in range(self.nb_passagers)]
+
+    def _construire_vars_s(self, a: int) -> List[str]:
+        if self.encodage_capacite != "compteur" or self._capacites[a] >= self.nb_passagers:
+            return []
+        return [self._ligne_var_s(a, b) for b in range(self.nb_passagers)]
+
+    def _construire_capacite(self, a: int) -> List[str]:
+        K, nb_p = self._capacites[a], self.nb_passagers
+        if K >= nb_p:
+            return []
+        if self.encodage_capacite == "compteur":
+            return [self._ligne_compteur(a, b) for b in range(nb_p)]
+        nom_rel = self._relations_capacite(a)[0][0]
+        if self.modelisation == 1:
+            v, variables = self._ids_v[a], [f"x{a+1}{j}" for j in range(1, nb_p + 1)]
+        else:
+            v, variables = escape(self._ids_v[a]), [f"y{j}" for j in range(1, nb_p + 1)]
+        return [_ligne_contrainte(f"cap_{v}_{idx}", K + 1, " ".join(sous_ensemble), nom_rel)
+                for idx, sous_ensemble in enumerate(combinations(variables, K + 1), start=1)]
+
+    def _construire_passager(self, b: int) -> str:
+        """AMO sur chaque paire de voitures puis interdiction du tout-zéro (Modélisation 1)."""
+        p, j, nb_v = self._ids_p[b], b + 1, self.nb_voitures
+        lignes = [_ligne_contrainte(f"amo_{p}_{i1}_{i2}", 2, f"x{i1}{j} x{i2}{j}", "AMO")
+                  for i1, i2 in combinations(range(1, nb_v + 1), 2)]
+        lignes.append(_ligne_contrainte(f"pas_de_tout_zero_{p}", nb_v,
+                                        " ".join(f"x{i}{j}" for i in range(1, nb_v + 1)), f"PAS_DE_TOUT_ZERO_{nb_v}"))
+        return "\n".join(lignes)
+
+    def _construire_relation_y(self, b: int) -> tuple:
+        tuples_cout = [f"{cout}: {i}" for i, cout in enumerate(self._couts[:self.nb_voitures, b].tolist(), start=1)]
+        return (f"Cost_y{b+1}", 1, len(tuples_cout), "\n" + " | ".join(tuples_cout) + "\n    ", "0")
+
+    # --- XML ---------------------------------------------------------------
+
+    def iterer_xml(self) -> Iterator[str]:
+        """
+        Morceaux du XML (une ou plusieurs lignes chacun, à joindre par "\\n" ou à écrire avec ecrire_xml) :
+        les segments intacts sont réutilisés, les segments invalidés régénérés. Relations dédupliquées
+        et comptes (dimensions en forme close) recalculés à chaque appel, en O(|V|·|P|) NumPy.
+        """
+        nb_v, nb_p = self.nb_voitures, self.nb_passagers
+        m1 = self.modelisation == 1
+        couts = self.couts
+        registre = _RegistreRelations()
+        lignes_relations = []
+
+        def enregistrer(relation):
+            ligne = registre.enregistrer(*relation)
+            if ligne is not None:
+                lignes_relations.append(ligne)
+
+        # Relations dans l'ordre de première apparition de l'énumération complète
+        if m1:
+            valeurs, premiers = np.unique(couts.ravel(), return_index=True)
+            for cout in valeurs[np.argsort(premiers, kind="stable")].tolist():
+                enregistrer((f"Cout_{cout}", 1, 1, f"{cout}: 1", "0"))
+            nb_relations_couts = len(valeurs)
+            if nb_v >= 2:
+                enregistrer(("AMO", 2, 1, f"{INFINITY_COST}: 1 1", "0"))
+            enregistrer((f"PAS_DE_TOUT_ZERO_{nb_v}", nb_v, 1, f"{INFINITY_COST}: {' '.join('0' for _ in range(nb_v))}", "0"))
+        else:
+            relations_y = [self._segment(self._relation_y, b, self._construire_relation_y) for b in range(nb_p)]
+            for relation in relations_y:
+                enregistrer(relation)
+            nb_relations_couts = len(registre)
+        contraintes = [a for a in range(nb_v) if self._capacites[a] < nb_p]
+        for a in contraintes:
+            for relation in self._relations_capacite(a):
+                enregistrer(relation)
+        tailles = _tailles_m1 if m1 else _tailles_m2
+        dims = tailles(nb_v, nb_p, self._capacites, nb_relations_couts, self.encodage_capacite)
+
+        # 1-4. En-tête : présentation, agents, domaines, variables
+        nom = self.nom if self.nom is not None else f"ramassage_auto_M{self.modelisation}"
+        yield '<instance>'
+        yield (f'  <presentation name="{escape(nom)}" maxConstraintArity="{dims["max_arity"]}" '
+               f'format="{escape(self.format_str)}" maximize="false"/>')
+        yield f'  <agents nbAgents="{nb_v}">'
+        yield "\n".join(f'    <agent name="{escape(v)}"/>' for v in self._ids_v)
+        yield '  </agents>'
+        capacites_compteur = [int(nom_dom[3:]) for nom_dom in dims["domaines"] if nom_dom.startswith("cpt")]
+        yield f'  <domains nbDomains="{len(dims["domaines"])}">'
+        if m1:
+            yield '    <domain name="bin" nbValues="2">0 1</domain>'
+        else:
+            yield f'    <domain name="cars" nbValues="{nb_v}">{" ".join(str(i) for i in range(1, nb_v + 1))}</domain>'
+        for K in capacites_compteur:
+            yield f'    <domain name="cpt{K}" nbValues="{K+1}">{" ".join(str(c) for c in range(K+1))}</domain>'
+        yield '  </domains>'
+        yield f'  <variables nbVariables="{dims["nb_variables"]}">'
+        if m1:
+            for a in range(nb_v):
+                yield "\n".join(self._segment(self._vars_x, a, self._construire_vars_x))
+        else:
+            hotes = placer_variables_m2(couts, self._capacites, self.encodage_capacite, self.placement)
+            yield "\n".join(f'    <variable name="y{b+1}" domain="cars" agent="{escape(self._ids_v[hote])}"/>'
+                            for b, hote in enumerate(hotes.tolist()))
+        for a in range(nb_v):
+            lignes = self._segment(self._vars_s, a, self._construire_vars_s)
+            if lignes:
+                yield "\n".join(lignes)
+        yield '  </variables>'
+
+        # 5-7. Relations, puis contraintes (segments en cache ; références renommées si la relation
+        #      d'un segment a le même contenu qu'une relation enregistrée avant elle)
+        yield f'  <relations nbRelations="{dims["nb_relations"]}">'
+        yield "\n".join(lignes_relations)
+        yield '  </relations>'
+        yield f'  <constraints nbConstraints="{dims["nb_contraintes"]}">'
+        if m1:
+            for a in range(nb_v):
+                yield "\n".join(self._segment(self._couts_x, a, self._construire_couts_x))
+            for b in range(nb_p):
+                yield self._segment(self._passager, b, self._construire_passager)
+        else:
+            yield "\n".join(_ligne_contrainte(f"c_y{b+1}", 1, f"y{b+1}", registre.nom(*relation[1:]))
+                            for b, relation in enumerate(relations_y))
+        for a in contraintes:
+            texte = "\n".join(self._segment(self._capacite, a, self._construire_capacite))
+            for relation in self._relations_capacite(a):
+                nom_enregistre = registre.nom(*relation[1:])
+                if nom_enregistre != relation[0]:
+                    texte = texte.replace(f'reference="{relation[0]}"', f'reference="{nom_enregistre}"')
+            yield texte
+        yield '  </constraints>'
+        yield '</instance>'
+
+    def vers_xml(self) -> str:
+        """XML XCSP de l'état courant (identique à json_vers_xml(self.instance(), ...))."""
+        return "\n".join(self.iterer_xml())
+
+def _lire_operations(chemin: str) -> List[dict]:
+    """Script d'édition : liste JSON d'opérations, ou un objet JSON par ligne (JSONL)."""
+    with open(chemin, encoding="utf-8") as f:
+        texte = f.read()
+    try:
+        operations = json.loads(texte)
+    except json.JSONDecodeError:
+        operations = [json.loads(ligne) for ligne in texte.splitlines() if ligne.strip()]
+    return operations if isinstance(operations, list) else [operations]
+
+def main():
+    ap = argparse.ArgumentParser(description="Édition incrémentale d'une instance (JSON) et régénération partielle du XML.")
+    ap.add_argument("--instance", required=True, help="JSON d'instance (non élaguée)")
+    ap.add_argument("--operations", required=True, help="Script d'édition : liste JSON (ou JSONL) d'opérations")
+    ap.add_argument("--modelisation", type=int, choices=[1, 2], default=1)
+    ap.add_argument("--encodage", choices=["sous_ensembles", "compteur"], default="sous_ensembles")
+    ap.add_argument("--placement", choices=PLACEMENTS, default="cyclique", help="Agents des y_j (Modélisation 2)")
+    ap.add_argument("--sortie", default=None, help="Préfixe des fichiers écrits (<sortie>.json et <sortie>_M{m}.xml)")
+    ap.add_argument("--comparer", action="store_true",
+                    help="Mesure aussi une régénération complète (json_vers_xml) et vérifie l'identité des XML")
+    ajouter_arguments(ap)
+    args = ap.parse_args()
+
+    with open(args.instance, encoding="utf-8") as f:
+        obj_json = json.load(f)
+    options = options_reseau(args)
+    reseau = charger_reseau(**options["reseau"]) if options else None
+    edition = InstanceEditable(obj_json, args.modelisation, args.encodage, args.placement, reseau=reseau)
+    edition.vers_xml()
+    operations = _lire_operations(args.operations)
+    temps = []
+    for operation in operations:
+        debut = time.perf_counter()
+        edition.appliquer(operation)
+        xml = edition.vers_xml()
+        temps.append(time.perf_counter() - debut)
+    if temps:
+        print(f"[OK] {len(operations)} opération(s) : {1000 * sum(temps) / len(temps):.2f} ms en moyenne "
+              f"(opération + XML), {edition.stats['segments_regeneres']} segment(s) régénéré(s), "
+              f"{edition.stats['segments_reutilises']} réutilisé(s)")
+    else:
+        xml = edition.vers_xml()
+    if args.comparer:
+        debut = time.perf_counter()
+        complet = json_vers_xml(edition.instance(), args.modelisation, args.encodage, placement=args.placement)
+        print(f"[INFO] Régénération complète : {1000 * (time.perf_counter() - debut):.2f} ms, "
+              f"XML {'identique' if complet == xml else 'DIFFÉRENT'}")
+    if args.sortie:
+        os.makedirs(os.path.dirname(args.sortie) or ".", exist_ok=True)
+        with open(f"{args.sortie}.json", "w", encoding="utf-8") as f:
+            json.dump(edition.vers_json(), f, indent=2, ensure_ascii=False)
+        with open(f"{args.sortie}_M{args.modelisation}.xml", "w", encoding="utf-8") as f:
+            f.write(xml)
+        print(f"[OK] Instance modifiée : {args.sortie}.json, {args.sortie}_M{args.modelisation}.xml")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# evaluateur_solutions.py — Évaluation vectorisée d'affectations (M1 : x_ij, M2 : y_j) : coût réel,
+# contraintes violées (au plus une voiture, au moins une voiture, capacités) et complétion des total_cost.
+import argparse
+import csv
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from constructeur_dcop import COUT_NON_CANDIDAT, InstanceCompacte
+from solveur_exact import nom_instance_depuis_xml
+
+# Paires « variable = valeur » dans un journal FRODO ({x11=0, x12=1, ...}), un journal du
+# simulateur ou un texte libre ; les variables auxiliaires du compteur (s1_2) sont ignorées.
+MOTIF_AFFECTATION = re.compile(r"\b([xy]\d+)\s*[=:]\s*(-?\d+)\b")
+
+# Colonnes du rapport de vérification
+COLONNES_RAPPORT = ["xml_file", "algorithm", "total_cost", "total_cost_recalcule", "faisable",
+                    "nb_violations", "violations"]
+
+def _instance(obj: Union[dict, InstanceCompacte]) -> InstanceCompacte:
+    return obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+
+# ----------------------------------------------------------------------
+# Noms de variables <-> tableaux
+# ----------------------------------------------------------------------
+
+def noms_variables(obj: Union[dict, InstanceCompacte], modelisation: int) -> List[str]:
+    """
+    Noms des variables dans l'ordre des indices du simulateur : M1 x{i}{j} à l'indice (i-1)·P + (j-1),
+    M2 y{j} à l'indice j-1.
+    """
+    instance = _instance(obj)
+    nb_voitures, nb_passagers = len(instance.voitures), len(instance.passagers)
+    if modelisation == 1:
+        return [f"x{i}{j}" for i in range(1, nb_voitures + 1) for j in range(1, nb_passagers + 1)]
+    if modelisation == 2:
+        return [f"y{j}" for j in range(1, nb_passagers + 1)]
+    raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+
+def texte_affectation(obj: Union[dict, InstanceCompacte], modelisation: int, x: np.ndarray) -> str:
+    """
+    Affectation du simulateur (indices de valeurs) au format des journaux FRODO : {x11=0, x12=1, ...}.
+    En M2 la valeur écrite est celle du domaine `cars` (indice de voiture + 1). En M1 élaguée, seuls
+    les x_ij des couples candidats (variables du XML) sont écrits ; x peut ne porter que sur eux
+    (simulateur) ou sur toute la matrice |V| x |P| aplatie.
+    """
+    instance = _instance(obj)
+    valeurs = np.asarray(x, dtype=np.int64) + (1 if modelisation == 2 else 0)
+    noms = noms_variables(instance, modelisation)
+    if modelisation == 1 and instance.candidats is not None:
+        garder = instance.candidats.ravel()
+        if len(valeurs) == len(garder):
+            valeurs = valeurs[garder]
+        noms = [n for n, g in zip(noms, garder.tolist()) if g]
+    return "{" + ", ".join(f"{n}={v}" for n, v in zip(noms, valeurs.tolist())) + "}"
+
+def lire_affectation(texte: str) -> Dict[str, int]:
+    """Paires variable = valeur trouvées dans un texte (la dernière occurrence d'une variable l'emporte)."""
+    return {nom: int(valeur) for nom, valeur in MOTIF_AFFECTATION.findall(texte)}
+
+def charger_affectation(chemin: str) -> Dict[str, int]:
+    """Affectation d'un fichier JSON {variable: valeur} ou d'un texte/journal (lire_affectation)."""
+    with open(chemin, encoding="utf-8", errors="replace") as f:
+        texte = f.read()
+    try:
+        obj = json.loads(texte)
+    except json.JSONDecodeError:
+        return lire_affectation(texte)
+    return {str(nom): int(valeur) for nom, valeur in obj.items()}
+
+def affectation_en_tableau(obj: Union[dict, InstanceCompacte], modelisation: int, affectation: Dict[str, int]) -> np.ndarray:
+    """
+    Tableau des valeurs d'une affectation {nom: valeur} : M1 matrice |V| x |P| de 0/1, M2 vecteur |P|
+    d'indices de voiture (valeur du domaine - 1). Les variables absentes valent -1, sauf les x_ij
+    des couples non candidats d'une instance élaguée (absents du XML) qui valent 0. Les noms M1
+    ambigus (x{i}{j} identiques pour deux couples, dès 10 voitures et 10 passagers) lèvent ValueError.
+    """
+    instance = _instance(obj)
+    noms = noms_variables(instance, modelisation)
+    index: Dict[str, int] = {}
+    ambigus = set()
+    for k, nom in enumerate(noms):
+        if nom in index:
+            ambigus.add(nom)
+        index[nom] = k
+    valeurs = np.full(len(noms), -1, dtype=np.int64)
+    decalage = 1 if modelisation == 2 else 0
+    for nom, valeur in affectation.items():
+        if nom in ambigus:
+            raise ValueError(f"Variable '{nom}' ambiguë dans cette instance (noms x{{i}}{{j}} en collision)")
+        k = index.get(nom)
+        if k is not None:
+            valeurs[k] = int(valeur) - decalage
+    if modelisation == 1:
+        valeurs = valeurs.reshape(len(instance.voitures), len(instance.passagers))
+        if instance.candidats is not None:
+            valeurs[~instance.candidats & (valeurs < 0)] = 0
+    return valeurs
+
+# ----------------------------------------------------------------------
+# Évaluation vectorisée (un lot d'affectations d'une même instance)
+# ----------------------------------------------------------------------
+
+def evaluer_tableaux_m1(couts: np.ndarray, capacites: np.ndarray, X: np.ndarray) -> dict:
+    """
+    Lot d'affectations M1 X (B, |V|, |P|) ou (|V|, |P|), valeurs 0/1 (-1 = absente).
+    Retourne des tableaux indexés par affectation : cout (somme des coûts des x_ij = 1),
+    voitures_par_passager (B, P), passagers_par_voiture (B, V), absentes et hors_domaine (B, V, P).
+    Un x_ij = 1 sur un couple non candidat (COUT_NON_CANDIDAT) est hors domaine et sans coût.
+    """
+    X = np.asarray(X)
+    if X.ndim == 2:
+        X = X[None]
+    uns = X == 1
+    couts = np.asarray(couts, dtype=np.int64)
+    non_candidats = couts == COUT_NON_CANDIDAT
+    return {
+        "cout": np.where(uns & ~non_candidats, couts, 0).sum(axis=(1, 2)),
+        "voitures_par_passager": uns.sum(axis=1),
+        "passagers_par_voiture": uns.sum(axis=2),
+        "capacites": np.asarray(capacites, dtype=np.int64),
+        "absentes": X < 0,
+        "hors_domaine": (X > 1) | (uns & non_candidats),
+    }
+
+def evaluer_tableaux_m2(couts: np.ndarray, capacites: np.ndarray, Y: np.ndarray) -> dict:
+    """
+    Lot d'affectations M2 Y (B, |P|) ou (|P|,), indices de voiture (-1 = absente).
+    Mêmes sorties qu'evaluer_tableaux_m1 ; voitures_par_passager vaut 1 pour toute valeur valide.
+    Une voiture non candidate du passager (COUT_NON_CANDIDAT) est hors domaine.
+    """
+    Y = np.asarray(Y, dtype=np.int64)
+    if Y.ndim == 1:
+        Y = Y[None]
+    couts = np.asarray(couts, dtype=np.int64)
+    nb_voitures, nb_passagers = couts.shape
+    nb_lot = Y.shape[0]
+    valides = (Y >= 0) & (Y < nb_voitures)
+    indices = np.where(valides, Y, 0)
+    choisis = couts[indices, np.arange(nb_passagers)] if nb_voitures else np.zeros(Y.shape, dtype=np.int64)
+    hors_domaine = (Y >= nb_voitures) | (valides & (choisis == COUT_NON_CANDIDAT))
+    valides &= ~hors_domaine
+    cout = np.where(valides, choisis, 0).sum(axis=1)
+    lignes = np.broadcast_to(np.arange(nb_lot)[:, None], Y.shape)
+    par_voiture = np.bincount((lignes * nb_voitures + indices)[valides], minlength=nb_lot * nb_voitures)
+    return {
+        "cout": cout,
+        "voitures_par_passager": valides.astype(np.int64),
+        "passagers_par_voiture": par_voiture.reshape(nb_lot, nb_voitures),
+        "capacites": np.asarray(capacites, dtype=np.int64),
+        "absentes": Y < 0,
+        "hors_domaine": hors_domaine,
+    }
+
+def _resultat(instance: InstanceCompacte, modelisation: int, mesures: dict, b: int) -> dict:
+    """
+    Résumé de l'affectation b : violations par famille, avec l'élément concerné et le nombre observé.
+    Une violation = un passager dans plusieurs voitures ("amo"), un passager sans voiture ("au_moins_une"),
+    une voiture au-delà de sa capacité ("capacite"), une variable absente ou hors domaine.
+    """
+    passagers, voitures = instance.passagers.tolist(), instance.voitures.tolist()
+    absentes = mesures["absentes"][b].ravel()
+    hors_domaine = mesures["hors_domaine"][b].ravel()
+    par_passager = mesures["voitures_par_passager"][b]
+    par_voiture = mesures["passagers_par_voiture"][b]
+    invalides = absentes | hors_domaine
+    violations: List[Tuple[str, str, int]] = []
+    incomplet = np.zeros(len(passagers), dtype=bool)
+    if invalides.any():
+        # Un passager dont une variable manque n'est pas déclaré « sans voiture » (son état est inconnu)
+        incomplet = invalides.reshape(-1, len(passagers)).any(axis=0)
+        noms = noms_variables(instance, modelisation)
+        violations += [("absente", noms[k], -1) for k in np.flatnonzero(absentes).tolist()]
+        violations += [("hors_domaine", noms[k], -1) for k in np.flatnonzero(hors_domaine).tolist()]
+    violations += [("amo", passagers[j], int(par_passager[j])) for j in np.flatnonzero(par_passager > 1).tolist()]
+    violations += [("au_moins_une", passagers[j], 0)
+                   for j in np.flatnonzero((par_passager == 0) & ~incomplet).tolist()]
+    violations += [("capacite", voitures[i], int(par_voiture[i]))
+                   for i in np.flatnonzero(par_voiture > mesures["capacites"]).tolist()]
+    cout = int(mesures["cout"][b])
+    return {
+        "total_cost": None if violations else cout,
+        "cout_affectation": cout,
+        "faisable": not violations,
+        "nb_violations": len(violations),
+        "violations": violations,
+    }
+
+def evaluer_lot(obj: Union[dict, InstanceCompacte], modelisation: int, affectations: List[Union[dict, np.ndarray]]) -> List[dict]:
+    """
+    Évalue plusieurs affectations d'une même instance en une passe vectorisée. Chaque affectation est un
+    dict {nom: valeur} ou un tableau (affectation_en_tableau). Pour chacune : total_cost (None si une
+    contrainte est violée, comme le coût infini de FRODO), cout_affectation (somme des coûts choisis),
+    faisable, nb_violations et violations [(famille, élément, nombre observé)].
+    """
+    instance = _instance(obj)
+    if not affectations:
+        return []
+    tableaux = np.stack([
+        a if isinstance(a, np.ndarray) else affectation_en_tableau(instance, modelisation, a) for a in affectations
+    ])
+    if modelisation == 1:
+        mesures = evaluer_tableaux_m1(instance.couts, instance.capacites, tableaux)
+    elif modelisation == 2:
+        mesures = evaluer_tableaux_m2(instance.couts, instance.capacites, tableaux)
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+    return [_resultat(instance, modelisation, mesures, b) for b in range(len(affectations))]
+
+def evaluer(obj: Union[dict, InstanceCompacte], modelisation: int, affectation: Union[dict, np.ndarray]) -> dict:
+    """Coût réel et contraintes violées d'une affectation (cf. evaluer_lot)."""
+    return evaluer_lot(obj, modelisation, [affectation])[0]
+
+def resume_violations(violations: List[Tuple[str, str, int]], limite: int = 20) -> str:
+    """famille:élément[=nombre];... (au plus `limite` entrées, puis "+N")."""
+    textes = [f"{f}:{e}" if n < 0 else f"{f}:{e}={n}" for f, e, n in violations[:limite]]
+    if len(violations) > limite:
+        textes.append(f"+{len(violations) - limite}")
+    return ";".join(textes)
+
+# ----------------------------------------------------------------------
+# Complétion en masse des CSV de bench
+# ----------------------------------------------------------------------
+
+def chemin_journal(dossier_logs: str, xml_file: str, algorithme: str) -> str:
+    """Journal écrit par lanceur_bench pour un job : <dossier_logs>/<xml sans extension>_<algo>.log."""
+    return os.path.join(dossier_logs, f"{os.path.splitext(os.path.basename(xml_file))[0]}_{algorithme}.log")
+
+def _evaluer_instance(tache: tuple) -> List[dict]:
+    """
+    Dans un processus du pool : évalue en un lot toutes les lignes (xml_file, algorithm) d'une instance
+    dont le journal contient une affectation. Lignes sans instance ou sans affectation : ignorées.
+    """
+    nom, paires, dossier_instances, dossier_logs = tache
+    chemin_json = os.path.join(dossier_instances, f"{nom}.json")
+    if not os.path.isfile(chemin_json):
+        return []
+    instance = InstanceCompacte.charger(chemin_json)
+    cles, affectations = [], []
+    for xml_file, algorithme, modelisation in paires:
+        chemin = chemin_journal(dossier_logs, xml_file, algorithme)
+        if not os.path.isfile(chemin):
+            continue
+        affectation = charger_affectation(chemin)
+        if affectation:
+            cles.append((xml_file, algorithme, modelisation))
+            affectations.append(affectation)
+    sorties = []
+    for m in (1, 2):
+        indices = [k for k, cle in enumerate(cles) if cle[2] == m]
+        try:
+            resultats = evaluer_lot(instance, m, [affectations[k] for k in indices])
+        except ValueError as e:
+            print(f"[WARN] {nom} (M{m}) : {e}")
+            continue
+        for k, resultat in zip(indices, resultats):
+            sorties.append({"xml_file": cles[k][0], "algorithm": cles[k][1], **resultat})
+    return sorties
+
+def _modelisation(xml_file: str) -> int:
+    return 2 if os.path.splitext(os.path.basename(xml_file))[0].endswith("_M2") else 1
+
+def completer_couts(
+    chemins_csv: List[str],
+    dossier_instances: str = "results/instances",
+    dossier_logs: str = "results/logs",
+    tout_verifier: bool = False,
+    nb_processus: Optional[int] = None,
+) -> List[dict]:
+    """
+    Recalcule le coût des lignes de bench à total_cost vide (toutes avec tout_verifier) à partir de
+    l'affectation trouvée dans leur journal, une tâche par instance dans un pool de processus.
+    Les total_cost vides des affectations faisables sont complétés sur place ; retourne les lignes
+    du rapport (COLONNES_RAPPORT), total_cost étant la valeur d'origine du CSV.
+    """
+    contenus = {}
+    par_instance: Dict[str, set] = {}
+    for chemin in chemins_csv:
+        with open(chemin, newline="", encoding="utf-8") as f:
+            lecteur = csv.DictReader(f)
+            contenus[chemin] = (list(lecteur.fieldnames or []), list(lecteur))
+        for ligne in contenus[chemin][1]:
+            if ligne.get("xml_file") and (tout_verifier or ligne.get("total_cost", "") == ""):
+                par_instance.setdefault(nom_instance_depuis_xml(ligne["xml_file"]), set()).add(
+                    (ligne["xml_file"], ligne["algorithm"], _modelisation(ligne["xml_file"])))
+
+    taches = [(nom, sorted(paires), dossier_instances, dossier_logs) for nom, paires in sorted(par_instance.items())]
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        evaluations = {(r["xml_file"], r["algorithm"]): r for lot in pool.map(_evaluer_instance, taches) for r in lot}
+
+    rapport = []
+    for chemin, (colonnes, lignes) in contenus.items():
+        completees = 0
+        for ligne in lignes:
+            resultat = evaluations.get((ligne.get("xml_file"), ligne.get("algorithm")))
+            if resultat is None:
+                continue
+            rapport.append({
+                "xml_file": ligne["xml_file"], "algorithm": ligne["algorithm"], "total_cost": ligne.get("total_cost", ""),
+                "total_cost_recalcule": "" if resultat["total_cost"] is None else resultat["total_cost"],
+                "faisable": resultat["faisable"], "nb_violations": resultat["nb_violations"],
+                "violations": resume_violations(resultat["violations"]),
+            })
+            if ligne.get("total_cost", "") == "" and resultat["total_cost"] is not None:
+                ligne["total_cost"] = float(resultat["total_cost"])
+                completees += 1
+        if completees:
+            temporaire = f"{chemin}.tmp{os.getpid()}"
+            with open(temporaire, "w", newline="", encoding="utf-8") as f:
+                ecrivain = csv.DictWriter(f, fieldnames=colonnes, restval="")
+                ecrivain.writeheader()
+                ecrivain.writerows(lignes)
+            os.replace(temporaire, chemin)
+        print(f"[OK] {chemin} : {completees} total_cost complété(s)")
+    return rapport
+
+def main():
+    ap = argparse.ArgumentParser(description="Coût réel et faisabilité d'affectations M1 / M2 ; complétion des total_cost des benchs.")
+    ap.add_argument("--instance", default=None, help="Instance JSON (avec --affectation)")
+    ap.add_argument("--affectation", default=None, help="Affectation : JSON {variable: valeur} ou journal FRODO / simulateur")
+    ap.add_argument("--modelisation", type=int, choices=[1, 2], default=1)
+    ap.add_argument("--bench", nargs="+", default=None, help="CSV de bench dont compléter les total_cost vides")
+    ap.add_argument("--instances", default="results/instances", help="Dossier des instances JSON (avec --bench)")
+    ap.add_argument("--logs", default="results/logs", help="Dossier des journaux de lanceur_bench (avec --bench)")
+    ap.add_argument("--tout", action="store_true", help="Vérifier aussi les lignes qui ont déjà un total_cost")
+    ap.add_argument("--rapport", default=None, help="CSV du rapport de vérification (avec --bench)")
+    ap.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut : nb de CPU)")
+    args = ap.parse_args()
+
+    if args.instance and args.affectation:
+        resultat = evaluer(InstanceCompacte.charger(args.instance), args.modelisation, charger_affectation(args.affectation))
+        etat = "faisable" if resultat["faisable"] else f"{resultat['nb_violations']} violation(s)"
+        print(f"[OK] coût={resultat['total_cost']} (affectation : {resultat['cout_affectation']}), {etat}")
+        for famille, element, nombre in resultat["violations"]:
+            print(f"[WARN] {famille} : {element}" + ("" if nombre < 0 else f" ({nombre})"))
+    if args.bench:
+        rapport = completer_couts(args.bench, args.instances, args.logs, args.tout, args.jobs)
+        ecarts = [r for r in rapport if r["total_cost"] != "" and r["total_cost_recalcule"] != ""
+                  and float(r["total_cost"]) != float(r["total_cost_recalcule"])]
+        print(f"[INFO] {len(rapport)} affectation(s) évaluée(s), {sum(not r['faisable'] for r in rapport)} infaisable(s), "
+              f"{len(ecarts)} coût(s) différent(s) du CSV.")
+        if args.rapport:
+            with open(args.rapport, "w", newline="", encoding="utf-8") as f:
+                ecrivain = csv.DictWriter(f, fieldnames=COLONNES_RAPPORT)
+                ecrivain.writeheader()
+                ecrivain.writerows(rapport)
+            print(f"[OK] Rapport : {args.rapport}")
+    if not args.bench and not (args.instance and args.affectation):
+        ap.error("--instance et --affectation, ou --bench, sont requis")
+
+if __name__ == "__main__":
+    main()
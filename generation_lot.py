@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# generation_lot.py — Génération parallèle d'un lot d'instances (JSON + XML M1/M2),
+# avec manifeste CSV (tailles, temps de génération) et archive zip optionnelle.
+import argparse
+import csv
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache_instances import CacheInstances
+from constructeur_dcop import (
+    PLACEMENTS,
+    StatsGeneration,
+    dimensions_instance,
+    ecrire_xml,
+    generer_instance_aleatoire,
+    iterer_json_vers_xml,
+    placement_m2,
+)
+from reseau_routier import ajouter_arguments, charger_reseau, options_reseau
+from solveur_exact import ajouter_cout_optimal
+
+NOM_MANIFESTE = "manifeste.csv"
+
+COLONNES_MANIFESTE = [
+    "fichier", "type", "modelisation", "instance_name", "n_voitures", "n_passagers", "capacite", "graine",
+    "octets", "temps_ms", "reutilise", "nb_variables", "nb_contraintes", "cout_optimal", "phases", "coupe_agents",
+]
+
+# Valeurs par défaut de generer_instance_aleatoire : les options qui s'en écartent marquent le nom des fichiers
+DEFAUTS_INSTANCE = {cle: p.default for cle, p in inspect.signature(generer_instance_aleatoire).parameters.items()
+                    if p.default is not inspect.Parameter.empty}
+
+def empreinte_options(options: Optional[dict] = None) -> str:
+    """
+    "" pour les options par défaut de generer_instance_aleatoire, sinon 8 caractères hexadécimaux de
+    l'empreinte de celles qui s'en écartent (réseau routier : empreinte de son graphe).
+    """
+    ecarts = {}
+    for cle, valeur in (options or {}).items():
+        if cle == "reseau" and valeur is not None:
+            valeur = (charger_reseau(**valeur) if isinstance(valeur, dict) else valeur).empreinte
+        if cle not in DEFAUTS_INSTANCE or DEFAUTS_INSTANCE[cle] != valeur:
+            ecarts[cle] = valeur
+    if not ecarts:
+        return ""
+    return hashlib.sha256(json.dumps(ecarts, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+
+def nom_instance(n_voitures: int, n_passagers: int, capacite: int, graine: int, empreinte: str = "") -> str:
+    """instance{V}V_{P}P_K{K}[_o{empreinte}]_s{graine} ; `empreinte` : cf. empreinte_options."""
+    options = f"_o{empreinte}" if empreinte else ""
+    return f"instance{n_voitures}V_{n_passagers}P_K{capacite}{options}_s{graine}"
+
+def nom_xml(nom: str, modelisation: int, encodage_capacite: str = "sous_ensembles", placement: str = "cyclique") -> str:
+    """
+    <nom>[_<encodage>][_<placement>]_M<m>.xml : encodage et placement (M2 seulement) notés quand ils ne sont
+    pas ceux par défaut, pour qu'un XML d'une autre variante ne soit jamais réutilisé (cf. nom_instance_depuis_xml).
+    """
+    variantes = [encodage_capacite] if encodage_capacite != "sous_ensembles" else []
+    if modelisation == 2 and placement != "cyclique":
+        variantes.append(placement)
+    return "_".join([nom, *variantes, f"M{modelisation}"]) + ".xml"
+
+def _json_conforme(obj_json: dict, options: dict) -> bool:
+    """
+    Un JSON déjà présent a-t-il été généré avec ces options (dépose, poids, élagage, réseau) ? Sinon il
+    est régénéré : une instance non élaguée du même nom n'est pas reprise pour un balayage élagué.
+    """
+    parametres = {**DEFAUTS_INSTANCE, **options}
+    mode_depot = parametres["mode_depot"]
+    reseau = parametres["reseau"]
+    elagage = None
+    if parametres["k_voisins"] is not None or parametres["rayon"] is not None:
+        elagage = {"k_voisins": parametres["k_voisins"], "rayon": parametres["rayon"]}
+    if obj_json.get("elagage") != elagage:
+        return False
+    if (obj_json.get("reseau") or {}).get("empreinte") != (reseau.empreinte if reseau is not None else None):
+        return False
+    if obj_json.get("mode_depot", "aucun") != mode_depot:
+        return False
+    return mode_depot == "aucun" or (
+        obj_json.get("poids_ramassage") == parametres["poids_ramassage"]
+        and obj_json.get("poids_depot") == parametres["poids_depot"]
+    )
+
+def plage(texte: str) -> List[int]:
+    """"4" -> [4] ; "2-6" -> [2..6] ; "2-10:2" -> [2, 4, ..., 10] ; "2,5,9" -> [2, 5, 9]."""
+    valeurs = []
+    for morceau in str(texte).split(","):
+        morceau = morceau.strip()
+        if not morceau:
+            continue
+        bornes, _, pas = morceau.partition(":")
+        debut, tiret, fin = bornes.partition("-")
+        if tiret:
+            valeurs.extend(range(int(debut), int(fin) + 1, int(pas) if pas else 1))
+        else:
+            valeurs.append(int(debut))
+    return valeurs
+
+def aplatir(listes: Iterable[List[int]]) -> List[int]:
+    """Valeurs distinctes (ordre conservé) de plusieurs plages argparse (`type=plage, nargs="+"`)."""
+    return list(dict.fromkeys(v for liste in listes for v in liste))
+
+def ecrire_atomique(chemin: str, ecrire) -> None:
+    """Écrit dans un fichier temporaire puis renomme : un lot interrompu ne laisse pas de fichier tronqué."""
+    temporaire = f"{chemin}.tmp{os.getpid()}"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        ecrire(f)
+    os.replace(temporaire, chemin)
+
+def generer_fichiers_instance(
+    dossier: str,
+    n_voitures: int,
+    n_passagers: int,
+    capacite: int,
+    graine: int,
+    modelisations: Tuple[int, ...] = (1, 2),
+    encodage_capacite: str = "sous_ensembles",
+    cache: Optional[dict] = None,
+    options: Optional[dict] = None,
+    stats_phases: bool = False,
+    placement: str = "cyclique",
+) -> Tuple[List[dict], Dict[str, int]]:
+    """
+    Écrit <nom>.json (avec cout_optimal) et ses XML (nom_xml) dans `dossier`. La graine et les options
+    déterminent entièrement l'instance (generer_positions_aleatoires, cf. generer_instance_aleatoire) et
+    les noms portent les options, l'encodage et le placement non par défaut : les fichiers déjà présents
+    sont réutilisés (un JSON généré avec d'autres options est régénéré, XML compris). Avec `cache` (paramètres de CacheInstances), les
+    fichiers manquants viennent du cache d'instances partagé. `options` : largeur, hauteur,
+    mode_depot, poids_ramassage, poids_depot, couts_entiers, k_voisins, rayon (élagage des candidats),
+    reseau (paramètres de charger_reseau : le graphe est chargé une fois par processus). `stats_phases` : temps par phase de
+    chaque XML généré (StatsGeneration.resume) dans la colonne « phases » du manifeste.
+    `placement` : agents des y_j en M2 (PLACEMENTS) ; la taille de coupe entre agents est reportée
+    dans la colonne « coupe_agents » (vide en M1).
+    Retourne (lignes du manifeste, compteurs du cache — vides sans cache).
+    """
+    options = dict(options or {})
+    if options.get("reseau") is not None:
+        options["reseau"] = charger_reseau(**options["reseau"])
+    nom = nom_instance(n_voitures, n_passagers, capacite, graine, empreinte_options(options))
+    cache_disque = CacheInstances(**cache) if cache else None
+    commun = {"instance_name": nom, "n_voitures": n_voitures, "n_passagers": n_passagers,
+              "capacite": capacite, "graine": graine}
+    lignes = []
+
+    chemin_json = os.path.join(dossier, f"{nom}.json")
+    debut = time.perf_counter()
+    reutilise = os.path.exists(chemin_json)
+    if reutilise:
+        with open(chemin_json, encoding="utf-8") as f:
+            obj_json = json.load(f)
+        reutilise = _json_conforme(obj_json, options)
+    if not reutilise:
+        if cache_disque is not None:
+            obj_json = cache_disque.instance_aleatoire(nom, n_voitures, n_passagers, capacite, graine, **options)
+        else:
+            obj_json = generer_instance_aleatoire(nom, n_voitures, n_passagers, capacite, graine, **options)
+        ajouter_cout_optimal(obj_json)
+        ecrire_atomique(chemin_json, lambda f: json.dump(obj_json, f, ensure_ascii=False))
+    lignes.append({
+        **commun, "fichier": f"{nom}.json", "type": "json", "modelisation": "",
+        "octets": os.path.getsize(chemin_json), "temps_ms": round((time.perf_counter() - debut) * 1000, 3),
+        "reutilise": int(reutilise), "nb_variables": "", "nb_contraintes": "",
+        "cout_optimal": "" if obj_json.get("cout_optimal") is None else obj_json["cout_optimal"], "phases": "",
+        "coupe_agents": "",
+    })
+
+    json_regenere = not lignes[0]["reutilise"]
+    for m in modelisations:
+        fichier = nom_xml(nom, m, encodage_capacite, placement)
+        chemin_xml = os.path.join(dossier, fichier)
+        debut = time.perf_counter()
+        reutilise = os.path.exists(chemin_xml) and not json_regenere
+        stats = StatsGeneration() if stats_phases else None
+        if not reutilise:
+            if cache_disque is not None:
+                temporaire = f"{chemin_xml}.tmp{os.getpid()}"
+                cache_disque.copier_xml(obj_json, temporaire, m, encodage_capacite, stats, placement)
+                os.replace(temporaire, chemin_xml)
+            else:
+                ecrire_atomique(chemin_xml, lambda f: ecrire_xml(
+                    f, iterer_json_vers_xml(obj_json, m, encodage_capacite, stats, placement)))
+        temps_ms = round((time.perf_counter() - debut) * 1000, 3)
+        dims = dimensions_instance(obj_json, m, encodage_capacite)
+        lignes.append({
+            **commun, "fichier": fichier, "type": "xml", "modelisation": m,
+            "octets": os.path.getsize(chemin_xml), "temps_ms": temps_ms, "reutilise": int(reutilise),
+            "nb_variables": dims["nb_variables"], "nb_contraintes": dims["nb_contraintes"],
+            "cout_optimal": lignes[0]["cout_optimal"],
+            "phases": stats.resume() if stats is not None and stats.phases else "",
+            "coupe_agents": placement_m2(obj_json, encodage_capacite, placement)["coupe"] if m == 2 else "",
+        })
+    return lignes, dict(cache_disque.stats) if cache_disque is not None else {}
+
+def generer_lot(
+    voitures: List[int],
+    passagers: List[int],
+    capacites: List[int],
+    graines: List[int],
+    dossier: str,
+    modelisations: Tuple[int, ...] = (1, 2),
+    encodage_capacite: str = "sous_ensembles",
+    nb_processus: Optional[int] = None,
+    cache: Optional[dict] = None,
+    options: Optional[dict] = None,
+    progression=None,
+    stats_phases: bool = False,
+    placement: str = "cyclique",
+) -> str:
+    """
+    Génère toutes les combinaisons (voitures × passagers × capacités × graines) dans un pool de
+    processus et écrit <dossier>/manifeste.csv (une ligne par fichier, triées par nom).
+    `progression(fait, total)` est appelé après chaque instance. Avec `stats_phases`, les temps
+    par phase de chaque XML généré sont journalisés et reportés dans le manifeste. `placement` :
+    agents des y_j en M2 (cf. generer_fichiers_instance).
+    Retourne le chemin du manifeste.
+    """
+    os.makedirs(dossier, exist_ok=True)
+    combinaisons = list(itertools.product(voitures, passagers, capacites, graines))
+    lignes = []
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        futurs = [
+            pool.submit(generer_fichiers_instance, dossier, V, P, K, g, tuple(modelisations),
+                        encodage_capacite, cache, options, stats_phases, placement)
+            for V, P, K, g in combinaisons
+        ]
+        for fait, futur in enumerate(as_completed(futurs), start=1):
+            lignes_instance, _ = futur.result()
+            lignes.extend(lignes_instance)
+            if stats_phases:
+                for ligne in lignes_instance:
+                    if ligne["phases"]:
+                        print(f"[PHASES] {ligne['fichier']} : {ligne['phases']}")
+            if progression is not None:
+                progression(fait, len(combinaisons))
+    chemin_manifeste = os.path.join(dossier, NOM_MANIFESTE)
+    lignes.sort(key=lambda l: l["fichier"])
+
+    def ecrire(f):
+        ecrivain = csv.DictWriter(f, fieldnames=COLONNES_MANIFESTE)
+        ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+    ecrire_atomique(chemin_manifeste, ecrire)
+    return chemin_manifeste
+
+def zipper_lot(chemin_manifeste: str, chemin_zip: str) -> str:
+    """Archive (deflate) le manifeste et les fichiers qu'il liste, écrits un par un dans le zip."""
+    dossier = os.path.dirname(chemin_manifeste)
+    with open(chemin_manifeste, newline="", encoding="utf-8") as f:
+        fichiers = [ligne["fichier"] for ligne in csv.DictReader(f)]
+    with zipfile.ZipFile(chemin_zip, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.write(chemin_manifeste, NOM_MANIFESTE)
+        for fichier in fichiers:
+            archive.write(os.path.join(dossier, fichier), fichier)
+    return chemin_zip
+
+def elagage(args) -> dict:
+    """Options d'élagage (k_voisins, rayon) données en ligne de commande ; vides sinon (clés de cache inchangées)."""
+    return {cle: val for cle, val in (("k_voisins", args.k_voisins), ("rayon", args.rayon)) if val is not None}
+
+def main():
+    ap = argparse.ArgumentParser(description="Génère un lot d'instances (JSON + XML) en parallèle, avec manifeste CSV.")
+    ap.add_argument("--voitures", type=plage, nargs="+", required=True, help='Ex. "2-6" "8" "10-20:5"')
+    ap.add_argument("--passagers", type=plage, nargs="+", required=True)
+    ap.add_argument("--capacites", type=plage, nargs="+", required=True)
+    ap.add_argument("--graines", type=plage, nargs="+", default=[[0]])
+    ap.add_argument("--modelisations", type=int, nargs="+", choices=[1, 2], default=[1, 2])
+    ap.add_argument("--encodage", choices=["sous_ensembles", "compteur"], default="sous_ensembles")
+    ap.add_argument("--placement", choices=PLACEMENTS, default="cyclique",
+                    help="Agents des variables y_j en M2 (coupe entre agents dans le manifeste)")
+    ap.add_argument("--mode-depot", choices=["aucun", "commun", "par_passager"], default="commun")
+    ap.add_argument("--k-voisins", type=int, default=None,
+                    help="Ne garder que les k voitures les plus proches de chaque passager (élagage)")
+    ap.add_argument("--rayon", type=float, default=None,
+                    help="Ne garder que les voitures à moins de cette distance de ramassage (élagage)")
+    ajouter_arguments(ap)
+    ap.add_argument("--sortie", default="instances", help="Dossier de sortie")
+    ap.add_argument("--zip", default=None, help="Archive zip à produire (manifeste + fichiers)")
+    ap.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut : nb de CPU)")
+    ap.add_argument("--cache", default=None, help="Dossier du cache d'instances partagé (désactivé par défaut)")
+    ap.add_argument("--stats-phases", action="store_true",
+                    help="Mesurer les phases des constructeurs (journal + colonne « phases » du manifeste)")
+    args = ap.parse_args()
+
+    chemin_manifeste = generer_lot(
+        aplatir(args.voitures), aplatir(args.passagers), aplatir(args.capacites), aplatir(args.graines),
+        args.sortie, tuple(args.modelisations), args.encodage, args.jobs,
+        cache={"dossier": args.cache} if args.cache else None,
+        options={"mode_depot": args.mode_depot, **elagage(args), **options_reseau(args)},
+        progression=lambda fait, total: print(f"[OK] {fait}/{total} instance(s)"),
+        stats_phases=args.stats_phases,
+        placement=args.placement,
+    )
+    print(f"[OK] Manifeste : {chemin_manifeste}")
+    if args.zip:
+        print(f"[OK] Archive : {zipper_lot(chemin_manifeste, args.zip)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# graphe_contraintes.py — Graphe primal des contraintes, pseudo-arbre (DFS ou min-fill),
+# largeur induite et taille maximale des messages UTIL de DPOP, pour les Modélisations 1 et 2.
+import argparse
+import csv
+import heapq
+import math
+import os
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from constructeur_dcop import InstanceCompacte
+from solveur_exact import nom_instance_depuis_xml
+
+HEURISTIQUES = ("dfs", "min_fill")
+
+# Colonnes ajoutées aux CSV de bench (cf. simulateur_dcop.COLONNES_BENCH)
+COLONNES_GRAPHE = ["induced_width", "max_util_size", "pseudo_tree_depth"]
+
+class GraphePrimal:
+    """
+    Graphe primal d'une instance telle qu'écrite par les constructeurs : un sommet par variable
+    XCSP (y compris les compteurs s{i}_{j}), une arête entre deux variables partageant une contrainte.
+    """
+
+    __slots__ = ("noms", "domaines", "adjacence")
+
+    def __init__(self, noms: List[str], domaines: List[int]):
+        self.noms = noms
+        self.domaines = domaines
+        self.adjacence: List[Set[int]] = [set() for _ in noms]
+
+    def __len__(self) -> int:
+        return len(self.noms)
+
+    def nb_aretes(self) -> int:
+        return sum(len(voisins) for voisins in self.adjacence) // 2
+
+    def relier(self, portee) -> None:
+        """Ajoute la clique d'une portée de contrainte."""
+        portee = list(portee)
+        for a in portee:
+            self.adjacence[a].update(portee)
+            self.adjacence[a].discard(a)
+
+def graphe_primal(obj: Union[dict, InstanceCompacte], modelisation: int = 1, encodage_capacite: str = "sous_ensembles") -> GraphePrimal:
+    """
+    Graphe primal sans énumérer les sous-ensembles de capacité : pour une voiture de capacité
+    1 <= K < P, l'union des portées « K+1 parmi P » est la clique de ses P variables.
+    """
+    instance = obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+    if instance.candidats is not None:
+        return _graphe_primal_elague(instance, modelisation, encodage_capacite)
+    nb_voitures, nb_passagers = len(instance.voitures), len(instance.passagers)
+    capacites = [int(K) for K in instance.capacites.tolist()]
+    comptees = [(i, K) for i, K in enumerate(capacites) if K < nb_passagers]
+
+    if modelisation == 1:
+        # x_ij -> i * P + j ; compteurs ensuite, dans l'ordre des voitures concernées
+        noms = [f"x{i+1}{j+1}" for i in range(nb_voitures) for j in range(nb_passagers)]
+        domaines = [2] * len(noms)
+        if encodage_capacite == "compteur":
+            for i, K in comptees:
+                noms += [f"s{i+1}_{j+1}" for j in range(nb_passagers)]
+                domaines += [K + 1] * nb_passagers
+        graphe = GraphePrimal(noms, domaines)
+        if nb_voitures >= 2:
+            for j in range(nb_passagers):                                   # AMO + tout-zéro
+                graphe.relier(i * nb_passagers + j for i in range(nb_voitures))
+        base = nb_voitures * nb_passagers
+        for rang, (i, K) in enumerate(comptees):
+            x = [i * nb_passagers + j for j in range(nb_passagers)]
+            if encodage_capacite == "compteur":
+                s = [base + rang * nb_passagers + j for j in range(nb_passagers)]
+                graphe.relier((x[0], s[0]))
+                for j in range(1, nb_passagers):
+                    graphe.relier((s[j - 1], x[j], s[j]))
+            elif K >= 1:
+                graphe.relier(x)
+    elif modelisation == 2:
+        noms = [f"y{j+1}" for j in range(nb_passagers)]
+        domaines = [nb_voitures] * nb_passagers
+        if encodage_capacite == "compteur":
+            for i, K in comptees:
+                noms += [f"s{i+1}_{j+1}" for j in range(nb_passagers)]
+                domaines += [K + 1] * nb_passagers
+        graphe = GraphePrimal(noms, domaines)
+        y = list(range(nb_passagers))
+        if encodage_capacite == "compteur":
+            for rang, _ in enumerate(comptees):
+                s = [nb_passagers + rang * nb_passagers + j for j in range(nb_passagers)]
+                graphe.relier((y[0], s[0]))
+                for j in range(1, nb_passagers):
+                    graphe.relier((s[j - 1], y[j], s[j]))
+        elif any(K >= 1 for _, K in comptees):
+            graphe.relier(y)                                                # même clique pour toutes les voitures
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+    return graphe
+
+def _graphe_primal_elague(instance: InstanceCompacte, modelisation: int, encodage_capacite: str) -> GraphePrimal:
+    """
+    Graphe primal d'une instance élaguée : x_ij des seuls couples candidats (M1), domaine de y_j
+    réduit à ses voitures candidates (M2) ; AMO / tout-zéro et capacités sur les candidats.
+    """
+    masque = instance.candidats
+    nb_voitures, nb_passagers = masque.shape
+    passagers_de = [[j for j in range(nb_passagers) if masque[i, j]] for i in range(nb_voitures)]
+    comptees = [(i, K) for i, K in enumerate(int(K) for K in instance.capacites.tolist()) if K < len(passagers_de[i])]
+
+    if modelisation == 1:
+        indice = {(i, j): a for a, (i, j) in enumerate((i, j) for i in range(nb_voitures) for j in passagers_de[i])}
+        noms = [f"x{i+1}{j+1}" for i, j in indice]
+    elif modelisation == 2:
+        noms = [f"y{j+1}" for j in range(nb_passagers)]
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+    domaines = [2] * len(noms) if modelisation == 1 else masque.sum(axis=0).tolist()
+    s_suivant = len(noms)                                                   # compteurs ensuite, voiture par voiture
+    if encodage_capacite == "compteur":
+        for i, K in comptees:
+            noms += [f"s{i+1}_{j+1}" for j in passagers_de[i]]
+            domaines += [K + 1] * len(passagers_de[i])
+    graphe = GraphePrimal(noms, domaines)
+    if modelisation == 1:
+        for j in range(nb_passagers):                                       # AMO + tout-zéro
+            graphe.relier(indice[i, j] for i in range(nb_voitures) if masque[i, j])
+    # Variable de chaque passager candidat de la voiture i
+    variable = (lambda i, j: indice[i, j]) if modelisation == 1 else (lambda i, j: j)
+    for i, K in comptees:
+        x = [variable(i, j) for j in passagers_de[i]]
+        if encodage_capacite == "compteur":
+            s = list(range(s_suivant, s_suivant + len(x)))
+            s_suivant += len(x)
+            graphe.relier((x[0], s[0]))
+            for rang in range(1, len(x)):
+                graphe.relier((s[rang - 1], x[rang], s[rang]))
+        elif K >= 1:
+            graphe.relier(x)
+    return graphe
+
+def _taille_util(graphe: GraphePrimal, separateur) -> int:
+    return math.prod(graphe.domaines[a] for a in separateur)
+
+def pseudo_arbre_dfs(graphe: GraphePrimal) -> Dict[str, object]:
+    """
+    Pseudo-arbre DFS (comme DPOP dans FRODO) : racine = sommet de plus grand degré, enfants
+    visités par degré décroissant. Séparateur de x = ancêtres voisins de x ou de sa descendance ;
+    le message UTIL de x porte sur son séparateur (taille = produit des domaines).
+    """
+    n = len(graphe)
+    adjacence = graphe.adjacence
+    ordre_voisins = [sorted(voisins, key=lambda a: (-len(adjacence[a]), a)) for voisins in adjacence]
+    prefixe = [-1] * n                     # rang de visite (préordre)
+    parent = [-1] * n
+    profondeur = [0] * n
+    visites: List[int] = []
+    for racine in sorted(range(n), key=lambda a: (-len(adjacence[a]), a)):
+        if prefixe[racine] >= 0:
+            continue
+        prefixe[racine] = len(visites)
+        visites.append(racine)
+        pile = [(racine, iter(ordre_voisins[racine]))]
+        while pile:
+            x, voisins = pile[-1]
+            for y in voisins:
+                if prefixe[y] < 0:
+                    prefixe[y] = len(visites)
+                    visites.append(y)
+                    parent[y] = x
+                    profondeur[y] = profondeur[x] + 1
+                    pile.append((y, iter(ordre_voisins[y])))
+                    break
+            else:
+                pile.pop()
+
+    # Séparateurs en post-ordre (préordre inversé : les descendants sont traités avant)
+    separateurs: List[Optional[Set[int]]] = [None] * n
+    enfants_sep: List[Set[int]] = [set() for _ in range(n)]
+    largeur, util_max = 0, 1
+    for x in reversed(visites):
+        sep = {a for a in adjacence[x] if prefixe[a] < prefixe[x]}
+        sep |= enfants_sep[x]
+        sep.discard(x)
+        separateurs[x] = sep
+        if parent[x] >= 0:
+            enfants_sep[parent[x]] |= sep
+        enfants_sep[x] = set()
+        largeur = max(largeur, len(sep))
+        util_max = max(util_max, _taille_util(graphe, sep))
+    return {
+        "heuristique": "dfs",
+        "induced_width": largeur,
+        "max_util_size": util_max,
+        "pseudo_tree_depth": (max(profondeur) + 1) if n else 0,
+        "parent": parent,
+    }
+
+def elimination_min_fill(graphe: GraphePrimal) -> Dict[str, object]:
+    """
+    Ordre d'élimination min-fill (égalités : plus petit degré puis indice). Largeur induite =
+    max des voisins restants à l'élimination ; message = table sur ces voisins. Les scores ne
+    sont recalculés que pour les sommets à distance <= 2 du sommet éliminé.
+    """
+    n = len(graphe)
+    adjacence = [set(voisins) for voisins in graphe.adjacence]
+
+    def remplissage(x: int) -> int:
+        voisins = list(adjacence[x])
+        manquantes = 0
+        for k, a in enumerate(voisins):
+            manquantes += sum(1 for b in voisins[k + 1:] if b not in adjacence[a])
+        return manquantes
+
+    version = [0] * n
+    tas = [(remplissage(x), len(adjacence[x]), x, 0) for x in range(n)]
+    heapq.heapify(tas)
+    elimine = [False] * n
+    ordre, largeur, util_max = [], 0, 1
+    while tas:
+        _, _, x, v = heapq.heappop(tas)
+        if elimine[x] or v != version[x]:
+            continue
+        voisins = adjacence[x]
+        largeur = max(largeur, len(voisins))
+        util_max = max(util_max, _taille_util(graphe, voisins))
+        elimine[x] = True
+        ordre.append(x)
+        for a in voisins:
+            adjacence[a].discard(x)
+            adjacence[a] |= voisins - {a}
+        touches = set(voisins)
+        for a in voisins:
+            touches |= adjacence[a]
+        for a in touches:
+            if not elimine[a]:
+                version[a] += 1
+                heapq.heappush(tas, (remplissage(a), len(adjacence[a]), a, version[a]))
+        adjacence[x] = set()
+    return {"heuristique": "min_fill", "induced_width": largeur, "max_util_size": util_max,
+            "pseudo_tree_depth": None, "ordre": ordre}
+
+def analyser_graphe(
+    obj: Union[dict, InstanceCompacte],
+    modelisation: int = 1,
+    encodage_capacite: str = "sous_ensembles",
+    heuristique: str = "dfs",
+) -> Dict[str, object]:
+    """nb_noeuds, nb_aretes, induced_width, max_util_size (domaine^séparateur), pseudo_tree_depth (DFS)."""
+    if heuristique not in HEURISTIQUES:
+        raise ValueError(f"Heuristique inconnue '{heuristique}'. Choisissez parmi {HEURISTIQUES}.")
+    graphe = graphe_primal(obj, modelisation, encodage_capacite)
+    resultat = pseudo_arbre_dfs(graphe) if heuristique == "dfs" else elimination_min_fill(graphe)
+    resultat.pop("parent", None)
+    resultat.pop("ordre", None)
+    return {"nb_noeuds": len(graphe), "nb_aretes": graphe.nb_aretes(), **resultat}
+
+def comparer_modelisations(obj: Union[dict, InstanceCompacte], encodage_capacite: str = "sous_ensembles",
+                           heuristique: str = "dfs") -> Dict[int, Dict[str, object]]:
+    """Analyse des deux modélisations d'une même instance, pour choisir avant de lancer le solveur."""
+    return {m: analyser_graphe(obj, m, encodage_capacite, heuristique) for m in (1, 2)}
+
+def colonnes_graphe(obj: Union[dict, InstanceCompacte], modelisation: int, encodage_capacite: str = "sous_ensembles") -> Dict[str, object]:
+    """Valeurs des COLONNES_GRAPHE pour une ligne de bench (pseudo-arbre DFS, comme DPOP)."""
+    analyse = analyser_graphe(obj, modelisation, encodage_capacite, "dfs")
+    return {c: analyse[c] for c in COLONNES_GRAPHE}
+
+# ----------------------------------------------------------------------
+# Complément de CSV de bench existants
+# ----------------------------------------------------------------------
+
+def _modelisation_depuis_xml(xml_file: str, defaut: int) -> int:
+    base = os.path.splitext(os.path.basename(str(xml_file)))[0]
+    return 2 if base.endswith("_M2") else 1 if base.endswith("_M1") else defaut
+
+def completer_csv(chemin_csv: str, dossier_instances: str, modelisation_defaut: int = 1,
+                  encodage_capacite: str = "sous_ensembles") -> Tuple[int, int]:
+    """
+    Ajoute / met à jour les COLONNES_GRAPHE d'un CSV de bench à partir des instances JSON
+    <dossier>/<instance>.json (lignes sans instance : colonnes vides). Retourne (complétées, total).
+    """
+    with open(chemin_csv, newline="", encoding="utf-8") as f:
+        lecteur = csv.DictReader(f)
+        colonnes = list(lecteur.fieldnames or [])
+        lignes = list(lecteur)
+    colonnes += [c for c in COLONNES_GRAPHE if c not in colonnes]
+    memo: Dict[Tuple[str, int], Optional[dict]] = {}
+    completees = 0
+    for ligne in lignes:
+        nom = ligne.get("instance_name") or nom_instance_depuis_xml(ligne["xml_file"])
+        m = _modelisation_depuis_xml(ligne["xml_file"], modelisation_defaut)
+        if (nom, m) not in memo:
+            chemin = os.path.join(dossier_instances, f"{nom}.json")
+            memo[(nom, m)] = (colonnes_graphe(InstanceCompacte.charger(chemin), m, encodage_capacite)
+                              if os.path.isfile(chemin) else None)
+        valeurs = memo[(nom, m)]
+        if valeurs is not None:
+            ligne.update(valeurs)
+            completees += 1
+    temporaire = f"{chemin_csv}.tmp{os.getpid()}"
+    with open(temporaire, "w", newline="", encoding="utf-8") as f:
+        ecrivain = csv.DictWriter(f, fieldnames=colonnes, restval="")
+        ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+    os.replace(temporaire, chemin_csv)
+    return completees, len(lignes)
+
+def main():
+    ap = argparse.ArgumentParser(description="Largeur induite et taille UTIL max (DPOP) : analyse d'une instance ou complément de CSV de bench.")
+    ap.add_argument("chemins", nargs="+", help="Instances JSON, ou CSV de bench avec --instances")
+    ap.add_argument("--instances", default=None, help="Dossier des instances JSON (mode complément de CSV)")
+    ap.add_argument("--modelisation", type=int, choices=[1, 2], default=1,
+                    help="Modélisation des lignes dont le xml_file n'a pas de suffixe _M1/_M2")
+    ap.add_argument("--encodage", choices=["sous_ensembles", "compteur"], default="sous_ensembles")
+    ap.add_argument("--heuristique", choices=HEURISTIQUES, default="dfs")
+    args = ap.parse_args()
+
+    for chemin in args.chemins:
+        if args.instances:
+            completees, total = completer_csv(chemin, args.instances, args.modelisation, args.encodage)
+            print(f"[OK] {chemin} : {completees}/{total} ligne(s) complétée(s)")
+            continue
+        instance = InstanceCompacte.charger(chemin)
+        for m, analyse in comparer_modelisations(instance, args.encodage, args.heuristique).items():
+            print(f"{chemin} M{m} : {analyse['nb_noeuds']} variables, {analyse['nb_aretes']} arêtes, "
+                  f"largeur induite {analyse['induced_width']}, UTIL max {analyse['max_util_size']:.3g}"
+                  + (f", profondeur {analyse['pseudo_tree_depth']}" if analyse["pseudo_tree_depth"] else ""))
+
+if __name__ == "__main__":
+    main()
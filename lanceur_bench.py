@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# lanceur_bench.py — Balayage parallèle et reprenable des benchs (FRODO ou simulateur_dcop)
+# Remplit results/bench.csv (M1) et results/bench2.csv (M2) ; journaux dans results/logs/.
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set, Tuple
+
+import magasin_resultats
+from constructeur_dcop import PLACEMENTS, InstanceCompacte, placement_m2
+from evaluateur_solutions import texte_affectation
+from generation_lot import aplatir, elagage, empreinte_options, generer_fichiers_instance, nom_instance, nom_xml, plage
+from reseau_routier import ajouter_arguments, options_reseau
+from simulateur_dcop import ALGORITHMES, ajouter_lignes_csv, construire_probleme, ligne_bench_instance, simuler
+
+MOTEURS = ("simulateur", "frodo")
+
+# Fichiers de configuration d'agents fournis avec FRODO (dossier agents/ de la distribution)
+AGENTS_FRODO = {
+    "DPOP": "DPOPagent.xml",
+    "ADOPT": "ADOPTagent.xml",
+    "MGM": "MGMagent.xml",
+    "DSA": "DSAagent.xml",
+    "MaxSum": "MaxSumAgent.xml",
+    "SynchBB": "SynchBBagent.xml",
+}
+
+# Marge laissée à la JVM au-delà du -timeout de FRODO avant de tuer le processus
+MARGE_JVM_S = 10.0
+
+# Marge laissée au simulateur (construction du problème comprise) au-delà du timeout avant de le tuer
+MARGE_SIMULATEUR_S = 5.0
+
+def csv_resultats(dossier: str, modelisation: int) -> str:
+    """results/bench.csv pour M1, results/bench2.csv pour M2 (noms attendus par l'app)."""
+    return os.path.join(dossier, "bench.csv" if modelisation == 1 else "bench2.csv")
+
+def paires_terminees(chemin_csv: str) -> Set[Tuple[str, str]]:
+    """Couples (xml_file, algorithm) déjà présents dans un CSV de bench (reprise)."""
+    if not os.path.exists(chemin_csv):
+        return set()
+    with open(chemin_csv, newline="", encoding="utf-8") as f:
+        return {(ligne["xml_file"], ligne["algorithm"]) for ligne in csv.DictReader(f) if ligne.get("xml_file")}
+
+# ----------------------------------------------------------------------
+# Exécution d'un job (dans un processus du pool)
+# ----------------------------------------------------------------------
+
+def _valeur(motif: str, texte: str, conversion=float):
+    trouve = re.search(motif, texte, flags=re.IGNORECASE)
+    if not trouve:
+        return None
+    try:
+        return conversion(trouve.group(1))
+    except ValueError:
+        return None                                    # valeur non numérique
+
+def analyser_sortie_frodo(sortie: str) -> Dict[str, Optional[float]]:
+    """Coût, temps, messages et NCCCs lus dans la sortie console de l'AgentFactory FRODO."""
+    cout = _valeur(r"Total (?:optimal )?(?:cost|utility)[^:\n]*:\s*(\S+)", sortie)
+    return {
+        "total_cost": cout if cout is not None and math.isfinite(cout) else None,
+        "runtime_ms": _valeur(r"finished in (\d+) ?ms", sortie, int),
+        "msgs_total": _valeur(r"Total number of messages[^:\n]*:\s*(\d+)", sortie, int),
+        "ncccs": _valeur(r"NCCCs?[^:\n\d]*:?\s*(\d+)", sortie, int),
+    }
+
+def _executer_frodo(chemin_xml: str, algorithme: str, timeout_s: float, options: dict, journal) -> dict:
+    agent = os.path.join(options["frodo_agents"], AGENTS_FRODO[algorithme])
+    commande = [
+        "java", f"-Xmx{options['memoire_jvm']}", "-cp", options["frodo_jar"],
+        "frodo2.algorithms.AgentFactory", "-timeout", str(int(timeout_s * 1000)), chemin_xml, agent,
+    ]
+    journal.write(" ".join(commande) + "\n")
+    debut = time.perf_counter()
+    try:
+        proc = subprocess.run(commande, capture_output=True, text=True, timeout=timeout_s + MARGE_JVM_S)
+    except subprocess.TimeoutExpired as e:
+        journal.write((e.stdout or "") if isinstance(e.stdout, str) else "")
+        journal.write("[TIMEOUT] processus FRODO tué\n")
+        return {"algorithm": algorithme, "total_cost": None, "runtime_ms": int(timeout_s * 1000),
+                "ncccs": None, "msgs_total": None, "statut": "timeout"}
+    journal.write(proc.stdout)
+    journal.write(proc.stderr)
+    if proc.returncode != 0:
+        raise RuntimeError(f"FRODO a échoué (code {proc.returncode}), cf. journal")
+    mesures = analyser_sortie_frodo(proc.stdout)
+    if mesures["runtime_ms"] is None:
+        mesures["runtime_ms"] = int(round((time.perf_counter() - debut) * 1000))
+    return {"algorithm": algorithme, **mesures, "statut": "ok"}
+
+def _simuler_processus(connexion, instance: InstanceCompacte, modelisation: int, hotes, algorithme: str,
+                       cycles: int, graine: int, delai_s: float) -> None:
+    """Processus fils de _executer_simulateur : construit le problème, simule et renvoie le résultat (ou l'erreur)."""
+    try:
+        probleme = construire_probleme(instance, modelisation, hotes)
+        connexion.send(("ok", simuler(probleme, algorithme, cycles=cycles, graine=graine, delai_s=delai_s)))
+    except Exception as e:
+        connexion.send(("erreur", f"{type(e).__name__}: {e}"))
+    finally:
+        connexion.close()
+
+def _executer_simulateur(instance: InstanceCompacte, modelisation: int, hotes, algorithme: str, timeout_s: float,
+                         options: dict, graine: int, journal) -> dict:
+    """
+    Simulateur dans un processus fils, tué au-delà du timeout (+ marge) comme FRODO : une construction
+    ou un cycle trop long ne bloque pas le balayage. Le simulateur s'arrête aussi de lui-même au premier
+    cycle qui dépasse le timeout ; ce job compte alors en timeout, avec le coût atteint.
+    """
+    lecture, ecriture = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_simuler_processus, args=(
+        ecriture, instance, modelisation, hotes, algorithme, options["cycles"], graine, timeout_s))
+    proc.start()
+    ecriture.close()
+    try:
+        message = lecture.recv() if lecture.poll(timeout_s + MARGE_SIMULATEUR_S) else None
+    except EOFError:                                        # fils mort sans réponse (mémoire, signal)
+        message = ("erreur", "processus du simulateur interrompu")
+    finally:
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+        lecture.close()
+    if message is None:
+        journal.write("[TIMEOUT] processus du simulateur tué\n")
+        return {"algorithm": algorithme, "total_cost": None, "runtime_ms": int(timeout_s * 1000),
+                "ncccs": None, "msgs_total": None, "statut": "timeout"}
+    etat, resultat = message
+    if etat != "ok":
+        raise RuntimeError(f"Simulateur en échec (code {proc.exitcode}) : {resultat}")
+    resultat["statut"] = "timeout" if resultat["runtime_ms"] >= timeout_s * 1000 else "ok"
+    return resultat
+
+def executer_job(job: dict) -> dict:
+    """
+    Résout un (instance, modélisation, algorithme) et retourne sa ligne de bench.
+    FRODO et le simulateur tournent dans un processus tué au-delà du timeout (+ marge). Un job en
+    timeout produit une ligne (sans coût s'il a été tué) et n'est pas relancé.
+    """
+    nom, m, algo = job["instance"], job["modelisation"], job["algorithme"]
+    chemin_json = os.path.join(job["dossier_instances"], f"{nom}.json")
+    xml_file = nom_xml(nom, m, job["encodage_capacite"], job["placement"])
+    chemin_xml = os.path.join(job["dossier_instances"], xml_file)
+    instance = InstanceCompacte.charger(chemin_json)
+    hotes = None
+    if m == 2 and job["placement"] != "cyclique":
+        hotes = placement_m2(instance, job["encodage_capacite"], job["placement"])["hotes"]
+    chemin_log = os.path.join(job["dossier_logs"], f"{os.path.splitext(xml_file)[0]}_{algo}.log")
+    with open(chemin_log, "w", encoding="utf-8") as journal:
+        if job["moteur"] == "frodo":
+            resultat = _executer_frodo(chemin_xml, algo, job["timeout"], job["options"], journal)
+        else:
+            resultat = _executer_simulateur(instance, m, hotes, algo, job["timeout"], job["options"],
+                                            job["graine"], journal)
+            if "affectation" in resultat:
+                journal.write(f"{algo} sur {xml_file} : coût={resultat['total_cost']} temps={resultat['runtime_ms']}ms "
+                              f"msgs={resultat['msgs_total']} ncccs={resultat['ncccs']}\n")
+                # Même format que l'affectation des journaux FRODO (relue par evaluateur_solutions)
+                journal.write(f"Affectation : {texte_affectation(instance, m, resultat['affectation'])}\n")
+    ligne = ligne_bench_instance(instance, m, resultat, xml_file, job["encodage_capacite"])
+    return {"modelisation": m, "ligne": ligne, "statut": resultat["statut"]}
+
+# ----------------------------------------------------------------------
+# Balayage
+# ----------------------------------------------------------------------
+
+def lancer_balayage(
+    voitures: List[int],
+    passagers: List[int],
+    capacites: List[int],
+    graines: List[int],
+    modelisations: List[int],
+    algorithmes: List[str],
+    timeout: float = 60.0,
+    moteur: str = "simulateur",
+    dossier: str = "results",
+    nb_processus: Optional[int] = None,
+    encodage_capacite: str = "sous_ensembles",
+    options: Optional[dict] = None,
+    cache: Optional[dict] = None,
+    magasin: Optional[str] = None,
+    lot_magasin: int = 200,
+    stats_phases: bool = False,
+    placement: str = "cyclique",
+    options_instances: Optional[dict] = None,
+) -> Dict[str, int]:
+    """
+    Produit cartésien de la grille ; génère les instances manquantes, saute les couples
+    (xml_file, algorithm) déjà présents dans le CSV cible, puis exécute les jobs restants dans
+    un pool de processus. Chaque ligne est ajoutée au CSV dès que son job se termine.
+    `cache` : paramètres de CacheInstances pour réutiliser les instances d'autres balayages.
+    `magasin` : dossier du magasin Parquet (magasin_resultats) à remplir à la place des CSV ;
+    les lignes y sont ajoutées par paquets de `lot_magasin` (et à la fin, même sur interruption).
+    `stats_phases` : journalise les temps par phase des constructeurs pour chaque XML généré.
+    `placement` : agents des y_j en M2 (PLACEMENTS), dans le XML comme dans le simulateur.
+    `options_instances` : options de generer_instance_aleatoire (ex. k_voisins, rayon pour l'élagage ;
+    reseau pour des coûts en distance routière, cf. generer_fichiers_instance).
+    Retourne les compteurs {"termines", "timeouts", "echecs", "ignores"} (+ "cache_succes",
+    "cache_echecs" avec cache).
+    """
+    if moteur not in MOTEURS:
+        raise ValueError(f"Moteur inconnu '{moteur}'. Choisissez parmi {MOTEURS}.")
+    connus = ALGORITHMES if moteur == "simulateur" else tuple(AGENTS_FRODO)
+    inconnus = [a for a in algorithmes if a not in connus]
+    if inconnus:
+        raise ValueError(f"Algorithme(s) non disponible(s) pour le moteur {moteur} : {inconnus}")
+    options = {"cycles": 200, "memoire_jvm": "2g", "frodo_jar": "frodo2.jar", "frodo_agents": "agents", **(options or {})}
+
+    dossier_instances = os.path.join(dossier, "instances")
+    dossier_logs = os.path.join(dossier, "logs")
+    os.makedirs(dossier_instances, exist_ok=True)
+    os.makedirs(dossier_logs, exist_ok=True)
+    if magasin:
+        termines = {m: magasin_resultats.paires_terminees(magasin, m) for m in modelisations}
+    else:
+        termines = {m: paires_terminees(csv_resultats(dossier, m)) for m in modelisations}
+
+    jobs, compteurs = [], {"termines": 0, "timeouts": 0, "echecs": 0, "ignores": 0}
+    empreinte = empreinte_options(options_instances)
+    for V, P, K, g in itertools.product(voitures, passagers, capacites, graines):
+        nom = nom_instance(V, P, K, g, empreinte)
+        for m, algo in itertools.product(modelisations, algorithmes):
+            # Le nom du XML porte options, encodage et placement : une autre variante n'est pas « déjà faite »
+            if (nom_xml(nom, m, encodage_capacite, placement), algo) in termines[m]:
+                compteurs["ignores"] += 1
+                continue
+            jobs.append({
+                "instance": nom, "parametres": (V, P, K, g), "graine": g, "modelisation": m,
+                "algorithme": algo, "timeout": timeout, "moteur": moteur, "options": options,
+                "encodage_capacite": encodage_capacite, "placement": placement,
+                "dossier_instances": dossier_instances, "dossier_logs": dossier_logs,
+            })
+    print(f"[INFO] {len(jobs)} job(s) à exécuter, {compteurs['ignores']} déjà terminé(s).")
+    if not jobs:
+        return compteurs
+
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        # 1) Instances manquantes (une fois par jeu de paramètres, toutes modélisations utiles)
+        a_generer: Dict[tuple, set] = {}
+        for job in jobs:
+            a_generer.setdefault(job["parametres"], set()).add(job["modelisation"])
+        for futur in as_completed([
+            pool.submit(generer_fichiers_instance, dossier_instances, *params, tuple(sorted(ms)), encodage_capacite,
+                        cache, options_instances, stats_phases, placement)
+            for params, ms in a_generer.items()
+        ]):
+            lignes_manifeste, stats_cache = futur.result()
+            for ligne in lignes_manifeste:
+                if ligne["phases"]:
+                    print(f"[PHASES] {ligne['fichier']} : {ligne['phases']}")
+                if placement != "cyclique" and ligne["coupe_agents"] != "":
+                    print(f"[PLACEMENT] {ligne['fichier']} : {placement}, coupe entre agents = {ligne['coupe_agents']}")
+            for cle in ("succes", "echecs"):
+                if cle in stats_cache:
+                    compteurs[f"cache_{cle}"] = compteurs.get(f"cache_{cle}", 0) + stats_cache[cle]
+
+        # 2) Jobs de résolution ; le processus principal est le seul à écrire les résultats
+        en_attente: Dict[int, List[dict]] = {m: [] for m in modelisations}
+        futurs = {pool.submit(executer_job, job): job for job in jobs}
+        try:
+            for futur in as_completed(futurs):
+                job = futurs[futur]
+                etiquette = f"{job['instance']}_M{job['modelisation']} / {job['algorithme']}"
+                try:
+                    resultat = futur.result()
+                except Exception as e:
+                    compteurs["echecs"] += 1
+                    print(f"[ERREUR] {etiquette} : {e}")
+                    continue
+                m = resultat["modelisation"]
+                if magasin:
+                    en_attente[m].append(resultat["ligne"])
+                    if len(en_attente[m]) >= lot_magasin:
+                        magasin_resultats.ajouter_lignes(magasin, en_attente[m], m)
+                        en_attente[m] = []
+                else:
+                    ajouter_lignes_csv(csv_resultats(dossier, m), [resultat["ligne"]])
+                if resultat["statut"] == "timeout":
+                    compteurs["timeouts"] += 1
+                    print(f"[TIMEOUT] {etiquette}")
+                else:
+                    compteurs["termines"] += 1
+                    print(f"[OK] {etiquette} : coût={resultat['ligne']['total_cost']}")
+        finally:
+            for m, lignes in en_attente.items():
+                magasin_resultats.ajouter_lignes(magasin, lignes, m)
+    return compteurs
+
+def main():
+    ap = argparse.ArgumentParser(description="Balayage parallèle et reprenable : génère les instances et remplit results/bench*.csv.")
+    ap.add_argument("--voitures", type=plage, nargs="+", required=True, help='Nombres de voitures (ex. "2-6" "8")')
+    ap.add_argument("--passagers", type=plage, nargs="+", required=True, help="Nombres de passagers")
+    ap.add_argument("--capacites", type=plage, nargs="+", required=True, help="Capacités par voiture")
+    ap.add_argument("--graines", type=plage, nargs="+", default=[[0]])
+    ap.add_argument("--modelisations", type=int, nargs="+", choices=[1, 2], default=[1, 2])
+    ap.add_argument("--algorithmes", nargs="+", default=["MGM", "DSA", "MaxSum"])
+    ap.add_argument("--timeout", type=float, default=60.0, help="Timeout par job (s)")
+    ap.add_argument("--moteur", choices=MOTEURS, default="simulateur")
+    ap.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut : nb de CPU)")
+    ap.add_argument("--dossier", default="results", help="Dossier des CSV, instances/ et logs/")
+    ap.add_argument("--encodage", choices=["sous_ensembles", "compteur"], default="sous_ensembles")
+    ap.add_argument("--placement", choices=PLACEMENTS, default="cyclique", help="Agents des variables y_j en M2")
+    ap.add_argument("--k-voisins", type=int, default=None, help="Élagage : k voitures les plus proches par passager")
+    ap.add_argument("--rayon", type=float, default=None, help="Élagage : distance de ramassage maximale")
+    ajouter_arguments(ap)
+    ap.add_argument("--cycles", type=int, default=200, help="Cycles du simulateur")
+    ap.add_argument("--frodo-jar", default="frodo2.jar")
+    ap.add_argument("--frodo-agents", default="agents", help="Dossier des fichiers <ALGO>agent.xml de FRODO")
+    ap.add_argument("--memoire-jvm", default="2g")
+    ap.add_argument("--cache", default=None, help="Dossier du cache d'instances partagé (désactivé par défaut)")
+    ap.add_argument("--cache-taille-mo", type=int, default=512, help="Taille max du cache (Mo)")
+    ap.add_argument("--cache-compresse", action="store_true", help="Stocker les entrées du cache en gzip")
+    ap.add_argument("--magasin", default=None,
+                    help="Magasin Parquet à remplir au lieu des CSV (ex. results/magasin ; reprise sur son contenu)")
+    ap.add_argument("--stats-phases", action="store_true", help="Journaliser les temps par phase des constructeurs")
+    args = ap.parse_args()
+
+    compteurs = lancer_balayage(
+        aplatir(args.voitures), aplatir(args.passagers), aplatir(args.capacites), aplatir(args.graines),
+        args.modelisations, args.algorithmes,
+        timeout=args.timeout, moteur=args.moteur, dossier=args.dossier, nb_processus=args.jobs,
+        encodage_capacite=args.encodage,
+        options={"cycles": args.cycles, "frodo_jar": args.frodo_jar,
+                 "frodo_agents": args.frodo_agents, "memoire_jvm": args.memoire_jvm},
+        cache=({"dossier": args.cache, "taille_max": args.cache_taille_mo * 1024 ** 2,
+                "compresser": args.cache_compresse} if args.cache else None),
+        magasin=args.magasin,
+        stats_phases=args.stats_phases,
+        placement=args.placement,
+        options_instances={**elagage(args), **options_reseau(args)} or None,
+    )
+    if "cache_succes" in compteurs:
+        print(f"[INFO] Cache d'instances : {compteurs['cache_succes']} succès, {compteurs['cache_echecs']} échecs")
+    print(f"[OK] Terminés : {compteurs['termines']}, timeouts : {compteurs['timeouts']}, "
+          f"échecs : {compteurs['echecs']}, déjà faits : {compteurs['ignores']}")
+
+if __name__ == "__main__":
+    main()
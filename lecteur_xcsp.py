@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# lecteur_xcsp.py — Lecture en flux (iterparse) des fichiers XCSP 2.1 produits par constructeur_dcop :
+# colonnes structurelles des CSV de bench en mémoire constante, et reconstruction du JSON d'instance (M1 / M2).
+import argparse
+import csv
+import gzip
+import json
+import os
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from solveur_exact import nom_instance_depuis_xml
+
+# Colonnes structurelles de COLONNES_BENCH calculées depuis le XML
+COLONNES_STRUCTURE = [
+    "nb_agents", "nb_variables", "nb_constraints", "nb_relations", "max_arity", "domain_names",
+    "domain_sizes", "arity_histogram", "nb_soft_relations", "nb_other_relations", "passengers_guess",
+]
+
+# Éléments feuilles : libérés dès leur fin de lecture
+FEUILLES = {"presentation", "agent", "domain", "variable", "relation", "predicate", "function", "constraint"}
+
+def iterer_elements(chemin: str) -> Iterator[Tuple[str, dict, str]]:
+    """
+    (balise, attributs, texte) de chaque élément feuille, dans l'ordre du fichier (.xml ou .xml.gz).
+    Chaque feuille est détachée de son parent après lecture : la mémoire ne dépend pas de la taille du fichier.
+    """
+    ouvrir = gzip.open if chemin.endswith(".gz") else open
+    with ouvrir(chemin, "rb") as flux:
+        parents = []
+        for evenement, element in ET.iterparse(flux, events=("start", "end")):
+            if evenement == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            if element.tag in FEUILLES:
+                yield element.tag, element.attrib, element.text or ""
+                if parents:
+                    parents[-1].remove(element)
+
+def _tuples(corps: str) -> List[Tuple[str, List[str]]]:
+    """Corps de relation soft « c: v1 v2 | v3 v4 | c2: ... » -> [(coût, valeurs)] ; un coût vaut pour les tuples suivants."""
+    resultat, cout = [], None
+    for morceau in corps.split("|"):
+        morceau = morceau.strip()
+        if not morceau:
+            continue
+        if ":" in morceau:
+            cout, _, morceau = morceau.partition(":")
+            cout = cout.strip()
+        resultat.append((cout, morceau.split()))
+    return resultat
+
+def _sans_gz(chemin: str) -> str:
+    return chemin[:-3] if chemin.endswith(".gz") else chemin
+
+def lire_xcsp(chemin: str, reconstruire: bool = False) -> dict:
+    """
+    Une passe sur le fichier. Retourne {"xml_file", "instance_name", "modelisation", <COLONNES_STRUCTURE>}
+    et, si reconstruire, "instance" : le JSON d'instance (voitures, passagers, capacités, coûts)
+    retrouvé depuis M1 ou M2 (None pour un autre XCSP ; ValueError si des noms x_ij se répètent en M1).
+    Sans reconstruction, seuls des compteurs sont conservés (mémoire constante) ; avec, la mémoire
+    est celle de l'instance (|V|·|P| coûts), les contraintes n'étant jamais gardées.
+    """
+    nb = Counter()
+    arites = Counter()
+    domaines: Dict[str, int] = {}
+    nom, arite_presentation = None, None
+    # Reconstruction seulement : agents, variables x (M1) et compteurs s, relations utiles, coûts, capacités
+    agents: List[str] = []
+    index_x: Dict[str, Tuple[str, int]] = {}            # x_ij -> (agent, j) : rang de x parmi les variables de l'agent
+    nb_x_par_agent: Counter = Counter()
+    compteurs: Dict[str, Tuple[str, str]] = {}          # s -> (agent, domaine cpt{K})
+    relations: Dict[str, Tuple[int, str]] = {}          # nom -> (arité, corps), relations à defaultCost 0
+    passagers_m1: List[str] = []
+    passager_x: Dict[str, int] = {}                     # M1 : x_ij -> j, rang du « tout-zéro » qui le contient
+    couts: Dict[str, Dict[int, int]] = {}               # M1 : agent -> {x_ij: coût} ; M2 : y_j -> {valeur: coût}
+    capacites: Dict[str, int] = {}                      # agent, ou "#<valeur>" (M2, sous-ensembles)
+
+    for balise, attributs, texte in iterer_elements(chemin):
+        if balise == "constraint":
+            nb["contraintes"] += 1
+            nom_c = attributs.get("name", "")
+            arite = attributs.get("arity")
+            arites[int(arite) if arite is not None else len(attributs.get("scope", "").split())] += 1
+            if nom_c.startswith("pas_de_tout_zero_"):
+                nb["tout_zero"] += 1
+                if reconstruire:
+                    passagers_m1.append(nom_c[len("pas_de_tout_zero_"):])
+                    # Voitures candidates du passager (toutes sans élagage)
+                    passager_x.update(dict.fromkeys(attributs.get("scope", "").split(), nb["tout_zero"]))
+            portee = attributs.get("scope", "").split() if reconstruire else None
+            if not portee:
+                continue
+            reference = attributs.get("reference")
+            if nom_c.startswith("cout_") and portee[0] in index_x:
+                # M1 : relation « c: 1 » sur x_ij (passager j connu au « tout-zéro », plus loin)
+                agent, _ = index_x[portee[0]]
+                couts.setdefault(agent, {})[portee[0]] = int(float(_tuples(relations[reference][1])[0][0]))
+            elif nom_c.startswith("c_") and reference in relations:
+                # M2 : relation « c1: 1 | c2: 2 | ... » sur y_j (valeur = rang de la voiture)
+                couts[portee[0]] = {int(valeurs[0]): int(float(c)) for c, valeurs in _tuples(relations[reference][1])}
+            elif nom_c.startswith("cap_") and reference in relations:
+                # Sous-ensembles K+1 interdits : voiture = agent de x (M1) ou valeur interdite (M2)
+                arite, corps = relations[reference]
+                if portee[0] in index_x:
+                    capacites[index_x[portee[0]][0]] = arite - 1
+                else:
+                    capacites[f"#{_tuples(corps)[0][1][0]}"] = arite - 1
+            elif nom_c.startswith("cpt_"):
+                # Compteur séquentiel : K lu dans le domaine cpt{K} de la variable s de la voiture
+                for var in portee:
+                    if var in compteurs:
+                        agent, domaine = compteurs[var]
+                        capacites[agent] = int(domaine[3:])
+                        break
+        elif balise == "variable":
+            nb["variables"] += 1
+            domaine = attributs.get("domain", "")
+            # y_j : domaine "cars", ou cars_<k> (voitures candidates d'une instance élaguée)
+            nb["variables_cars" if domaine.startswith("cars") else f"variables_{domaine}"] += domaine.startswith(("bin", "cars"))
+            if reconstruire:
+                agent = attributs.get("agent", "")
+                if domaine == "bin":
+                    if attributs["name"] in index_x:
+                        # x{i}{j} sans séparateur : x111 = (1, 11) et (11, 1) dès 10 voitures et 10 passagers
+                        raise ValueError(f"{chemin} : variable {attributs['name']} déclarée deux fois, instance non reconstructible")
+                    nb_x_par_agent[agent] += 1
+                    index_x[attributs["name"]] = (agent, nb_x_par_agent[agent])
+                elif domaine.startswith("cpt"):
+                    compteurs[attributs["name"]] = (agent, domaine)
+        elif balise == "relation":
+            nb["relations"] += 1
+            nb["soft" if attributs.get("semantics") == "soft" else "autres"] += 1
+            if reconstruire and attributs.get("defaultCost", "0") == "0":
+                relations[attributs["name"]] = (int(attributs.get("arity", 0)), texte)
+        elif balise in ("predicate", "function"):
+            nb["relations"] += 1
+            nb["autres"] += 1
+        elif balise == "agent":
+            nb["agents"] += 1
+            if reconstruire:
+                agents.append(attributs["name"])
+        elif balise == "domain":
+            domaines[attributs["name"]] = int(attributs.get("nbValues", len(texte.split())))
+        elif balise == "presentation":
+            nom = attributs.get("name")
+            arite_presentation = attributs.get("maxConstraintArity")
+
+    # M1 : un « tout-zéro » par passager (à défaut, variables binaires / agents) ; M2 : variables y_j
+    if any(d == "cars" or d.startswith("cars_") for d in domaines):
+        modelisation, nb_passagers = 2, nb["variables_cars"]
+    elif "bin" in domaines:
+        modelisation = 1
+        nb_passagers = nb["tout_zero"] or (nb["variables_bin"] // nb["agents"] if nb["agents"] else 0)
+    else:
+        modelisation, nb_passagers = None, 0
+    resultat = {
+        "xml_file": os.path.basename(_sans_gz(chemin)),
+        "instance_name": nom_instance_depuis_xml(_sans_gz(chemin)),
+        "modelisation": modelisation,
+        "nb_agents": nb["agents"],
+        "nb_variables": nb["variables"],
+        "nb_constraints": nb["contraintes"],
+        "nb_relations": nb["relations"],
+        # maxConstraintArity déclaré (colonne des CSV de bench), à défaut arité max des contraintes
+        "max_arity": int(arite_presentation) if arite_presentation else max(arites, default=0),
+        "domain_names": ";".join(domaines),
+        "domain_sizes": ";".join(str(t) for t in domaines.values()),
+        "arity_histogram": ";".join(f"{a}:{n}" for a, n in sorted(arites.items())),
+        "nb_soft_relations": nb["soft"],
+        "nb_other_relations": nb["autres"],
+        "passengers_guess": nb_passagers,
+    }
+    if reconstruire:
+        if modelisation == 1:
+            # Passager de chaque x_ij : son « tout-zéro », à défaut son rang parmi les variables de l'agent
+            couts = {agent: {passager_x.get(x, index_x[x][1]): c for x, c in par_x.items()}
+                     for agent, par_x in couts.items()}
+        resultat["instance"] = (None if modelisation is None else
+                                _instance(nom, modelisation, agents, passagers_m1, nb_passagers, couts, capacites))
+    return resultat
+
+def _instance(nom, modelisation, agents, passagers_m1, nb_passagers, couts, capacites) -> dict:
+    """
+    JSON d'instance (format de construire_json_a_partir_positions, sans positions). M2 ne conserve
+    pas les identifiants des passagers : p1..pP. Une voiture sans contrainte de capacité (K >= P
+    à la génération) reçoit la capacité P, équivalente. Des couples sans coût (instance élaguée)
+    sont omis de "couts" et la clé "elagage" est ajoutée.
+    """
+    if modelisation == 1:
+        passagers = passagers_m1 if len(passagers_m1) == nb_passagers else [f"p{j}" for j in range(1, nb_passagers + 1)]
+        table = {v: {p: couts[v][j] for j, p in enumerate(passagers, start=1) if j in couts.get(v, {})} for v in agents}
+    else:
+        passagers = [f"p{j}" for j in range(1, nb_passagers + 1)]
+        table = {v: {p: couts[f"y{j}"][i] for j, p in enumerate(passagers, start=1) if i in couts[f"y{j}"]}
+                 for i, v in enumerate(agents, start=1)}
+        capacites = {(agents[int(cle[1:]) - 1] if cle.startswith("#") else cle): K for cle, K in capacites.items()}
+    instance = {
+        "nom": nom,
+        "voitures": [{"id": v, "capacite": capacites.get(v, nb_passagers)} for v in agents],
+        "passagers": passagers,
+        "couts": table,
+    }
+    if sum(map(len, table.values())) < len(agents) * nb_passagers:
+        instance["elagage"] = {}
+    return instance
+
+def lister_xml(chemins: Iterable[str]) -> List[str]:
+    """Fichiers .xml / .xml.gz donnés, ou contenus (sans récursion) dans les dossiers donnés."""
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            fichiers.extend(sorted(os.path.join(chemin, f) for f in os.listdir(chemin) if f.endswith((".xml", ".xml.gz"))))
+        else:
+            fichiers.append(chemin)
+    return fichiers
+
+def _traiter(chemin: str, dossier_json: Optional[str] = None) -> dict:
+    """
+    lire_xcsp dans un processus du pool ; le JSON reconstruit est écrit sur place (<instance_name>_M<m>.json).
+    Un fichier non reconstructible donne quand même ses statistiques.
+    """
+    try:
+        resultat = lire_xcsp(chemin, reconstruire=dossier_json is not None)
+    except ValueError as e:
+        print(f"[WARN] {e}")
+        resultat = lire_xcsp(chemin)
+    instance = resultat.pop("instance", None)
+    if instance is not None:
+        chemin_json = os.path.join(dossier_json, f"{resultat['instance_name']}_M{resultat['modelisation']}.json")
+        with open(chemin_json, "w", encoding="utf-8") as f:
+            json.dump(instance, f, ensure_ascii=False)
+    return resultat
+
+def analyser_fichiers(chemins: List[str], nb_processus: Optional[int] = None, dossier_json: Optional[str] = None) -> List[dict]:
+    """lire_xcsp sur chaque fichier dans un pool de processus (un fichier par tâche), dans l'ordre de `chemins`."""
+    if dossier_json is not None:
+        os.makedirs(dossier_json, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+        return list(pool.map(_traiter, chemins, [dossier_json] * len(chemins)))
+
+def completer_csv(chemin_csv: str, statistiques: List[dict]) -> Tuple[int, int]:
+    """
+    Met à jour les COLONNES_STRUCTURE d'un CSV de bench (lignes appariées sur xml_file) à partir des
+    statistiques lues. Retourne (complétées, total).
+    """
+    par_fichier = {s["xml_file"]: s for s in statistiques}
+    with open(chemin_csv, newline="", encoding="utf-8") as f:
+        lecteur = csv.DictReader(f)
+        colonnes = list(lecteur.fieldnames or [])
+        lignes = list(lecteur)
+    colonnes += [c for c in COLONNES_STRUCTURE if c not in colonnes]
+    completees = 0
+    for ligne in lignes:
+        stats = par_fichier.get(os.path.basename(ligne.get("xml_file", "")))
+        if stats is not None:
+            ligne.update({c: stats[c] for c in COLONNES_STRUCTURE})
+            completees += 1
+    temporaire = f"{chemin_csv}.tmp{os.getpid()}"
+    with open(temporaire, "w", newline="", encoding="utf-8") as f:
+        ecrivain = csv.DictWriter(f, fieldnames=colonnes, restval="")
+        ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+    os.replace(temporaire, chemin_csv)
+    return completees, len(lignes)
+
+def main():
+    ap = argparse.ArgumentParser(description="Statistiques structurelles (et JSON d'instance) de fichiers XCSP, lus en flux.")
+    ap.add_argument("chemins", nargs="+", help="Fichiers .xml / .xml.gz ou dossiers")
+    ap.add_argument("--sortie", default=None, help="CSV des statistiques (une ligne par fichier)")
+    ap.add_argument("--json", default=None, help="Dossier où écrire le JSON d'instance reconstruit de chaque fichier")
+    ap.add_argument("--bench", nargs="+", default=None, help="CSV de bench dont compléter les colonnes structurelles")
+    ap.add_argument("--jobs", type=int, default=None, help="Nombre de processus (défaut : nb de CPU)")
+    args = ap.parse_args()
+
+    fichiers = lister_xml(args.chemins)
+    statistiques = analyser_fichiers(fichiers, args.jobs, args.json)
+    colonnes = ["xml_file", "instance_name", "modelisation"] + COLONNES_STRUCTURE
+    if args.sortie:
+        with open(args.sortie, "w", newline="", encoding="utf-8") as f:
+            ecrivain = csv.DictWriter(f, fieldnames=colonnes)
+            ecrivain.writeheader()
+            ecrivain.writerows(statistiques)
+        print(f"[OK] {len(statistiques)} fichier(s) -> {args.sortie}")
+    elif not args.bench:
+        for s in statistiques:
+            print(f"{s['xml_file']} (M{s['modelisation']}) : {s['nb_agents']} agents, {s['nb_variables']} variables, "
+                  f"{s['nb_constraints']} contraintes, {s['nb_relations']} relations, arités {s['arity_histogram']}")
+    if args.json:
+        print(f"[OK] JSON reconstruits dans {args.json}")
+    for chemin in args.bench or []:
+        completees, total = completer_csv(chemin, statistiques)
+        print(f"[OK] {chemin} : {completees}/{total} ligne(s) complétée(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# magasin_resultats.py — Magasin Parquet des résultats de bench, partitionné par modélisation
+# et algorithme (results/magasin/modelisation=<m>/algorithm=<algo>/part-*.parquet).
+import argparse
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from simulateur_dcop import COLONNES_BENCH
+
+# Colonnes de partition (répertoires hive, absentes des fichiers)
+PARTITIONNEMENT = ds.partitioning(pa.schema([("modelisation", pa.int8()), ("algorithm", pa.string())]), flavor="hive")
+
+# Types des colonnes de COLONNES_BENCH ; max_util_size peut dépasser 2^63 -> float64
+TYPES_COLONNES = {
+    "xml_file": pa.string(),
+    "total_cost": pa.float64(),
+    "runtime_ms": pa.float64(),
+    "ncccs": pa.int64(),
+    "msgs_total": pa.int64(),
+    "instance_name": pa.string(),
+    "nb_agents": pa.int32(),
+    "nb_variables": pa.int32(),
+    "nb_constraints": pa.int64(),
+    "nb_relations": pa.int64(),
+    "max_arity": pa.int32(),
+    "domain_names": pa.string(),
+    "domain_sizes": pa.string(),
+    "arity_histogram": pa.string(),
+    "nb_soft_relations": pa.int64(),
+    "nb_other_relations": pa.int64(),
+    "passengers_guess": pa.int32(),
+    "induced_width": pa.int32(),
+    "max_util_size": pa.float64(),
+    "pseudo_tree_depth": pa.int32(),
+}
+
+SCHEMA_FICHIER = pa.schema([(c, TYPES_COLONNES[c]) for c in COLONNES_BENCH if c != "algorithm"])
+SCHEMA_MAGASIN = pa.schema(list(SCHEMA_FICHIER) + list(PARTITIONNEMENT.schema))
+
+# Métriques lues par les analyses (compare_benches, onglets de l'app)
+COLONNES_ANALYSE = ["xml_file", "algorithm", "total_cost", "runtime_ms", "ncccs", "msgs_total", "instance_name"]
+
+def _table(df: pd.DataFrame) -> pa.Table:
+    """DataFrame (valeurs vides ou textuelles comprises) -> table au SCHEMA_FICHIER, colonnes manquantes à null."""
+    colonnes = {}
+    for champ in SCHEMA_FICHIER:
+        serie = df[champ.name] if champ.name in df.columns else pd.Series([None] * len(df), dtype=object)
+        if pa.types.is_string(champ.type):
+            serie = serie.astype("string").replace("", pd.NA)
+        else:
+            serie = pd.to_numeric(serie, errors="coerce")
+            if pa.types.is_integer(champ.type):
+                serie = serie.round().astype("Int64")
+        colonnes[champ.name] = pa.array(serie, type=champ.type, from_pandas=True)
+    return pa.table(colonnes, schema=SCHEMA_FICHIER)
+
+def ajouter_dataframe(racine: str, df: pd.DataFrame, modelisation: int) -> List[str]:
+    """
+    Ajout (jamais de réécriture) : un nouveau fichier par algorithme présent dans `df`, écrit
+    sous un nom temporaire ignoré à la lecture (préfixe « . ») puis renommé. Retourne les fichiers créés.
+    """
+    crees = []
+    for algo, lignes in df.groupby(df["algorithm"].astype(str), sort=True):
+        dossier = os.path.join(racine, f"modelisation={int(modelisation)}", f"algorithm={algo}")
+        os.makedirs(dossier, exist_ok=True)
+        nom = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+        temporaire = os.path.join(dossier, f".{nom}.tmp")
+        pq.write_table(_table(lignes), temporaire, compression="zstd")
+        os.replace(temporaire, os.path.join(dossier, nom))
+        crees.append(os.path.join(dossier, nom))
+    return crees
+
+def ajouter_lignes(racine: str, lignes: List[dict], modelisation: int) -> List[str]:
+    """ajouter_dataframe pour des lignes au format de simulateur_dcop.ligne_bench_instance."""
+    if not lignes:
+        return []
+    return ajouter_dataframe(racine, pd.DataFrame(lignes), modelisation)
+
+def jeu_de_donnees(racine: str) -> ds.Dataset:
+    return ds.dataset(racine, format="parquet", partitioning=PARTITIONNEMENT, schema=SCHEMA_MAGASIN)
+
+def lire(
+    racine: str,
+    colonnes: Optional[Iterable[str]] = None,
+    modelisations: Optional[Iterable[int]] = None,
+    algorithmes: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """
+    Lit seulement les colonnes demandées (défaut : toutes) des partitions demandées (défaut :
+    toutes) ; les partitions écartées ne sont pas ouvertes. algorithm est catégorielle.
+    """
+    if not os.path.isdir(racine):
+        return pd.DataFrame(columns=list(colonnes) if colonnes is not None else SCHEMA_MAGASIN.names)
+    filtre = None
+    if modelisations is not None:
+        filtre = ds.field("modelisation").isin([int(m) for m in modelisations])
+    if algorithmes is not None:
+        condition = ds.field("algorithm").isin([str(a) for a in algorithmes])
+        filtre = condition if filtre is None else filtre & condition
+    colonnes = None if colonnes is None else [c for c in colonnes if c in SCHEMA_MAGASIN.names]
+    df = jeu_de_donnees(racine).to_table(columns=colonnes, filter=filtre).to_pandas()
+    if "algorithm" in df.columns:
+        df["algorithm"] = df["algorithm"].astype("category")
+    return df
+
+def partitions(racine: str) -> Dict[int, List[str]]:
+    """{modélisation: [algorithmes]} d'après les seuls répertoires, sans lire de fichier."""
+    resultat: Dict[int, List[str]] = {}
+    if not os.path.isdir(racine):
+        return resultat
+    for dossier_m in sorted(os.listdir(racine)):
+        if dossier_m.startswith("modelisation="):
+            m = int(dossier_m.split("=", 1)[1])
+            resultat[m] = sorted(d.split("=", 1)[1] for d in os.listdir(os.path.join(racine, dossier_m))
+                                 if d.startswith("algorithm="))
+    return resultat
+
+def signature(racine: str) -> Tuple[int, int, int]:
+    """(nb de fichiers, taille totale, mtime max) : change à chaque ajout, sans rien lire."""
+    nb, taille, mtime = 0, 0, 0
+    for dossier, _, fichiers in os.walk(racine):
+        for nom in fichiers:
+            if nom.endswith(".parquet") and not nom.startswith("."):
+                infos = os.stat(os.path.join(dossier, nom))
+                nb, taille, mtime = nb + 1, taille + infos.st_size, max(mtime, infos.st_mtime_ns)
+    return nb, taille, mtime
+
+def paires_terminees(racine: str, modelisation: int) -> Set[Tuple[str, str]]:
+    """Couples (xml_file, algorithm) déjà stockés pour une modélisation (reprise du balayage)."""
+    df = lire(racine, ["xml_file", "algorithm"], modelisations=[modelisation])
+    return set(zip(df["xml_file"].astype(str), df["algorithm"].astype(str)))
+
+def compacter(racine: str) -> int:
+    """Fusionne les fichiers de chaque partition en un seul (après un balayage). Retourne le nb de fichiers supprimés."""
+    supprimes = 0
+    for m, algos in partitions(racine).items():
+        for algo in algos:
+            dossier = os.path.join(racine, f"modelisation={m}", f"algorithm={algo}")
+            fichiers = sorted(os.path.join(dossier, f) for f in os.listdir(dossier)
+                              if f.endswith(".parquet") and not f.startswith("."))
+            if len(fichiers) < 2:
+                continue
+            table = ds.dataset(fichiers, format="parquet", schema=SCHEMA_FICHIER).to_table()
+            nom = f"part-{time.time_ns()}-{os.getpid()}.parquet"
+            temporaire = os.path.join(dossier, f".{nom}.tmp")
+            pq.write_table(table, temporaire, compression="zstd")
+            os.replace(temporaire, os.path.join(dossier, nom))
+            for chemin in fichiers:
+                os.remove(chemin)
+            supprimes += len(fichiers)
+    return supprimes
+
+def importer_csv(chemin_csv: str, racine: str, modelisation: int, taille_bloc: int = 500_000) -> int:
+    """Ingère un CSV de bench existant (`,` ou `;`) par blocs de `taille_bloc` lignes. Retourne le nb de lignes."""
+    with open(chemin_csv, encoding="utf-8", errors="replace") as f:
+        premiere = f.readline()
+    sep = ";" if ";" in premiere and "," not in premiere else ","
+    total = 0
+    for bloc in pd.read_csv(chemin_csv, sep=sep, dtype=str, keep_default_na=False, chunksize=taille_bloc):
+        bloc = bloc[bloc["algorithm"] != ""]
+        ajouter_dataframe(racine, bloc, modelisation)
+        total += len(bloc)
+    return total
+
+def main():
+    ap = argparse.ArgumentParser(description="Magasin Parquet des résultats : import de CSV de bench, compactage, résumé.")
+    sous = ap.add_subparsers(dest="commande", required=True)
+    imp = sous.add_parser("importer", help="Ajoute des CSV de bench au magasin")
+    imp.add_argument("csv", nargs="+")
+    imp.add_argument("--modelisation", type=int, choices=[1, 2], default=None,
+                     help="Modélisation des CSV (défaut : 2 pour bench2*.csv, 1 sinon)")
+    comp = sous.add_parser("compacter", help="Un fichier par partition")
+    res = sous.add_parser("resume", help="Nombre de lignes par partition")
+    for p in (imp, comp, res):
+        p.add_argument("--magasin", default="results/magasin")
+    args = ap.parse_args()
+
+    if args.commande == "importer":
+        for chemin in args.csv:
+            m = args.modelisation or (2 if os.path.basename(chemin).startswith("bench2") else 1)
+            print(f"[OK] {chemin} -> M{m} : {importer_csv(chemin, args.magasin, m)} ligne(s)")
+    elif args.commande == "compacter":
+        print(f"[OK] {compacter(args.magasin)} fichier(s) fusionné(s)")
+    else:
+        df = lire(args.magasin, ["modelisation", "algorithm"])
+        print(df.groupby(["modelisation", "algorithm"], observed=True).size().to_string())
+
+if __name__ == "__main__":
+    main()
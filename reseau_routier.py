@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# reseau_routier.py — Distances sur un réseau routier local (liste d'arêtes ou CSV issu d'OSM) : positions
+# accrochées aux nœuds, plus courts chemins (un arbre de Dijkstra par nœud distinct), matrices en cache disque.
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Noms de colonnes reconnus (insensibles à la casse) dans les fichiers d'arêtes et de nœuds à en-tête
+COLONNES_ORIGINE = ("u", "source", "from", "depart", "origine")
+COLONNES_CIBLE = ("v", "target", "to", "arrivee", "cible")
+COLONNES_LONGUEUR = ("length", "longueur", "poids", "weight", "cost", "cout")
+COLONNES_ID = ("osmid", "id", "node", "noeud")
+COLONNES_X = ("x", "lon", "longitude")
+COLONNES_Y = ("y", "lat", "latitude")
+
+def _lire_table(chemin: str) -> Tuple[Optional[List[str]], List[List[str]]]:
+    """
+    (en-tête ou None, lignes) d'un fichier texte : séparateur `,`, `;`, tabulation ou espaces, lignes
+    vides et commentaires `#` ignorés. En-tête détecté s'il contient un nom de colonne reconnu.
+    """
+    with open(chemin, newline="", encoding="utf-8") as f:
+        lignes = [ligne for ligne in f.read().splitlines() if ligne.strip() and not ligne.lstrip().startswith("#")]
+    if not lignes:
+        return None, []
+    separateur = next((s for s in (",", ";", "\t") if s in lignes[0]), None)
+    if separateur is None:
+        table = [ligne.split() for ligne in lignes]
+    else:
+        table = [[champ.strip() for champ in ligne] for ligne in csv.reader(lignes, delimiter=separateur)]
+    entete = [nom.strip().lower() for nom in table[0]]
+    if set(entete) & set(COLONNES_ORIGINE + COLONNES_CIBLE + COLONNES_ID + COLONNES_X + COLONNES_Y):
+        return entete, table[1:]
+    return None, table
+
+def _colonne(entete: List[str], noms: Sequence[str], chemin: str, requise: bool = True) -> Optional[int]:
+    for nom in noms:
+        if nom in entete:
+            return entete.index(nom)
+    if requise:
+        raise ValueError(f"{chemin} : aucune des colonnes {list(noms)} dans l'en-tête {entete}")
+    return None
+
+class ReseauRoutier:
+    """
+    Graphe routier en tableaux CSR (arcs sortants de chaque nœud, longueurs float64) avec les
+    coordonnées des nœuds, dans le même repère que les positions des instances (coordonnées projetées
+    de préférence : l'accrochage et les longueurs manquantes sont euclidiens).
+    distance(a, b) = accès (a → nœud le plus proche) + plus court chemin entre nœuds + accès (nœud → b).
+    Les positions ne s'accrochent qu'à la plus grande composante fortement connexe : toute paire est reliée.
+    Avec `cache`, les matrices nœuds × nœuds calculées sont conservées sur disque (.npy), sous une clé
+    qui porte sur le contenu du graphe : un balayage relancé sur la même ville ne refait aucun Dijkstra.
+    """
+
+    def __init__(self, ids: Sequence[str], coords: np.ndarray, origines: np.ndarray, cibles: np.ndarray,
+                 longueurs: np.ndarray, source: str = "", cache: Optional[str] = None):
+        self.ids = [str(i) for i in ids]
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.source = source
+        self.cache = cache
+        self.stats = {"succes": 0, "echecs": 0, "arbres": 0}
+        origines = np.asarray(origines, dtype=np.int64)
+        cibles = np.asarray(cibles, dtype=np.int64)
+        longueurs = np.asarray(longueurs, dtype=float)
+        if (longueurs < 0).any():
+            raise ValueError("Longueurs d'arcs négatives : Dijkstra impossible")
+        self._sortants = self._csr(origines, cibles, longueurs)
+        self._entrants = self._csr(cibles, origines, longueurs)
+        self.nb_arcs = len(origines)
+        empreinte = hashlib.sha256()
+        for tableau in (self.coords, origines, cibles, longueurs):
+            empreinte.update(np.ascontiguousarray(tableau).tobytes())
+        self.empreinte = empreinte.hexdigest()
+        self._accrochables = np.flatnonzero(self._plus_grande_composante())
+        self._grille = None
+
+    def __repr__(self) -> str:
+        return f"ReseauRoutier(source={self.source!r}, noeuds={len(self.ids)}, arcs={self.nb_arcs})"
+
+    def _csr(self, origines: np.ndarray, cibles: np.ndarray, longueurs: np.ndarray) -> tuple:
+        """(débuts, voisins, longueurs) en listes Python : accès indexés rapides dans la boucle de Dijkstra."""
+        ordre = np.argsort(origines, kind="stable")
+        debuts = np.concatenate([[0], np.cumsum(np.bincount(origines, minlength=len(self.ids)))])
+        return debuts.tolist(), cibles[ordre].tolist(), longueurs[ordre].tolist()
+
+    def _plus_grande_composante(self) -> np.ndarray:
+        """
+        Masque des nœuds de la plus grande composante fortement connexe (Kosaraju itératif sur les CSR) :
+        deux nœuds accrochables sont toujours reliés dans les deux sens, graphe orienté compris.
+        """
+        nb_noeuds = len(self.ids)
+        debuts, voisins, _ = self._sortants
+        vus, ordre = [False] * nb_noeuds, []
+        for depart in range(nb_noeuds):
+            if vus[depart]:
+                continue
+            vus[depart] = True
+            pile = [(depart, debuts[depart])]
+            while pile:
+                u, k = pile[-1]
+                if k < debuts[u + 1]:
+                    pile[-1] = (u, k + 1)
+                    if not vus[voisins[k]]:
+                        vus[voisins[k]] = True
+                        pile.append((voisins[k], debuts[voisins[k]]))
+                else:
+                    pile.pop()
+                    ordre.append(u)                         # ordre de fin de visite
+        debuts, voisins, _ = self._entrants
+        composantes, nb_composantes = [-1] * nb_noeuds, 0
+        for depart in reversed(ordre):
+            if composantes[depart] >= 0:
+                continue
+            composantes[depart] = nb_composantes
+            pile = [depart]
+            while pile:
+                u = pile.pop()
+                for k in range(debuts[u], debuts[u + 1]):
+                    if composantes[voisins[k]] < 0:
+                        composantes[voisins[k]] = nb_composantes
+                        pile.append(voisins[k])
+            nb_composantes += 1
+        composantes = np.array(composantes, dtype=np.int64)
+        return composantes == np.bincount(composantes).argmax() if nb_noeuds else np.zeros(0, dtype=bool)
+
+    # --- Chargement --------------------------------------------------------
+
+    @classmethod
+    def depuis_fichiers(cls, aretes: str, noeuds: Optional[str] = None, oriente: bool = False,
+                        cache: Optional[str] = None) -> "ReseauRoutier":
+        """
+        `aretes` : une arête par ligne, `u v [longueur]` sans en-tête, ou CSV à en-tête (export OSM, ex.
+        osmnx : colonnes u, v, length ; coordonnées x_u, y_u, x_v, y_v facultatives). `noeuds` : `id x y`
+        ou CSV (osmid, x, y), requis si les arêtes ne portent pas les coordonnées. Longueur absente :
+        distance euclidienne entre les extrémités. Sans `oriente`, chaque arête est parcourable dans les
+        deux sens ; avec, seulement de u vers v (un export OSM liste déjà les deux sens des rues à double sens).
+        """
+        rang: Dict[str, int] = {}
+        coords: List[Tuple[float, float]] = []
+
+        def noeud(ident: str, x: float = math.nan, y: float = math.nan) -> int:
+            if ident not in rang:
+                rang[ident] = len(coords)
+                coords.append((x, y))
+            elif math.isnan(coords[rang[ident]][0]) and not math.isnan(x):
+                coords[rang[ident]] = (x, y)
+            return rang[ident]
+
+        if noeuds is not None:
+            entete, table = _lire_table(noeuds)
+            i_id, i_x, i_y = ((0, 1, 2) if entete is None else
+                              (_colonne(entete, COLONNES_ID, noeuds), _colonne(entete, COLONNES_X, noeuds),
+                               _colonne(entete, COLONNES_Y, noeuds)))
+            for ligne in table:
+                noeud(ligne[i_id], float(ligne[i_x]), float(ligne[i_y]))
+
+        entete, table = _lire_table(aretes)
+        if entete is None:
+            i_u, i_v, i_l = 0, 1, (2 if table and len(table[0]) > 2 else None)
+            i_coords = None
+        else:
+            i_u, i_v = _colonne(entete, COLONNES_ORIGINE, aretes), _colonne(entete, COLONNES_CIBLE, aretes)
+            i_l = _colonne(entete, COLONNES_LONGUEUR, aretes, requise=False)
+            noms_coords = ("x_u", "y_u", "x_v", "y_v")
+            i_coords = [entete.index(nom) for nom in noms_coords] if all(n in entete for n in noms_coords) else None
+        origines, cibles, longueurs = [], [], []
+        for ligne in table:
+            if i_coords is not None:
+                x_u, y_u, x_v, y_v = (float(ligne[i]) for i in i_coords)
+                u, v = noeud(ligne[i_u], x_u, y_u), noeud(ligne[i_v], x_v, y_v)
+            else:
+                u, v = noeud(ligne[i_u]), noeud(ligne[i_v])
+            origines.append(u)
+            cibles.append(v)
+            longueurs.append(float(ligne[i_l]) if i_l is not None and ligne[i_l] != "" else math.nan)
+
+        coords = np.array(coords, dtype=float).reshape(-1, 2)
+        if np.isnan(coords).any():
+            manquant = next(ident for ident, n in rang.items() if np.isnan(coords[n]).any())
+            raise ValueError(f"Coordonnées inconnues pour le nœud {manquant} : fournir le fichier de nœuds")
+        origines, cibles = np.array(origines, dtype=np.int64), np.array(cibles, dtype=np.int64)
+        longueurs = np.array(longueurs, dtype=float)
+        manquantes = np.isnan(longueurs)
+        longueurs[manquantes] = np.hypot(*(coords[origines[manquantes]] - coords[cibles[manquantes]]).T)
+        if not oriente:
+            origines, cibles = np.concatenate([origines, cibles]), np.concatenate([cibles, origines])
+            longueurs = np.concatenate([longueurs, longueurs])
+        return cls(list(rang), coords, origines, cibles, longueurs, source=os.path.basename(aretes), cache=cache)
+
+    def description(self) -> dict:
+        """Clé "reseau" du JSON d'instance (et clé de cache des instances) : fichier, tailles, empreinte."""
+        return {"source": self.source, "noeuds": len(self.ids), "arcs": self.nb_arcs, "empreinte": self.empreinte}
+
+    def emprise(self) -> Tuple[float, float, float, float]:
+        """(x_min, y_min, x_max, y_max) des nœuds où les positions peuvent s'accrocher."""
+        coords = self.coords[self._accrochables]
+        (x0, y0), (x1, y1) = coords.min(axis=0), coords.max(axis=0)
+        return float(x0), float(y0), float(x1), float(y1)
+
+    # --- Accrochage --------------------------------------------------------
+
+    def accrocher(self, positions) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (nœud le plus proche, distance d'accès) de chaque position, parmi les nœuds de la plus grande
+        composante. Grille uniforme (environ 4 nœuds par case) parcourue par anneaux autour de la position.
+        """
+        pos = np.asarray(positions, dtype=float).reshape(-1, 2)
+        coords = self.coords[self._accrochables]
+        if self._grille is None:
+            origine = coords.min(axis=0)
+            n = max(1, int(math.sqrt(len(coords) / 4)))
+            cote = (float(np.ptp(coords, axis=0).max()) or 1.0) / n    # un seul nœud : étendue nulle
+            cases = np.clip(np.floor((coords - origine) / cote).astype(np.int64), 0, n - 1)
+            ordre = np.lexsort((cases[:, 1], cases[:, 0]))
+            cles, debuts = np.unique(cases[ordre], axis=0, return_index=True)
+            index = {(cx, cy): ordre[debut:fin] for (cx, cy), debut, fin
+                     in zip(cles.tolist(), debuts.tolist(), debuts[1:].tolist() + [len(coords)])}
+            self._grille = (origine, cote, n, index)
+        origine, cote, n, index = self._grille
+        noeuds = np.empty(len(pos), dtype=np.int64)
+        acces = np.empty(len(pos))
+        for k, ((px, py), (cx, cy)) in enumerate(zip(pos.tolist(), np.floor((pos - origine) / cote).astype(np.int64).tolist())):
+            r = max(0, -cx, cx - (n - 1), -cy, cy - (n - 1))
+            meilleur, d_min = -1, math.inf
+            # Après les anneaux 0..r-1, tout nœud non vu est à plus de (r - 1) * cote de la position
+            while d_min > (r - 1) * cote and r <= 2 * n + abs(cx) + abs(cy):
+                cases = ([(cx, cy)] if r == 0 else
+                         [(x, y) for x in range(cx - r, cx + r + 1) for y in (cy - r, cy + r)] +
+                         [(x, y) for x in (cx - r, cx + r) for y in range(cy - r + 1, cy + r)])
+                for case in cases:
+                    ids = index.get(case)
+                    if ids is None:
+                        continue
+                    d = np.hypot(coords[ids, 0] - px, coords[ids, 1] - py)
+                    m = int(d.argmin())
+                    if d[m] < d_min or (d[m] == d_min and ids[m] < meilleur):
+                        meilleur, d_min = int(ids[m]), float(d[m])
+                r += 1
+            noeuds[k], acces[k] = self._accrochables[meilleur], d_min
+        return noeuds, acces
+
+    # --- Plus courts chemins -------------------------------------------
+
+    def _dijkstra(self, source: int, cibles: List[int], inverse: bool = False) -> List[float]:
+        """
+        Distances de `source` à chaque cible (vers `source` si inverse, sur les arcs entrants) ; arrêt
+        dès que toutes les cibles sont fixées. inf pour une cible non atteignable.
+        """
+        debuts, voisins, longueurs = self._entrants if inverse else self._sortants
+        distances = [math.inf] * len(self.ids)
+        distances[source] = 0.0
+        restantes = set(cibles)
+        fixes = set()
+        tas = [(0.0, source)]
+        while tas and restantes:
+            d, u = heapq.heappop(tas)
+            if u in fixes:
+                continue
+            fixes.add(u)
+            restantes.discard(u)
+            for k in range(debuts[u], debuts[u + 1]):
+                w = voisins[k]
+                nd = d + longueurs[k]
+                if nd < distances[w]:
+                    distances[w] = nd
+                    heapq.heappush(tas, (nd, w))
+        self.stats["arbres"] += 1
+        return [distances[c] if c in fixes else math.inf for c in cibles]
+
+    def _chemin_cache(self, *parties) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cle = hashlib.sha256(self.empreinte.encode("ascii"))
+        for partie in parties:
+            cle.update(np.ascontiguousarray(partie).tobytes() if isinstance(partie, np.ndarray) else str(partie).encode("utf-8"))
+        cle = cle.hexdigest()
+        return os.path.join(self.cache, cle[:2], f"{cle}.npy")
+
+    def _charger_ou_calculer(self, chemin: Optional[str], calculer) -> np.ndarray:
+        """Matrice du cache disque si présente, sinon calculée puis écrite (fichier temporaire renommé)."""
+        if chemin is not None and os.path.exists(chemin):
+            self.stats["succes"] += 1
+            return np.load(chemin)
+        self.stats["echecs"] += 1
+        resultat = calculer()
+        if chemin is not None:
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            temporaire = f"{chemin}.tmp{os.getpid()}.npy"
+            np.save(temporaire, resultat)
+            os.replace(temporaire, chemin)
+        return resultat
+
+    def _matrice_noeuds(self, sources: np.ndarray, cibles: np.ndarray) -> np.ndarray:
+        """
+        Plus courts chemins |sources| x |cibles| entre nœuds distincts : un arbre par source, ou un arbre
+        inverse par cible s'il y en a moins.
+        """
+        def calculer():
+            if len(sources) <= len(cibles):
+                return np.array([self._dijkstra(s, cibles.tolist()) for s in sources.tolist()],
+                                dtype=float).reshape(len(sources), len(cibles))
+            return np.array([self._dijkstra(c, sources.tolist(), inverse=True) for c in cibles.tolist()],
+                            dtype=float).reshape(len(cibles), len(sources)).T
+
+        matrice = self._charger_ou_calculer(self._chemin_cache("matrice", f"{len(sources)}x{len(cibles)}", sources, cibles), calculer)
+        if np.isinf(matrice).any():
+            raise ValueError(f"{int(np.isinf(matrice).sum())} couple(s) de nœuds sans chemin "
+                             "(graphe orienté non fortement connexe)")
+        return matrice
+
+    def distances(self, origines, cibles) -> np.ndarray:
+        """Matrice |origines| x |cibles| des distances routières (accès compris), ex. voitures x passagers."""
+        noeuds_o, acces_o = self.accrocher(origines)
+        noeuds_c, acces_c = self.accrocher(cibles)
+        sources, rang_o = np.unique(noeuds_o, return_inverse=True)
+        arrivees, rang_c = np.unique(noeuds_c, return_inverse=True)
+        entre = self._matrice_noeuds(sources, arrivees)
+        return acces_o[:, None] + entre[rang_o][:, rang_c] + acces_c[None, :]
+
+    def distances_paires(self, origines, cibles) -> np.ndarray:
+        """
+        Distance routière de chaque origine à la cible de même rang (ex. passager → sa destination) :
+        arbres groupés par nœud d'origine distinct, ou par nœud cible distinct s'il y en a moins.
+        """
+        noeuds_o, acces_o = self.accrocher(origines)
+        noeuds_c, acces_c = self.accrocher(cibles)
+        paires, rang = np.unique(np.stack([noeuds_o, noeuds_c], axis=1).reshape(-1, 2), axis=0, return_inverse=True)
+
+        def calculer():
+            inverse = len(np.unique(paires[:, 1])) < len(np.unique(paires[:, 0]))
+            racines, autres = (paires[:, 1], paires[:, 0]) if inverse else (paires[:, 0], paires[:, 1])
+            resultat = np.empty(len(paires))
+            for racine in np.unique(racines).tolist():
+                groupe = np.flatnonzero(racines == racine)
+                resultat[groupe] = self._dijkstra(racine, autres[groupe].tolist(), inverse=inverse)
+            return resultat
+
+        entre = self._charger_ou_calculer(self._chemin_cache("paires", paires), calculer)
+        if np.isinf(entre).any():
+            raise ValueError(f"{int(np.isinf(entre).sum())} couple(s) de nœuds sans chemin "
+                             "(graphe orienté non fortement connexe)")
+        return acces_o + entre[np.asarray(rang).reshape(-1)] + acces_c
+
+# Réseaux déjà chargés dans ce processus (un par jeu d'arguments de charger_reseau)
+_RESEAUX: Dict[tuple, ReseauRoutier] = {}
+
+def charger_reseau(aretes: str, noeuds: Optional[str] = None, oriente: bool = False,
+                   cache: Optional[str] = None) -> ReseauRoutier:
+    """ReseauRoutier.depuis_fichiers mémorisé par processus (les jobs d'un pool ne relisent pas le graphe)."""
+    cle = (os.path.abspath(aretes), noeuds and os.path.abspath(noeuds), bool(oriente), cache)
+    if cle not in _RESEAUX:
+        reseau = ReseauRoutier.depuis_fichiers(aretes, noeuds, oriente, cache)
+        if 2 * len(reseau._accrochables) < len(reseau.ids):
+            print(f"[WARN] {reseau!r} : positions accrochées à {len(reseau._accrochables)} nœud(s) seulement "
+                  "(plus grande composante fortement connexe ; arcs orientés dans le bon sens ?)")
+        _RESEAUX[cle] = reseau
+    return _RESEAUX[cle]
+
+def options_reseau(args) -> dict:
+    """
+    Option « reseau » des générateurs (arguments de charger_reseau donnés par --reseau, --noeuds, --oriente,
+    --cache-distances) ; vide sans --reseau (clés de cache inchangées).
+    """
+    if not args.reseau:
+        return {}
+    return {"reseau": {"aretes": args.reseau, "noeuds": args.noeuds, "oriente": args.oriente,
+                       "cache": args.cache_distances}}
+
+def ajouter_arguments(ap: argparse.ArgumentParser) -> None:
+    """Options de réseau routier communes aux lignes de commande (generation_lot, lanceur_bench, ...)."""
+    ap.add_argument("--reseau", default=None,
+                    help="Arêtes du réseau routier (u v [longueur], ou CSV OSM u,v,length) : coûts en distance routière")
+    ap.add_argument("--noeuds", default=None, help="Nœuds du réseau (id x y, ou CSV osmid,x,y)")
+    ap.add_argument("--oriente", action="store_true", help="Arcs parcourables seulement de u vers v")
+    ap.add_argument("--cache-distances", default=None, help="Dossier du cache disque des matrices de distances")
+
+def main():
+    ap = argparse.ArgumentParser(description="Réseau routier : chargement, accrochage et matrices de distances en cache.")
+    ajouter_arguments(ap)
+    ap.add_argument("--origines", default=None, help="CSV x,y des origines (ex. voitures) : matrice de distances")
+    ap.add_argument("--cibles", default=None, help="CSV x,y des cibles (ex. passagers)")
+    ap.add_argument("--sortie", default=None, help="Matrice |origines| x |cibles| écrite en .npy")
+    args = ap.parse_args()
+    if not args.reseau:
+        ap.error("--reseau requis")
+
+    debut = time.perf_counter()
+    reseau = charger_reseau(**options_reseau(args)["reseau"])
+    x0, y0, x1, y1 = reseau.emprise()
+    print(f"[OK] {reseau!r} chargé en {time.perf_counter() - debut:.2f} s ; "
+          f"{len(reseau._accrochables)} nœud(s) accrochables, emprise [{x0:g}, {x1:g}] x [{y0:g}, {y1:g}]")
+    print(f"[INFO] Empreinte : {reseau.empreinte}")
+    if args.origines and args.cibles:
+        lire = lambda chemin: np.array([[float(c) for c in ligne[:2]] for ligne in _lire_table(chemin)[1]])
+        debut = time.perf_counter()
+        matrice = reseau.distances(lire(args.origines), lire(args.cibles))
+        print(f"[OK] Matrice {matrice.shape[0]} x {matrice.shape[1]} en {time.perf_counter() - debut:.2f} s "
+              f"({reseau.stats['arbres']} arbre(s) de Dijkstra, cache : {json.dumps(reseau.stats)})")
+        if args.sortie:
+            np.save(args.sortie, matrice)
+            print(f"[OK] Matrice : {args.sortie}")
+
+if __name__ == "__main__":
+    main()
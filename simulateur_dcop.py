@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# simulateur_dcop.py — Simulation en processus (sans JVM) de MGM, DSA et Max-Sum synchrones
+# sur les Modélisations 1 et 2 de constructeur_dcop.py, avec compteurs de messages et de NCCCs.
+import argparse
+import csv
+import os
+import time
+from itertools import chain, combinations
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from constructeur_dcop import InstanceCompacte, dimensions_instance
+from graphe_contraintes import COLONNES_GRAPHE, colonnes_graphe
+
+ALGORITHMES = ("MGM", "DSA", "MaxSum")
+
+# Schéma de results/bench.csv et results/bench2.csv
+COLONNES_BENCH = [
+    "xml_file", "algorithm", "total_cost", "runtime_ms", "ncccs", "msgs_total",
+    "instance_name", "nb_agents", "nb_variables", "nb_constraints", "nb_relations", "max_arity",
+    "domain_names", "domain_sizes", "arity_histogram", "nb_soft_relations", "nb_other_relations",
+    "passengers_guess", *COLONNES_GRAPHE,
+]
+
+def _combinaisons(n: int, r: int) -> np.ndarray:
+    """Toutes les combinaisons de r indices parmi n, en tableau (C(n, r), r)."""
+    plat = np.fromiter(chain.from_iterable(combinations(range(n), r)), dtype=np.int64)
+    return plat.reshape(-1, r)
+
+class ProblemeDCOP:
+    """
+    DCOP tel qu'écrit par les constructeurs, sous forme de tableaux :
+    - unaires (n, D) : coût de chaque variable pour chaque indice de valeur
+      (M1 : indices 0/1 = valeurs 0/1 ; M2 : indice i = voiture i+1) ;
+    - contraintes « tuple interdit » (AMO, tout-zéro) groupées par arité r :
+      groupes[r] = (portées (F, r) en indices de variables, valeurs interdites (F, r)) ;
+    - capacités : une contrainte de cardinalité par voiture, « au plus K de ces variables prennent la
+      valeur comptée » (M1 : x_ij = 1 ; M2 : y_j = i), équivalente aux sous-ensembles K+1 comme au
+      compteur séquentiel du XML mais vérifiée en une passe, sans énumération :
+      capacites = (variables (E,), contrainte (E,), valeur comptée (E,), bornes K (C,)) ;
+    - hors_domaine (n, D) éventuel : valeurs absentes du domaine de la variable (M2 élaguée) ;
+    - agent hébergeur de chaque variable (indice de voiture).
+    Le coût `infinity` est remplacé par une pénalité finie supérieure à toute somme de coûts unaires.
+    """
+
+    __slots__ = ("instance", "modelisation", "unaires", "agents", "groupes", "capacites", "hors_domaine",
+                 "penalite", "_voisins")
+
+    def __init__(self, instance: InstanceCompacte, modelisation: int, unaires, agents, groupes,
+                 capacites: Optional[tuple] = None, hors_domaine: Optional[np.ndarray] = None):
+        self.instance = instance
+        self.modelisation = modelisation
+        self.agents = agents
+        self.groupes = groupes
+        vide = np.zeros(0, dtype=np.int64)
+        self.capacites = capacites if capacites is not None else (vide, vide, vide, vide)
+        self.hors_domaine = hors_domaine
+        autorises = unaires if hors_domaine is None else np.where(hors_domaine, 0, unaires)
+        self.penalite = float(np.abs(autorises).max(axis=1, initial=0).sum() + 1)
+        self.unaires = unaires if hors_domaine is None else np.where(hors_domaine, self.penalite, unaires)
+        self._voisins = None
+
+    @property
+    def nb_variables(self) -> int:
+        return self.unaires.shape[0]
+
+    @property
+    def taille_domaine(self) -> int:
+        return self.unaires.shape[1]
+
+    def comptes_capacites(self, x: np.ndarray) -> np.ndarray:
+        """Nombre de variables prenant leur valeur comptée, par contrainte de capacité."""
+        variables, contrainte, valeurs, bornes = self.capacites
+        return np.bincount(contrainte, weights=x[variables] == valeurs, minlength=len(bornes))
+
+    def nb_voisins(self) -> np.ndarray:
+        """Nombre de variables voisines (partageant au moins une contrainte) de chaque variable."""
+        if self._voisins is None:
+            n = self.nb_variables
+            paires = []
+            for r, (portees, _) in self.groupes.items():
+                for a in range(r):
+                    for b in range(r):
+                        if a != b:
+                            paires.append(portees[:, a] * n + portees[:, b])
+            uniques = np.unique(np.concatenate(paires)) if paires else np.zeros(0, dtype=np.int64)
+            self._voisins = np.bincount(uniques // n, minlength=n) if n else np.zeros(0, dtype=np.int64)
+            # Les voisins par capacité (même voiture) ne recoupent pas ceux des AMO (même passager)
+            self._voisins = self._voisins + self._voisins_capacites()
+        return self._voisins
+
+    def _voisins_capacites(self) -> np.ndarray:
+        """
+        Taille de l'union des portées de capacité contenant chaque variable, moins elle-même. Portées
+        identiques fusionnées ; paires énumérées seulement pour les variables de plusieurs portées
+        distinctes (M2 élaguée), jamais les cliques entières.
+        """
+        n = self.nb_variables
+        variables, contrainte, _, bornes = self.capacites
+        voisins = np.zeros(n, dtype=np.int64)
+        portees = {}
+        for c in range(len(bornes)):
+            portee = variables[contrainte == c]
+            portees.setdefault(portee.tobytes(), portee)
+        portees = list(portees.values())
+        appartenances = np.bincount(np.concatenate(portees), minlength=n) if portees else np.zeros(n, dtype=np.int64)
+        multiples = appartenances > 1
+        paires = []
+        for portee in portees:
+            seules = portee[~multiples[portee]]
+            voisins[seules] += len(portee) - 1
+            partagees = portee[multiples[portee]]
+            if len(partagees):
+                paires.append((partagees[:, None] * n + portee[None, :]).ravel())
+        if paires:
+            uniques = np.unique(np.concatenate(paires))
+            voisins += np.bincount(uniques // n, minlength=n) - multiples
+        return voisins
+
+    def nb_contraintes_par_variable(self) -> np.ndarray:
+        """Contraintes (unaire comprise) portant sur chaque variable."""
+        compte = np.ones(self.nb_variables, dtype=np.int64)
+        for portees, _ in self.groupes.values():
+            compte += np.bincount(portees.ravel(), minlength=self.nb_variables)
+        return compte + np.bincount(self.capacites[0], minlength=self.nb_variables)
+
+    def couts_locaux(self, x: np.ndarray) -> np.ndarray:
+        """
+        Coût local (n, D) de chaque valeur de chaque variable, les autres gardant leur valeur dans x :
+        unaire + pénalité si cette valeur complète un tuple interdit, + pénalité par place manquante
+        dans chaque voiture dont elle dépasserait la capacité.
+        """
+        locaux = self.unaires.copy()
+        for r, (portees, interdits) in self.groupes.items():
+            egal = x[portees] == interdits
+            autres_egaux = (egal.sum(axis=1)[:, None] - egal) == r - 1
+            np.add.at(locaux, (portees[autres_egaux], interdits[autres_egaux]), self.penalite)
+        variables, contrainte, valeurs, bornes = self.capacites
+        if len(variables):
+            compte = x[variables] == valeurs
+            autres = self.comptes_capacites(x)[contrainte] - compte      # sans la variable elle-même
+            exces_sans = np.maximum(autres - bornes[contrainte], 0)
+            exces_avec = np.maximum(autres + 1 - bornes[contrainte], 0)
+            np.add.at(locaux, variables, (self.penalite * exces_sans)[:, None])
+            np.add.at(locaux, (variables, valeurs), self.penalite * (exces_avec - exces_sans))
+        return locaux
+
+    def violations(self, x: np.ndarray) -> int:
+        """Nombre de contraintes dont le tuple interdit est réalisé par x (capacités dépassées et valeurs hors domaine comprises)."""
+        nb = sum((x[portees] == interdits).all(axis=1).sum() for portees, interdits in self.groupes.values())
+        nb += (self.comptes_capacites(x) > self.capacites[3]).sum()
+        if self.hors_domaine is not None:
+            nb += self.hors_domaine[np.arange(self.nb_variables), x].sum()
+        return int(nb)
+
+    def cout(self, x: np.ndarray) -> Optional[int]:
+        """Coût total de x (somme des unaires), None si une contrainte est violée (coût infini)."""
+        if self.violations(x):
+            return None
+        return int(self.unaires[np.arange(self.nb_variables), x].sum())
+
+def construire_probleme(obj: Union[dict, InstanceCompacte], modelisation: int = 1, hotes: Optional[np.ndarray] = None) -> ProblemeDCOP:
+    """
+    Structure de la Modélisation 1 (x_ij binaires) ou 2 (y_j catégorielles) d'une instance, avec les
+    variables, domaines et contraintes du XML : instance élaguée, x_ij des couples candidats seulement
+    (M1) et domaines réduits aux voitures candidates (M2) ; AMO, tout-zéro et capacités sur ces couples.
+    hotes : voiture hébergeant chaque y_j en Modélisation 2 (placement_m2), cyclique par défaut.
+    """
+    instance = obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+    couts = np.asarray(instance.couts, dtype=float)
+    nb_voitures, nb_passagers = couts.shape
+    masque = instance.candidats if instance.candidats is not None else np.ones(couts.shape, dtype=bool)
+    capacites = instance.capacites.tolist()
+    blocs: Dict[int, List[tuple]] = {}
+
+    def ajouter(portees: np.ndarray, interdits: np.ndarray) -> None:
+        if len(portees):
+            blocs.setdefault(portees.shape[1], []).append((portees, interdits))
+
+    if modelisation == 1:
+        # x_ij des couples candidats, numérotées ligne par ligne (ordre du XML), hébergées par la voiture i
+        lignes, colonnes = np.nonzero(masque)
+        indice = np.full(couts.shape, -1, dtype=np.int64)
+        indice[lignes, colonnes] = np.arange(len(lignes))
+        unaires = np.zeros((len(lignes), 2))
+        unaires[:, 1] = couts[lignes, colonnes]
+        agents = lignes
+        # Passagers groupés par nombre de voitures candidates : AMO et tout-zéro en une passe par groupe
+        nb_candidates = masque.sum(axis=0)
+        for taille in np.unique(nb_candidates).tolist():
+            if taille == 0:
+                continue
+            passagers = np.flatnonzero(nb_candidates == taille)
+            voitures = np.nonzero(masque[:, passagers].T)[1].reshape(len(passagers), taille)
+            variables = indice[voitures, passagers[:, None]]
+            if taille >= 2:
+                amo = variables[:, _combinaisons(taille, 2)].reshape(-1, 2)
+                ajouter(amo, np.ones_like(amo))
+            ajouter(variables, np.zeros_like(variables))
+        capacite = [(indice[i, masque[i]], np.ones(masque[i].sum(), dtype=np.int64), K)
+                    for i, K in enumerate(capacites)]
+        hors_domaine = None
+    elif modelisation == 2:
+        # y_j -> indice j, hébergée par la voiture j mod N (cyclique, comme le constructeur) ou hotes[j]
+        unaires = np.where(masque, couts, 0).T.copy()
+        agents = np.arange(nb_passagers) % max(nb_voitures, 1) if hotes is None else np.asarray(hotes, dtype=np.int64)
+        capacite = [(np.flatnonzero(masque[i]), np.full(masque[i].sum(), i, dtype=np.int64), K)
+                    for i, K in enumerate(capacites)]
+        hors_domaine = None if instance.candidats is None else ~masque.T
+    else:
+        raise ValueError("Modélisation non supportée. Choisissez 1 ou 2.")
+    # Capacités : seulement les voitures dont K est inférieur au nombre de passagers candidats (comme le XML)
+    actives = [(variables, valeurs, K) for variables, valeurs, K in capacite if K < len(variables)]
+    vide = np.zeros(0, dtype=np.int64)
+    capacites_actives = (
+        np.concatenate([v for v, _, _ in actives]) if actives else vide,
+        np.repeat(np.arange(len(actives)), [len(v) for v, _, _ in actives]) if actives else vide,
+        np.concatenate([t for _, t, _ in actives]) if actives else vide,
+        np.array([K for _, _, K in actives], dtype=np.int64),
+    )
+    return ProblemeDCOP(instance, modelisation, unaires, agents, _groupes(blocs), capacites_actives, hors_domaine)
+
+def _groupes(blocs: Dict[int, List[tuple]]) -> Dict[int, tuple]:
+    return {
+        r: (np.concatenate([p for p, _ in liste]), np.concatenate([t for _, t in liste]))
+        for r, liste in sorted(blocs.items())
+    }
+
+# ----------------------------------------------------------------------
+# Algorithmes (un cycle synchrone = un tour de messages entre voisins)
+# ----------------------------------------------------------------------
+
+def _nccc_par_cycle(probleme: ProblemeDCOP, checks_par_variable: np.ndarray) -> int:
+    """NCCCs d'un cycle : les agents travaillent en parallèle, on retient le plus chargé."""
+    if probleme.nb_variables == 0:
+        return 0
+    return int(np.bincount(probleme.agents, weights=checks_par_variable).max())
+
+def _gagnants_mgm(probleme: ProblemeDCOP, gains: np.ndarray) -> np.ndarray:
+    """
+    Variables autorisées à changer : gain > 0 et strictement meilleur que chaque voisin
+    (égalité départagée par le plus petit indice, comme l'identifiant d'agent dans FRODO).
+    """
+    perdant = np.zeros(probleme.nb_variables, dtype=bool)
+    for portees, _ in probleme.groupes.values():
+        g = gains[portees]
+        g_max = g.max(axis=1)
+        indices_max = np.where(g == g_max[:, None], portees, np.iinfo(np.int64).max).min(axis=1)
+        ok = (g > g_max[:, None]) | ((g == g_max[:, None]) & (portees == indices_max[:, None]))
+        perdant[portees[~ok]] = True
+    # Contraintes de capacité : un seul gagnant par voiture (plus grand gain, puis plus petit indice)
+    variables, contrainte, _, bornes = probleme.capacites
+    if len(variables):
+        g = gains[variables]
+        g_max = np.full(len(bornes), -np.inf)
+        np.maximum.at(g_max, contrainte, g)
+        est_max = g == g_max[contrainte]
+        indices_max = np.full(len(bornes), np.iinfo(np.int64).max)
+        np.minimum.at(indices_max, contrainte[est_max], variables[est_max])
+        perdant[variables[~(est_max & (variables == indices_max[contrainte]))]] = True
+    return (gains > 0) & ~perdant
+
+def _mgm(probleme, x, rng, cycles, echeance, options):
+    n = probleme.nb_variables
+    messages_par_cycle = 2 * int(probleme.nb_voisins().sum())        # valeur + gain à chaque voisin
+    checks = probleme.taille_domaine * probleme.nb_contraintes_par_variable()
+    msgs = ncccs = 0
+    for _ in range(cycles):
+        locaux = probleme.couts_locaux(x)
+        actuel = locaux[np.arange(n), x]
+        meilleur = locaux.argmin(axis=1)
+        gains = actuel - locaux[np.arange(n), meilleur]
+        bouge = _gagnants_mgm(probleme, gains)
+        x = np.where(bouge, meilleur, x)
+        msgs += messages_par_cycle
+        ncccs += _nccc_par_cycle(probleme, checks)
+        if time.perf_counter() > echeance:
+            break
+    return x, msgs, ncccs
+
+def _dsa(probleme, x, rng, cycles, echeance, options):
+    n = probleme.nb_variables
+    probabilite = options.get("probabilite", 0.7)
+    variante = options.get("variante", "B")
+    messages_par_cycle = int(probleme.nb_voisins().sum())            # valeur à chaque voisin
+    checks = probleme.taille_domaine * probleme.nb_contraintes_par_variable()
+    msgs = ncccs = 0
+    lignes = np.arange(n)
+    for _ in range(cycles):
+        locaux = probleme.couts_locaux(x)
+        actuel = locaux[lignes, x]
+        minimum = locaux.min(axis=1)
+        gains = actuel - minimum
+        # Meilleure valeur autre que la valeur courante (pour les mouvements à gain nul de DSA-B)
+        autres = locaux.copy()
+        autres[lignes, x] = np.inf
+        alternative = autres.argmin(axis=1)
+        candidats = gains > 0
+        if variante == "B":
+            en_conflit = actuel >= probleme.penalite
+            candidats |= (gains == 0) & en_conflit & (autres[lignes, alternative] == minimum)
+        bouge = candidats & (rng.random(n) < probabilite)
+        x = np.where(bouge, np.where(gains > 0, locaux.argmin(axis=1), alternative), x)
+        msgs += messages_par_cycle
+        ncccs += _nccc_par_cycle(probleme, checks)
+        if time.perf_counter() > echeance:
+            break
+    return x, msgs, ncccs
+
+def _messages_capacites(probleme: ProblemeDCOP, Qc: np.ndarray) -> np.ndarray:
+    """
+    Messages (E, D) des facteurs de capacité « au plus K variables prennent leur valeur comptée c »
+    vers leurs variables, en forme close. Avec s_l = min_{b≠c_l} Q_l(b) et δ_l = min(Q_l(c_l) - s_l, 0) :
+      R(a) = Σ_{l≠k} s_l + somme des K plus petits δ_l (l≠k)          si a ≠ c_k
+      R(c_k) = Σ_{l≠k} s_l + somme des K-1 plus petits δ_l (l≠k)      (pénalité si K = 0)
+    """
+    variables, contrainte, valeurs, bornes = probleme.capacites
+    E, D = Qc.shape
+    lignes = np.arange(E)
+    q_compte = Qc[lignes, valeurs]
+    autres = Qc.copy()
+    autres[lignes, valeurs] = np.inf
+    q_sans = autres.min(axis=1)
+    q_sans = np.where(np.isfinite(q_sans), q_sans, q_compte + probleme.penalite)
+    ecart = np.minimum(q_compte - q_sans, 0)
+    # Écarts triés dans chaque contrainte (entrées contiguës par contrainte) et sommes préfixes
+    ordre = np.lexsort((ecart, contrainte))
+    tailles = np.bincount(contrainte, minlength=len(bornes))
+    debuts = (np.cumsum(tailles) - tailles)[contrainte]
+    rang = np.empty(E, dtype=np.int64)
+    rang[ordre] = np.arange(E) - debuts[ordre]
+    cumul = np.concatenate([[0.0], np.cumsum(ecart[ordre])])
+
+    def plus_petits_autres(t: np.ndarray) -> np.ndarray:
+        t = np.clip(t, 0, tailles[contrainte] - 1)
+        sans_soi = cumul[debuts + t] - cumul[debuts]
+        avec_soi = cumul[debuts + t + 1] - cumul[debuts] - ecart
+        return np.where(rang < t, avec_soi, sans_soi)
+
+    K = bornes[contrainte]
+    base = np.bincount(contrainte, weights=q_sans, minlength=len(bornes))[contrainte] - q_sans
+    Rc = np.repeat((base + plus_petits_autres(K))[:, None], D, axis=1)
+    Rc[lignes, valeurs] = np.where(K > 0, base + plus_petits_autres(K - 1), base + probleme.penalite)
+    return Rc - Rc.min(axis=1, keepdims=True)
+
+def _max_sum(probleme, x, rng, cycles, echeance, options):
+    """
+    Max-Sum (min-somme) sur le graphe de facteurs ; les unaires sont intégrés aux variables.
+    Pour un facteur « tuple interdit » t, le message vers x_k est calculé en forme close :
+      R(a) = Σ_{l≠k} min Q_l                                   si a ≠ t_k
+      R(t_k) = min(Σ_{l≠k} Q_l(t_l) + pénalité, Σ_{l≠k} min Q_l + min_{l≠k} (min_{b≠t_l} Q_l(b) - min Q_l))
+    Les facteurs de capacité ont aussi une forme close (_messages_capacites).
+    """
+    n, D = probleme.unaires.shape
+    amortissement = options.get("amortissement", 0.0)
+    aretes = [(r, portees, interdits) for r, (portees, interdits) in probleme.groupes.items()]
+    variables_capacite, contrainte_capacite, _, bornes = probleme.capacites
+    var_arete = np.concatenate([p.ravel() for _, p, _ in aretes] + [variables_capacite])
+    nb_aretes_groupes = len(var_arete) - len(variables_capacite)
+    Q = np.zeros((len(var_arete), D))
+    R = np.zeros((len(var_arete), D))
+    messages_par_cycle = 2 * len(var_arete)
+    # Un facteur énumère sa table (D^r), un facteur de capacité trie ses r entrées (D·r) ;
+    # il est hébergé par l'agent de sa première variable
+    checks_facteurs = np.zeros(n)
+    for r, portees, _ in aretes:
+        np.add.at(checks_facteurs, portees[:, 0], float(D) ** r)
+    if len(bornes):
+        tailles = np.bincount(contrainte_capacite, minlength=len(bornes))
+        premieres = variables_capacite[np.cumsum(tailles) - tailles]
+        np.add.at(checks_facteurs, premieres, float(D) * tailles)
+    checks = checks_facteurs + D * probleme.nb_contraintes_par_variable()
+    msgs = ncccs = 0
+    for _ in range(cycles):
+        # Facteurs -> variables
+        nouveaux, debut = [], 0
+        for r, portees, interdits in aretes:
+            F = len(portees)
+            Qg = Q[debut:debut + F * r].reshape(F, r, D)
+            debut += F * r
+            m = Qg.min(axis=2)
+            q_interdit = np.take_along_axis(Qg, interdits[:, :, None], axis=2)[:, :, 0]
+            masque = Qg.copy()
+            np.put_along_axis(masque, interdits[:, :, None], np.inf, axis=2)
+            ecart = masque.min(axis=2) - m
+            # min_{l≠k} de l'écart : deux plus petites valeurs
+            if r > 1:
+                ordre = np.argsort(ecart, axis=1)
+                premier = np.take_along_axis(ecart, ordre[:, :1], axis=1)
+                second = np.take_along_axis(ecart, ordre[:, 1:2], axis=1)
+                min_autres = np.where(np.arange(r)[None, :] == ordre[:, :1], second, premier)
+            else:
+                min_autres = np.full((F, 1), np.inf)
+            somme_autres = m.sum(axis=1)[:, None] - m
+            valeur_interdite = np.minimum(
+                q_interdit.sum(axis=1)[:, None] - q_interdit + probleme.penalite,
+                somme_autres + min_autres,
+            )
+            Rg = np.repeat(somme_autres[:, :, None], D, axis=2)
+            np.put_along_axis(Rg, interdits[:, :, None], valeur_interdite[:, :, None], axis=2)
+            nouveaux.append((Rg - Rg.min(axis=2, keepdims=True)).reshape(-1, D))
+        if len(bornes):
+            nouveaux.append(_messages_capacites(probleme, Q[nb_aretes_groupes:]))
+        if nouveaux:
+            R = amortissement * R + (1 - amortissement) * np.concatenate(nouveaux)
+        # Variables -> facteurs, puis décision
+        total = probleme.unaires.copy()
+        np.add.at(total, var_arete, R)
+        Q = total[var_arete] - R
+        Q -= Q.min(axis=1, keepdims=True) if len(Q) else 0
+        x = total.argmin(axis=1)
+        msgs += messages_par_cycle
+        ncccs += _nccc_par_cycle(probleme, checks)
+        if time.perf_counter() > echeance:
+            break
+    return x, msgs, ncccs
+
+_ALGORITHMES = {"MGM": _mgm, "DSA": _dsa, "MaxSum": _max_sum}
+
+def simuler(
+    probleme: ProblemeDCOP,
+    algorithme: str,
+    cycles: int = 200,
+    graine: int = 0,
+    delai_s: Optional[float] = None,
+    **options,
+) -> dict:
+    """
+    Lance un algorithme synchrone pendant `cycles` cycles (ou jusqu'à `delai_s` secondes).
+    Messages : MGM = valeur + gain par voisin et par cycle, DSA = valeur par voisin,
+    Max-Sum = un message par arête variable–facteur et par sens. NCCCs : par cycle, le
+    maximum sur les agents des vérifications de contraintes de leurs variables/facteurs.
+    Options : probabilite / variante ("A" | "B") pour DSA, amortissement pour Max-Sum.
+    Retourne total_cost (None si infaisable), runtime_ms, ncccs, msgs_total et l'affectation.
+    """
+    if algorithme not in _ALGORITHMES:
+        raise ValueError(f"Algorithme inconnu '{algorithme}'. Choisissez parmi {ALGORITHMES}.")
+    rng = np.random.default_rng(graine)
+    debut = time.perf_counter()
+    echeance = debut + delai_s if delai_s is not None else np.inf
+    x0 = rng.integers(0, max(probleme.taille_domaine, 1), size=probleme.nb_variables)
+    x, msgs, ncccs = _ALGORITHMES[algorithme](probleme, x0, rng, cycles, echeance, options)
+    runtime_ms = int(round((time.perf_counter() - debut) * 1000))
+    return {
+        "algorithm": algorithme,
+        "total_cost": probleme.cout(x),
+        "runtime_ms": runtime_ms,
+        "ncccs": int(ncccs),
+        "msgs_total": int(msgs),
+        "affectation": x,
+    }
+
+def ligne_bench(probleme: ProblemeDCOP, resultat: dict, xml_file: Optional[str] = None) -> dict:
+    """Ligne au schéma de results/bench.csv (colonnes structurelles comprises)."""
+    return ligne_bench_instance(probleme.instance, probleme.modelisation, resultat, xml_file)
+
+def ligne_bench_instance(
+    obj: Union[dict, InstanceCompacte],
+    modelisation: int,
+    resultat: dict,
+    xml_file: Optional[str] = None,
+    encodage_capacite: str = "sous_ensembles",
+) -> dict:
+    """
+    Ligne de bench pour un résultat quelconque (simulateur ou FRODO) : total_cost None -> vide,
+    colonnes structurelles calculées sans construire le XML (dimensions_instance), largeur induite
+    et taille UTIL max du pseudo-arbre DFS (graphe_contraintes).
+    """
+    instance = obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+    dims = dimensions_instance(instance, modelisation, encodage_capacite)
+    nom = instance.nom if instance.nom is not None else "instance"
+    return {
+        "xml_file": xml_file or f"{nom}_M{modelisation}.xml",
+        "algorithm": resultat["algorithm"],
+        "total_cost": "" if resultat["total_cost"] is None else float(resultat["total_cost"]),
+        "runtime_ms": resultat["runtime_ms"],
+        "ncccs": "" if resultat["ncccs"] is None else resultat["ncccs"],
+        "msgs_total": "" if resultat["msgs_total"] is None else resultat["msgs_total"],
+        "instance_name": nom,
+        "nb_agents": dims["nb_agents"],
+        "nb_variables": dims["nb_variables"],
+        "nb_constraints": dims["nb_contraintes"],
+        "nb_relations": dims["nb_relations"],
+        "max_arity": dims["max_arity"],
+        "domain_names": ";".join(dims["domaines"]),
+        "domain_sizes": ";".join(str(t) for t in dims["domaines"].values()),
+        "arity_histogram": ";".join(f"{a}:{c}" for a, c in dims["arites"].items()),
+        "nb_soft_relations": dims["nb_relations"],
+        "nb_other_relations": 0,
+        "passengers_guess": len(instance.passagers),
+        **colonnes_graphe(instance, modelisation, encodage_capacite),
+    }
+
+def _mettre_a_jour_entete(chemin: str) -> List[str]:
+    """
+    Réécrit un CSV de bench dont l'en-tête ne contient pas toutes les COLONNES_BENCH (colonnes
+    ajoutées vides). Retourne l'en-tête du fichier.
+    """
+    with open(chemin, newline="", encoding="utf-8") as f:
+        lecteur = csv.DictReader(f)
+        if set(COLONNES_BENCH) <= set(lecteur.fieldnames or []):
+            return list(lecteur.fieldnames)
+        colonnes = COLONNES_BENCH + [c for c in lecteur.fieldnames or [] if c not in COLONNES_BENCH]
+        lignes = list(lecteur)
+    temporaire = f"{chemin}.tmp{os.getpid()}"
+    with open(temporaire, "w", newline="", encoding="utf-8") as f:
+        ecrivain = csv.DictWriter(f, fieldnames=colonnes, restval="")
+        ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+    os.replace(temporaire, chemin)
+    return colonnes
+
+def ajouter_lignes_csv(chemin: str, lignes: List[dict]) -> None:
+    """
+    Ajoute des lignes à un CSV de bench (en-tête écrit si le fichier est nouveau ou vide ; un
+    fichier à l'ancien schéma est d'abord réécrit avec les nouvelles colonnes, vides).
+    """
+    nouveau = not os.path.exists(chemin) or os.path.getsize(chemin) == 0
+    if os.path.dirname(chemin):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    colonnes = COLONNES_BENCH if nouveau else _mettre_a_jour_entete(chemin)
+    with open(chemin, "a", newline="", encoding="utf-8") as f:
+        ecrivain = csv.DictWriter(f, fieldnames=colonnes, restval="")
+        if nouveau:
+            ecrivain.writeheader()
+        ecrivain.writerows(lignes)
+
+def main():
+    ap = argparse.ArgumentParser(description="Simule MGM / DSA / Max-Sum sur une instance JSON et ajoute les lignes au CSV de bench.")
+    ap.add_argument("instance", help="Instance JSON (construire_json_a_partir_positions ou InstanceCompacte.sauver)")
+    ap.add_argument("--modelisation", type=int, choices=[1, 2], default=1)
+    ap.add_argument("--algorithmes", nargs="+", choices=list(ALGORITHMES), default=list(ALGORITHMES))
+    ap.add_argument("--cycles", type=int, default=200)
+    ap.add_argument("--graine", type=int, default=0)
+    ap.add_argument("--delai", type=float, default=None, help="Délai max par algorithme (s)")
+    ap.add_argument("--xml-file", default=None, help="Valeur de la colonne xml_file (défaut : <nom>_M<modèle>.xml)")
+    ap.add_argument("--sortie", default=None, help="CSV de sortie (défaut : results/bench.csv pour M1, results/bench2.csv pour M2)")
+    args = ap.parse_args()
+
+    probleme = construire_probleme(InstanceCompacte.charger(args.instance), args.modelisation)
+    sortie = args.sortie or ("results/bench.csv" if args.modelisation == 1 else "results/bench2.csv")
+    lignes = []
+    for algo in args.algorithmes:
+        resultat = simuler(probleme, algo, cycles=args.cycles, graine=args.graine, delai_s=args.delai)
+        lignes.append(ligne_bench(probleme, resultat, args.xml_file))
+        print(f"[OK] {algo}: coût={resultat['total_cost']} temps={resultat['runtime_ms']}ms "
+              f"msgs={resultat['msgs_total']} ncccs={resultat['ncccs']}")
+    ajouter_lignes_csv(sortie, lignes)
+    print(f"[OK] {len(lignes)} ligne(s) ajoutée(s) à {sortie}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# solveur_exact.py
+# Optimum exact du problème de ramassage : affectation de coût minimal avec capacités
+# (chaque passager dans exactement une voiture, au plus K_v passagers dans la voiture v).
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from constructeur_dcop import COUT_NON_CANDIDAT, ENCODAGES_CAPACITE, PLACEMENTS, InstanceCompacte
+
+def resoudre_affectation(couts: np.ndarray, capacites: np.ndarray) -> Optional[Tuple[int, np.ndarray]]:
+    """
+    Affectation capacitée de coût minimal par la méthode hongroise (O(P² · S), S = nb de places).
+    couts : matrice |V| x |P| (voitures en lignes) ; capacites : vecteur |V|.
+    Chaque voiture v est dupliquée en min(K_v, P) places ; les places ne sont jamais matérialisées
+    dans une matrice, leur coût est lu dans la colonne du passager courant.
+    Retourne (coût total, indice de voiture par passager), ou None si la capacité totale est insuffisante
+    (ou, instance élaguée, si les voitures candidates ne suffisent pas : couple à COUT_NON_CANDIDAT retenu).
+    """
+    couts = np.asarray(couts)
+    nb_voitures, nb_passagers = couts.shape
+    if nb_passagers == 0:
+        return 0, np.zeros(0, dtype=np.int64)
+    places = np.repeat(np.arange(nb_voitures), np.minimum(np.maximum(np.asarray(capacites), 0), nb_passagers))
+    nb_places = len(places)
+    if nb_places < nb_passagers:
+        return None
+
+    # Hongrois « lignes = passagers, colonnes = places », indices 1..n / 1..m (0 = sentinelle)
+    u = np.zeros(nb_passagers + 1)
+    v = np.zeros(nb_places + 1)
+    passager_de_place = np.zeros(nb_places + 1, dtype=np.int64)
+    chemin = np.zeros(nb_places + 1, dtype=np.int64)
+    for i in range(1, nb_passagers + 1):
+        passager_de_place[0] = i
+        j0 = 0
+        minv = np.full(nb_places + 1, np.inf)
+        utilisee = np.zeros(nb_places + 1, dtype=bool)
+        while True:
+            utilisee[j0] = True
+            i0 = passager_de_place[j0]
+            libres = ~utilisee[1:]
+            reduit = couts[places, i0 - 1] - u[i0] - v[1:]
+            maj = libres & (reduit < minv[1:])
+            minv[1:][maj] = reduit[maj]
+            chemin[1:][maj] = j0
+            j1 = int(np.argmin(np.where(libres, minv[1:], np.inf))) + 1
+            delta = minv[j1]
+            u[passager_de_place[utilisee]] += delta
+            v[utilisee] -= delta
+            minv[1:][libres] -= delta
+            j0 = j1
+            if passager_de_place[j0] == 0:
+                break
+        while j0:
+            j1 = chemin[j0]
+            passager_de_place[j0] = passager_de_place[j1]
+            j0 = j1
+
+    voiture_par_passager = np.empty(nb_passagers, dtype=np.int64)
+    for place in range(1, nb_places + 1):
+        if passager_de_place[place]:
+            voiture_par_passager[passager_de_place[place] - 1] = places[place - 1]
+    retenus = couts[voiture_par_passager, np.arange(nb_passagers)]
+    if (retenus == COUT_NON_CANDIDAT).any():
+        return None
+    return int(retenus.sum()), voiture_par_passager
+
+def _instance(obj: Union[dict, InstanceCompacte]) -> InstanceCompacte:
+    return obj if isinstance(obj, InstanceCompacte) else InstanceCompacte.depuis_json(obj)
+
+def affectation_optimale(obj: Union[dict, InstanceCompacte]) -> Optional[Tuple[int, Dict[str, str]]]:
+    """
+    (coût optimal, {passager: voiture}) pour une instance JSON ou compacte, avec les coûts
+    entiers tels qu'écrits dans le XML (donc comparables au total_cost de FRODO).
+    None si la capacité totale ne permet pas de transporter tous les passagers.
+    """
+    instance = _instance(obj)
+    resultat = resoudre_affectation(instance.couts, instance.capacites)
+    if resultat is None:
+        return None
+    cout, voiture_par_passager = resultat
+    voitures = instance.voitures.tolist()
+    return cout, {p: voitures[i] for p, i in zip(instance.passagers.tolist(), voiture_par_passager.tolist())}
+
+def cout_optimal(obj: Union[dict, InstanceCompacte]) -> Optional[int]:
+    """Coût optimal de l'instance (None si infaisable)."""
+    resultat = affectation_optimale(obj)
+    return None if resultat is None else resultat[0]
+
+def ajouter_cout_optimal(obj_json: dict) -> dict:
+    """Stocke le coût optimal dans le JSON d'instance (clé "cout_optimal", null si infaisable)."""
+    obj_json["cout_optimal"] = cout_optimal(obj_json)
+    return obj_json
+
+def nom_instance_depuis_xml(xml_file: str) -> str:
+    """
+    instance2V_2P_aleatoire_M2.xml -> instance2V_2P_aleatoire (nom du JSON d'origine) ; les variantes
+    d'encodage et de placement notées avant _M<m> (cf. generation_lot.nom_xml) sont retirées.
+    """
+    base = os.path.splitext(os.path.basename(str(xml_file)))[0]
+    for suffixe in ("_M1", "_M2"):
+        if base.endswith(suffixe):
+            base = base[: -len(suffixe)]
+            for variante in PLACEMENTS + ENCODAGES_CAPACITE:
+                if base.endswith(f"_{variante}"):
+                    base = base[: -len(variante) - 1]
+            return base
+    return base
+
+def optima_depuis_dossier(dossier: str, noms_instances: Iterable[str]) -> Dict[str, int]:
+    """
+    Coût optimal de chaque instance <dossier>/<nom>.json : valeur "cout_optimal" stockée
+    à la génération si présente, sinon recalculée. Les instances absentes sont ignorées.
+    """
+    optima = {}
+    for nom in sorted(set(noms_instances)):
+        chemin = os.path.join(dossier, f"{nom}.json")
+        if not os.path.isfile(chemin):
+            continue
+        with open(chemin, encoding="utf-8") as f:
+            obj_json = json.load(f)
+        if "cout_optimal" in obj_json:
+            cout = obj_json["cout_optimal"]
+        else:
+            cout = cout_optimal(InstanceCompacte.charger(chemin))
+        if cout is not None:
+            optima[nom] = int(cout)
+    return optima